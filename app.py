@@ -1,50 +1,99 @@
 # app.py — FINAL VERSION (DevSecOps E-commerce Store)
 # --------------------------------------------------------------------------
 # Features: Flask-Login, SQLAlchemy, Atomic/Secure Blockchain Persistence (HMAC, Auto-Backup)
+#
+# Layer web saja: logika chain ada di chain_core.py, penyimpanan + chain aktif
+# (lazy load) di chain_storage.py. Import modul ini tanpa efek samping; semua
+# setup (DB, session, Talisman, logging, metrics, warm-up chain) di create_app().
+#   python app.py                      -> dev server (port 5002)
+#   gunicorn 'app:create_app()'        -> production
 # --------------------------------------------------------------------------
-import hashlib
+import atexit
+import io
 import json
 import os
 import logging
 import time
 import hmac
-from time import time as now_time
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+from urllib.parse import urlencode
+from datetime import datetime, timedelta, timezone
+from flask import (Blueprint, Flask, Response, current_app, g, render_template, request, redirect, url_for,
+                   flash, session, send_file, make_response)
+from markupsafe import Markup
 from flask_talisman import Talisman
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_session import Session
 from pythonjsonlogger.json import JsonFormatter
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
+from chain_stream import EXPORT_FORMATS, export_chunks, iter_blocks
+from merkle import block_header, sign_header
+from product_catalog import ProductResolver
+from catalog_cache import CatalogCache
+from cart_service import CartError, apply_cart_ops, cart_json, price_cart
+from sqlite_session import SQLiteSessionInterface
+from log_pipeline import LogPipeline, parse_sample_rates
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as metrics_registry
+from request_profiler import RequestProfiler, make_token as make_profile_token, summarize as summarize_profile
+from sales_rollup import split_total
+from chain_core import SECRET_CHAIN_KEY, line_items, logger, verify_block_signature
+import chain_storage
+from chain_storage import (BLOCKCHAIN_FILE, CHAIN_BACKUP_DIR, CHAIN_STORAGE, audit_chain, backup_store,
+                           block_producer, chain_persister, chain_store, configure_rollup, get_chain,
+                           import_chain_stream, list_legacy_backups, refresh_backups, sales_rollup,
+                           store_lock, sync_sales_rollup)
 
 # ----------------------------
 # 1. Config & Setup
 # ----------------------------
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
-BLOCKCHAIN_FILE = os.path.join(APP_DIR, 'blockchain.json')
-CHAIN_BACKUP_DIR = os.path.join(APP_DIR, 'chain_backups')
 SESSION_DIR = os.path.join(APP_DIR, 'flask_session')
-
-# CRITICAL SECURITY: MUST BE SET TO RANDOM STRING AND NOT COMMITTED TO REPO
-SECRET_CHAIN_KEY = os.environ.get('SECRET_CHAIN_KEY', 'devchainsecret-changeinprod-887766').encode()
-RESET_BLOCKCHAIN = os.environ.get('RESET_BLOCKCHAIN', 'False').lower() in ('1', 'true', 'yes')
-
-app = Flask(__name__, static_folder='static', template_folder='templates')
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'devsecops-secret-key-2025')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ecommerce.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Session config (filesystem)
-app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_PERMANENT"] = True
-app.config["SESSION_USE_SIGNER"] = True
-app.config["SESSION_FILE_DIR"] = SESSION_DIR
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
-if not os.path.exists(SESSION_DIR):
-    os.makedirs(SESSION_DIR, exist_ok=True)
-Session(app)
+SECRET_KEY = os.environ.get('SECRET_KEY', 'devsecops-secret-key-2025')
+
+# Session backend: 'sqlite' (satu file WAL, sweeper expiry tiap N detik) | 'filesystem' (Flask-Session)
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite').lower()
+SESSION_DB_FILE = os.environ.get('SESSION_DB_FILE', os.path.join(APP_DIR, 'sessions.sqlite3'))
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 60))
+
+# Logging: queue bounded + listener thread (batch write). LOG_FILE kosong = stderr.
+# LOG_OVERFLOW: 'drop' (default, request tidak pernah menunggu sink) | 'block' (tunggu maks LOG_BLOCK_TIMEOUT_MS)
+# LOG_SAMPLE_RATES: 'Pesan.=rate;...' mis. 'Transaction mined.=0.1;Processing new order.=0.25'
+LOG_FILE = os.environ.get('LOG_FILE', '')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_OVERFLOW = os.environ.get('LOG_OVERFLOW', 'drop').lower()
+LOG_BLOCK_TIMEOUT_MS = int(os.environ.get('LOG_BLOCK_TIMEOUT_MS', 50))
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 256))
+LOG_FLUSH_MS = int(os.environ.get('LOG_FLUSH_MS', 200))
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+
+# Katalog in-memory dimuat ulang dari DB setelah sekian detik (menyusul perubahan produk dari worker lain);
+# 0 = hanya saat produk diubah lewat worker ini
+CATALOG_REFRESH_SECONDS = float(os.environ.get('CATALOG_REFRESH_SECONDS', 30))
+
+# Metrics (/metrics, format Prometheus). METRICS_DIR diisi untuk multi-process (satu snapshot per worker);
+# scrape wajib 'Authorization: Bearer <METRICS_TOKEN>'. Tanpa token /metrics ditolak, kecuali
+# METRICS_ALLOW_LOOPBACK=1 (opt-in eksplisit: hanya localhost, JANGAN dipakai di belakang reverse proxy
+# lokal karena semua request dari proxy terlihat berasal dari 127.0.0.1)
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 10))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOW_LOOPBACK = os.environ.get('METRICS_ALLOW_LOOPBACK', '0') == '1'
+
+# Profiling per request (admin): 'cprofile' (.prof) | 'sampling' (folded stacks untuk flame graph).
+# PROFILE_SAMPLE_RATE > 0 memprofil sebagian traffic secara acak (mis. 0.001)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile').lower()
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_BUFFER_SIZE = int(os.environ.get('PROFILE_BUFFER_SIZE', 20))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+PROFILE_TOKEN_TTL = int(os.environ.get('PROFILE_TOKEN_TTL', 3600))
+
+# Warm-up chain di create_app(): 'background' (load + verifikasi di thread, worker langsung siap menerima
+# request; request yang butuh chain menunggu load selesai) | 'eager' (sebelum create_app return) | 'lazy'
+# Multi worker (CHAIN_SHARED_STORE=1, mis. gunicorn -w 4 'app:create_app()'): jika memakai --preload,
+# pilih 'eager' atau 'lazy' agar tidak ada thread warm-up yang sedang memegang lock saat fork
+CHAIN_WARMUP = os.environ.get('CHAIN_WARMUP', 'background').lower()
 
 # CSP (Talisman) - Optimized for DevSecOps + Bootstrap 5
 csp = {
@@ -77,18 +126,91 @@ csp = {
     ],
     'frame-ancestors': ["'self'"]
 }
-Talisman(app, force_https=False, content_security_policy=csp)
 
-# Logger JSON
-handler = logging.StreamHandler()
+# Logger JSON (non-blocking: format + write di thread log-writer); di-start oleh create_app()
 formatter = JsonFormatter(fmt='%(asctime)s %(levelname)s %(name)s %(module)s %(funcName)s %(message)s')
-handler.setFormatter(formatter)
-app.logger.addHandler(handler)
-app.logger.setLevel(logging.INFO)
-app.logger.info("Application starting up.")
+log_pipeline = LogPipeline(formatter,
+                           path=LOG_FILE or None,
+                           max_queue=LOG_QUEUE_SIZE,
+                           policy=LOG_OVERFLOW,
+                           block_timeout=LOG_BLOCK_TIMEOUT_MS / 1000.0,
+                           batch_size=LOG_BATCH_SIZE,
+                           flush_interval=LOG_FLUSH_MS / 1000.0,
+                           sample_rates=parse_sample_rates(LOG_SAMPLE_RATES))
+
+# Instrumentation: counter/histogram in-memory, dirender hanya saat /metrics di-scrape
+http_requests = metrics_registry.counter('http_requests_total', 'HTTP requests by endpoint and status.',
+                                         ('method', 'endpoint', 'status'))
+http_latency = metrics_registry.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint.',
+                                          ('method', 'endpoint'))
+db_queries = metrics_registry.counter('db_queries_total', 'SQL statements executed.')
+db_queries_per_request = metrics_registry.histogram('db_queries_per_request', 'SQL statements per HTTP request.',
+                                                    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+
+# Ring buffer hasil profiling (in-memory, per process)
+request_profiler = RequestProfiler(SECRET_KEY,
+                                   mode=PROFILE_MODE,
+                                   sample_rate=PROFILE_SAMPLE_RATE,
+                                   capacity=PROFILE_BUFFER_SIZE,
+                                   sample_interval_ms=PROFILE_SAMPLE_INTERVAL_MS)
+
+# Semua route ada di blueprint 'shop' (endpoint: shop.<nama view>), didaftarkan oleh create_app()
+shop = Blueprint('shop', __name__)
+
+def _metrics_start():
+    g.metrics_started = time.perf_counter()
+    g.db_queries = 0
+
+def _is_admin_id(user_id):
+    user = db.session.get(User, user_id)
+    return user is not None and user.role == 'admin'
+
+def _profile_path():
+    """Path + query untuk entry profil, tanpa token (walaupun dikirim lewat query)."""
+    args = [(k, v) for k, v in request.args.items(multi=True) if k != '_profile_token']
+    return request.path + ('?' + urlencode(args) if args else '')
+
+def _profile_start():
+    if request.endpoint in ('static', 'shop.metrics'):
+        return
+    # Token hanya dari header: query string ikut tercatat di access log / Referer
+    token = request.headers.get('X-Profile-Token')
+    flag = request.args.get('_profile')
+    # current_user hanya dimuat jika flag dipakai (tanpa query tambahan untuk request biasa)
+    is_admin = bool(flag) and current_user.is_authenticated and current_user.role == 'admin'
+    decision = request_profiler.decide(token=token, flag=flag, is_admin=is_admin, admin_check=_is_admin_id)
+    if decision:
+        g.profile = request_profiler.start(*decision)
+
+def _profile_finish(status):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return None
+    endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    return request_profiler.finish(profile, request.method, _profile_path(), endpoint, status)
+
+def _profile_response(response):
+    entry = _profile_finish(response.status_code)
+    if entry:
+        response.headers['X-Profile-Id'] = str(entry['id'])
+    return response
+
+def _profile_teardown(exc):
+    # after_request tidak jalan (mis. exception di hook lain) -> profiler tetap dihentikan
+    _profile_finish(500)
+
+def _metrics_finish(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # Endpoint (nama view), bukan path -> kardinalitas label tetap kecil
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        http_latency.observe(time.perf_counter() - started, request.method, endpoint)
+        http_requests.inc(request.method, endpoint, response.status_code)
+        db_queries_per_request.observe(g.pop('db_queries', 0))
+    return response
 
 # jinja filter to format timestamps
-@app.template_filter('datetime_format')
+@shop.app_template_filter('datetime_format')
 def format_datetime(timestamp):
     try:
         dt_object = datetime.fromtimestamp(float(timestamp))
@@ -99,10 +221,22 @@ def format_datetime(timestamp):
 # ----------------------------
 # 2. DB Models
 # ----------------------------
-db = SQLAlchemy(app)
+db = SQLAlchemy()
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    db_queries.inc()
+    if g:
+        g.db_queries = g.get('db_queries', 0) + 1
+        conn.info['query_started'] = time.perf_counter()
+
+def _profile_query(conn, cursor, statement, parameters, context, executemany):
+    profile = g.get('profile') if g else None
+    started = conn.info.pop('query_started', None)
+    if profile is not None and started is not None:
+        profile.record_sql(statement, time.perf_counter() - started)
+
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'shop.login'
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -118,222 +252,91 @@ class Product(db.Model):
     description = db.Column(db.String(500), nullable=False)
     category = db.Column(db.String(50), nullable=False, default="Umum")
 
-@login_manager.user_loader
-def load_user(user_id):
-    try:
-        return db.session.get(User, int(user_id))
-    except Exception:
-        return None
+# Katalog in-memory (by id / by nama) dipakai bersama oleh dashboard, cart dan checkout
+product_resolver = ProductResolver(lambda: Product.query.order_by(Product.id).all(),
+                                   max_age=CATALOG_REFRESH_SECONDS or None)
 
-# ----------------------------
-# 3. Blockchain Logic (with HMAC Integrity)
-# ----------------------------
-def sign_block(block_dict):
-    """Generates HMAC signature for a block."""
-    b = block_dict.copy()
-    b.pop('signature', None) # Don't sign the signature field itself
-    payload = json.dumps(b, sort_keys=True, default=str).encode('utf-8')
-    return hmac.new(SECRET_CHAIN_KEY, payload, hashlib.sha256).hexdigest()
-
-def verify_block_signature(block_dict):
-    """Verifies HMAC signature for a block."""
-    sig = block_dict.get('signature')
-    if not sig:
-        return False
-    expected = sign_block(block_dict)
-    return hmac.compare_digest(expected, sig)
-
-class Blockchain:
-    def __init__(self, chain=None):
-        self.chain = chain.copy() if chain is not None else []
-        self.pending_transactions = []
-        if not self.chain:
-            self.create_block(proof=100, previous_hash='1')
-
-    def create_block(self, proof, previous_hash=None):
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': now_time(),
-            'transactions': self.pending_transactions.copy(),
-            'proof': proof,
-            'previous_hash': previous_hash or (self.hash(self.chain[-1]) if self.chain else '1')
-        }
-        # CRITICAL: Add HMAC Signature to the block
-        block['signature'] = sign_block(block)
-
-        self.pending_transactions = []
-        self.chain.append(block)
-        return block
-
-    def add_transaction(self, sender, items, total):
-        # Normalize items to readable string (prevents built-in method leak)
-        if isinstance(items, (list, tuple)):
-            try:
-                items_str = ", ".join(str(x) for x in items)
-            except Exception:
-                items_str = str(items)
-        elif isinstance(items, dict):
-            try:
-                items_str = json.dumps(items, ensure_ascii=False, default=str)
-            except Exception:
-                items_str = str(items)
-        else:
-            items_str = str(items)
-
-        if "<built-in" in items_str:
-            items_str = "CORRUPTED_ITEM_REMOVED"
-
-        tx = {
-            'sender': sender,
-            'items': items_str,
-            'total': int(total),
-            'timestamp': now_time()
-        }
-        self.pending_transactions.append(tx)
-        return (self.last_block['index'] + 1) if self.last_block else 1
-
-    @property
-    def last_block(self):
-        return self.chain[-1] if self.chain else None
-
-    @staticmethod
-    def hash(block):
-        block_string = json.dumps(block, sort_keys=True, default=str).encode()
-        return hashlib.sha256(block_string).hexdigest()
-
-    def get_transactions_by_user(self, username):
-        user_history = []
-        for block in self.chain:
-            for tx in block.get('transactions', []):
-                if tx.get('sender') == username:
-                    tx_copy = tx.copy()
-                    tx_copy['block_index'] = block['index']
-                    user_history.append(tx_copy)
-        return user_history
-
-    def get_all_transactions(self):
-        all_tx = []
-        for block in self.chain:
-            for tx in block.get('transactions', []):
-                tx_copy = tx.copy()
-                tx_copy['block_index'] = block['index']
-                all_tx.append(tx_copy)
-        return all_tx
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+def _product_changed(mapper, connection, target):
+    product_resolver.invalidate()
+    db.session.info['catalog_dirty'] = True
 
-# ----------------------------
-# 4. Robust file I/O for blockchain (Atomic Save, Auto-Backup, Recovery)
-# ----------------------------
-def cleanup_old_backups(limit=20):
-    """Hapus backup lama agar folder tidak membengkak."""
-    try:
-        if not os.path.exists(CHAIN_BACKUP_DIR): return
-        files = sorted(
-            [os.path.join(CHAIN_BACKUP_DIR, f) for f in os.listdir(CHAIN_BACKUP_DIR)],
-            reverse=True
-        )
-        for old in files[limit:]:
-            os.remove(old)
-    except Exception as e:
-        app.logger.warning("cleanup_old_backups failed: %s", e)
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_soft_rollback')
+def _product_committed(session, *args):
+    # Invalidate lagi setelah commit/rollback: load di antara flush & commit bisa melihat data lama
+    if session.info.pop('catalog_dirty', False):
+        product_resolver.invalidate()
 
-def backup_blockchain(data):
-    """Simpan salinan blockchain dengan timestamp."""
-    try:
-        os.makedirs(CHAIN_BACKUP_DIR, exist_ok=True)
-        ts = time.strftime("%Y%m%d-%H%M%S")
-        filename = os.path.join(CHAIN_BACKUP_DIR, f"blockchain_{ts}.json")
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        cleanup_old_backups()
-    except Exception as e:
-        app.logger.warning("backup_blockchain failed: %s", e)
+# Cache hasil query + fragment grid produk per kategori (key: versi katalog)
+catalog_cache = CatalogCache(product_resolver)
 
-def load_latest_backup():
-    """Coba muat backup terbaru dari folder jika file utama korup."""
+@login_manager.user_loader
+def load_user(user_id):
     try:
-        if not os.path.exists(CHAIN_BACKUP_DIR): return None
-        files = sorted(
-            [os.path.join(CHAIN_BACKUP_DIR, f) for f in os.listdir(CHAIN_BACKUP_DIR)],
-            reverse=True
-        )
-        for fpath in files:
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list): return data
+        return db.session.get(User, int(user_id))
     except Exception:
-        pass
-    return None
-
-def save_chain_to_file(chain_obj):
-    """Simpan blockchain secara Atomic (anti-corrupt) dan buat backup."""
-    try:
-        data = chain_obj.chain if isinstance(chain_obj, Blockchain) else chain_obj
-        temp_file = BLOCKCHAIN_FILE + ".tmp"
-        
-        with open(temp_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-
-        os.replace(temp_file, BLOCKCHAIN_FILE)
-        backup_blockchain(data)
-        app.logger.info("Blockchain saved to file (atomic).", extra={'file': BLOCKCHAIN_FILE})
-    except Exception as e:
-        app.logger.error("Failed to save blockchain to file.", extra={'error': str(e)})
-
-def load_chain_from_file_safe():
-    """Muat chain dengan validasi integritas (HMAC + struktur) dan fallback."""
-    if not os.path.exists(BLOCKCHAIN_FILE):
-        app.logger.info("No blockchain.json file found.")
-        return None
-    try:
-        with open(BLOCKCHAIN_FILE, "r", encoding="utf-8") as f:
-            chain = json.load(f)
-        
-        if not isinstance(chain, list) or len(chain) == 0:
-            raise ValueError("Blockchain root is empty or not a list")
-            
-        # Validate integrity (structure + HMAC)
-        for i, block in enumerate(chain):
-            if not isinstance(block, dict) or int(block.get('index', -1)) != i+1:
-                raise ValueError(f"Block structure or index mismatch at block {i+1}")
-            
-            if not verify_block_signature(block):
-                 raise ValueError(f"HMAC Signature mismatch at block {block.get('index')}")
-            
-        app.logger.info("Blockchain loaded from file and verified.", extra={'file': BLOCKCHAIN_FILE})
-        return chain
-    except Exception as e:
-        app.logger.error("Failed to load blockchain from file: %s", e)
-        backup = load_latest_backup()
-        if backup:
-            app.logger.warning("Loading blockchain from latest backup instead.")
-            # Persist backup as main chain
-            save_chain_to_file(backup)
-            return backup
         return None
 
 # ----------------------------
-# 5. Initialize or load chain
+# 3. Blockchain (chain_core.py) & storage (chain_storage.py)
 # ----------------------------
-shop_chain = Blockchain() # Start with in-memory genesis
-
-if RESET_BLOCKCHAIN:
-    # Delete file and re-init if reset requested
-    if os.path.exists(BLOCKCHAIN_FILE): os.remove(BLOCKCHAIN_FILE)
-    shop_chain = Blockchain()  # fresh genesis
-    save_chain_to_file(shop_chain)
-    app.logger.info("Blockchain reset to new genesis.")
-else:
-    loaded = load_chain_from_file_safe()
-    if loaded:
-        shop_chain = Blockchain(chain=loaded)
-        app.logger.info("Shop chain initialized from file.")
+def priced_items(tx):
+    """Line item + harga satuan, subtotal dan kategori satu transaksi (dashboard + rollup penjualan).
+
+    v2: harga & subtotal tercatat saat checkout. Legacy (string tanpa harga): total transaksi yang
+    tercatat dibagi ke item, berbobot harga katalog x qty (qty saja jika ada produk tak dikenal),
+    sehingga jumlah subtotal tetap sama dengan total yang dibayar, bukan harga katalog hari ini.
+    """
+    items = line_items(tx)
+    products = [product_resolver.get(item['product_id']) if item.get('product_id') is not None
+                else product_resolver.by_name(item.get('name')) for item in items]
+    legacy = bool(items) and all(item.get('product_id') is None for item in items)
+    if legacy:
+        qtys = [max(0, int(item.get('qty', 1) or 0)) for item in items]
+        if all(products):
+            weights = [p.price * q for p, q in zip(products, qtys)]
+        else:
+            weights = qtys
+        try:
+            total = int(tx.get('total', 0))
+        except (TypeError, ValueError):
+            total = 0
+        subtotals = split_total(total, weights)
     else:
-        # No valid chain found -> keep fresh genesis and save it
-        save_chain_to_file(shop_chain)
-        app.logger.info("No valid chain found; created new chain and saved.")
+        subtotals = [item.get('subtotal', 0) for item in items]
+
+    priced = []
+    for item, product, subtotal in zip(items, products, subtotals):
+        qty = item.get('qty', 1)
+        priced.append({'name': product.name if legacy and product else item.get('name'),
+                       'qty': qty,
+                       'price': (subtotal // qty if qty else subtotal) if legacy else item.get('unit_price', 0),
+                       'subtotal': subtotal,
+                       'category': product.category if product else 'Umum'})
+    return priced
+
+# Gauge dihitung saat scrape saja (tanpa overhead di hot path); chain belum dimuat -> gauge dilewati
+metrics_registry.gauge('chain_height', 'Blocks in the active chain.', lambda: len(chain_storage.shop_chain.chain))
+metrics_registry.gauge('chain_transactions', 'Transactions in the active chain.',
+                       lambda: chain_storage.shop_chain.count_transactions())
+metrics_registry.gauge('mempool_size', 'Transactions waiting to be sealed.', block_producer.pending_count)
+metrics_registry.gauge('chain_persist_queue_depth', 'Chain states waiting for the writer.', chain_persister.queue_depth)
+metrics_registry.gauge('chain_persister_events', 'Write-behind persister counters.',
+                       lambda: {(k,): v for k, v in chain_persister.stats.items()}, ('event',))
+metrics_registry.gauge('chain_store_lock_events', 'Chain store lock acquisitions and total wait seconds.',
+                       lambda: {('acquisitions',): store_lock.acquisitions,
+                                ('wait_seconds',): store_lock.wait_seconds}, ('event',))
+metrics_registry.gauge('log_pipeline_events', 'Log pipeline counters (dropped, sampled_out, written, ...).',
+                       lambda: {(k,): v for k, v in log_pipeline.stats.items()}, ('event',))
+metrics_registry.gauge('session_store_events', 'SQLite session store counters.',
+                       lambda: {(k,): v for k, v in session_store.stats.items()}, ('event',))
+session_store = None  # SQLiteSessionInterface (SESSION_BACKEND=sqlite), dibuat oleh create_app()
 
 # ----------------------------
-# 6. Seeding products & admin
+# 4. Seeding products & admin
 # ----------------------------
 def seed_products():
     if Product.query.count() == 0:
@@ -361,7 +364,7 @@ def seed_products():
         ]
         db.session.bulk_save_objects(products)
         db.session.commit()
-        app.logger.info("Seeded products into database.", extra={'count': len(products)})
+        logger.info("Seeded products into database.", extra={'count': len(products)})
 
 def seed_admin():
     admin = User.query.filter_by(username='admin').first()
@@ -370,18 +373,18 @@ def seed_admin():
         super_admin = User(username='admin', password=hashed_pw, role='admin')
         db.session.add(super_admin)
         db.session.commit()
-        app.logger.info("Default Admin created.", extra={'user': 'admin', 'role': 'admin'})
+        logger.info("Default Admin created.", extra={'user': 'admin', 'role': 'admin'})
     elif not check_password_hash(admin.password, 'admin123'):
         # Fix: If admin exists but password is not default hash (possible plaintext from old bug)
         admin.password = generate_password_hash('admin123')
         db.session.commit()
-        app.logger.warning("Admin password updated to default hash (admin123).")
+        logger.warning("Admin password updated to default hash (admin123).")
 
 # ----------------------------
-# 7. Routes (Front-end & User)
+# 5. Routes (Front-end & User)
 # ----------------------------
-@app.route('/', defaults={'category_name': None})
-@app.route('/katalog/<category_name>')
+@shop.route('/', defaults={'category_name': None})
+@shop.route('/katalog/<category_name>')
 def home(category_name):
     cart_count = 0
     if 'cart' in session and session['cart']:
@@ -389,106 +392,214 @@ def home(category_name):
             cart_count = sum(session['cart'].values())
         except Exception:
             cart_count = sum(int(v) for v in session['cart'].values())
-    if category_name and category_name != 'Semua':
-        products = Product.query.filter_by(category=category_name).all()
+    category = category_name if category_name and category_name != 'Semua' else None
+
+    # Halaman bervariasi per user (navbar, badge cart) -> ikut masuk ETag
+    user_key = (current_user.get_id(), current_user.role) if current_user.is_authenticated else None
+    etag = catalog_cache.etag(category, user_key, session.get('cart') or {})
+    last_modified = datetime.fromtimestamp(int(catalog_cache.last_modified), timezone.utc)
+    if not session.get('_flashes'):
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            # Tanpa ETag hanya halaman anonim + cart kosong yang sama untuk semua pengunjung
+            ims = request.if_modified_since
+            not_modified = ims is not None and user_key is None and not session.get('cart') and last_modified <= ims
+        if not_modified:
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+    if category:
         flash(f"Menampilkan kategori: {category_name}", 'info')
-    else:
-        products = Product.query.all()
-    return render_template('index.html', products=products, cart_count=cart_count)
-
-@app.route('/add_to_cart/<int:product_id>')
+    product_grid = catalog_cache.fragment(
+        category, lambda products: Markup(render_template('product_grid.html', products=products)))
+    response = make_response(render_template('index.html', product_grid=product_grid, cart_count=cart_count))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@shop.route('/add_to_cart/<int:product_id>')
 def add_to_cart(product_id):
-    if 'cart' not in session or session['cart'] is None:
-        session['cart'] = {}
-    p_id = str(product_id)
-    session['cart'][p_id] = session['cart'].get(p_id, 0) + 1
+    qty = request.args.get('qty', 1, type=int)
+    try:
+        session['cart'] = apply_cart_ops(session.get('cart'), [{'op': 'add', 'product_id': product_id, 'qty': qty}],
+                                         product_resolver)
+    except CartError:
+        flash('Produk tidak ditemukan atau jumlah tidak valid.', 'warning')
+        return redirect(url_for('shop.home'))
     session.modified = True
     flash('Produk masuk keranjang!', 'success')
-    return redirect(url_for('home'))
+    return redirect(url_for('shop.home'))
 
-@app.route('/cart')
+@shop.route('/cart')
 def view_cart():
-    cart_items = []
-    total_price = 0
-    if 'cart' in session and session['cart']:
-        for p_id, quantity in session['cart'].items():
-            try:
-                pid = int(p_id)
-            except Exception:
-                continue
-            product = db.session.get(Product, pid)
-            if product:
-                total = product.price * int(quantity)
-                total_price += total
-                cart_items.append({'product': product, 'quantity': int(quantity), 'total': total})
+    cart_items, total_price = price_cart(session.get('cart'), product_resolver)
     return render_template('cart.html', cart_items=cart_items, total=total_price)
 
-@app.route('/checkout', methods=['POST'])
+@shop.route('/api/cart', methods=['GET', 'POST'])
+def api_cart():
+    """GET: isi cart + harga. POST {"ops": [...]}: terapkan semua operasi secara atomic."""
+    if request.method == 'POST':
+        # Wajib application/json (memicu CORS preflight untuk request cross-site)
+        payload = request.get_json(silent=True) if request.is_json else None
+        if not isinstance(payload, dict):
+            return {'error': 'Body harus JSON {"ops": [...]}'}, 400
+        try:
+            session['cart'] = apply_cart_ops(session.get('cart'), payload.get('ops'), product_resolver)
+        except CartError as e:
+            return dict(cart_json(session.get('cart'), product_resolver), error=str(e)), 400
+        session.modified = True
+    return cart_json(session.get('cart'), product_resolver)
+
+@shop.route('/checkout', methods=['POST'])
 @login_required
 def checkout():
     if 'cart' not in session or not session['cart']:
         flash('Keranjang kosong.', 'warning')
-        return redirect(url_for('home'))
-
-    items_summary_list = []
-    total_trx = 0
-
-    for p_id, quantity in session['cart'].items():
-        try:
-            pid = int(p_id)
-        except Exception:
-            continue
-        product = db.session.get(Product, pid)
-        if product:
-            teks_barang = f"{product.name} (x{int(quantity)})"
-            items_summary_list.append(teks_barang)
-            total_trx += product.price * int(quantity)
+        return redirect(url_for('shop.home'))
 
-    final_items_string = ", ".join(items_summary_list)
-
-    app.logger.info("Processing new order.", extra={'user': current_user.username, 'role': current_user.role, 'event': 'ORDER_START', 'value': total_trx})
-
-    # add tx to chain
-    shop_chain.add_transaction(sender=current_user.username, items=final_items_string, total=total_trx)
+    cart_lines, total_trx = price_cart(session['cart'], product_resolver)
+    if not cart_lines:
+        flash('Keranjang kosong.', 'warning')
+        return redirect(url_for('shop.home'))
+    order_items = [{
+        'product_id': line['product'].id,
+        'name': line['product'].name,
+        'unit_price': line['product'].price,
+        'qty': line['quantity'],
+        'subtotal': line['total'],
+    } for line in cart_lines]
 
-    last_block = shop_chain.last_block
-    previous_hash = Blockchain.hash(last_block) if last_block else '1'
-    shop_chain.create_block(proof=12345, previous_hash=previous_hash)
+    logger.info("Processing new order.", extra={'user': current_user.username, 'role': current_user.role, 'event': 'ORDER_START', 'value': total_trx})
 
-    # persist chain safely
-    save_chain_to_file(shop_chain)
+    # add tx to mempool; the block producer seals it into a block shortly
+    tx_id = block_producer.submit(sender=current_user.username, items=order_items, total=total_trx)
 
-    app.logger.info("Transaction mined.", extra={'user': current_user.username, 'value': total_trx, 'block_index': shop_chain.last_block['index']})
+    logger.info("Transaction queued.", extra={'user': current_user.username, 'value': total_trx, 'tx_id': tx_id})
 
     # clear cart only
     session.pop('cart', None)
     session.modified = True
-    flash('Pembayaran Berhasil!', 'success')
-    return redirect(url_for('history'))
+    flash(f'Pembayaran Berhasil! ID transaksi: {tx_id}', 'success')
+    return redirect(url_for('shop.history'))
 
-@app.route('/history')
+@shop.route('/history')
 @login_required
 def history():
     if current_user.role != 'buyer':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
-    riwayat = shop_chain.get_transactions_by_user(current_user.username)
+        return redirect(url_for('shop.home'))
+    # Optional paging: ?limit=N&before=<cursor> (cursor = posisi transaksi user)
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
+    if limit is not None and limit <= 0:
+        limit = None
+    chain_obj = get_chain()
+    total_count = chain_obj.count_transactions_by_user(current_user.username)
+    riwayat = chain_obj.get_transactions_by_user(current_user.username, limit=limit, before=before)
+
+    end = total_count if before is None else max(0, min(before, total_count))
+    older_cursor = end - len(riwayat) if limit is not None and end - len(riwayat) > 0 else None
+
+    # Order yang masih di mempool (belum masuk block) ditampilkan sebagai pending
+    if before is None:
+        for tx in block_producer.pending(current_user.username):
+            tx['block_index'] = None
+            riwayat.append(tx)
 
-    # Preprocess each transaction to build items_list (safe parsing)
     for tx in riwayat:
-        items_raw = tx.get('items')
-        items_list = []
-        try:
-            if isinstance(items_raw, str):
-                items_list = [s.strip() for s in items_raw.split(',') if s.strip()]
-            else:
-                items_list = [str(items_raw)]
-        except Exception:
-            items_list = [str(items_raw)]
-        tx['items_list'] = items_list
-    return render_template('history.html', history=riwayat)
+        tx['line_items'] = line_items(tx)
+    return render_template('history.html', history=riwayat, limit=limit, older_cursor=older_cursor)
 
-@app.route('/login', methods=['GET', 'POST'])
+@shop.route('/api/tx/<tx_id>')
+@login_required
+def api_tx_status(tx_id):
+    """Status transaksi: pending (di mempool) atau confirmed beserta block index."""
+    info = block_producer.status(tx_id)
+    if info['status'] == 'unknown':
+        # Disegel worker lain (CHAIN_SHARED_STORE), sebelum restart, atau sudah keluar dari cache confirmed
+        tx = get_chain().find_transaction(tx_id)
+        if tx is not None:
+            info = {'status': 'confirmed', 'block_index': tx['block_index'], 'sender': tx.get('sender')}
+    if info['status'] == 'unknown' or (info['sender'] != current_user.username and current_user.role != 'admin'):
+        return {'tx_id': tx_id, 'status': 'unknown'}, 404
+    return {'tx_id': tx_id, 'status': info['status'], 'block_index': info['block_index']}
+
+@shop.route('/api/tx/<int:block_index>/<int:tx_index>/proof')
+@login_required
+def api_tx_proof(block_index, tx_index):
+    """Bukti inklusi: transaksi + Merkle branch + header bertanda tangan (cek dengan merkle.verify_inclusion)."""
+    chain_obj = get_chain()
+    found = chain_obj.get_blocks(block_index, 1) if block_index >= 1 else []
+    if not found:
+        return {'error': f'Block #{block_index} tidak ditemukan.'}, 404
+    pos, block = found[0]
+    txs = block.get('transactions', [])
+    if not 0 <= tx_index < len(txs) or (txs[tx_index].get('sender') != current_user.username
+                                         and current_user.role != 'admin'):
+        return {'error': 'Transaksi tidak ditemukan.'}, 404
+    if 'merkle_root' not in block or 'header_signature' not in block:
+        return {'error': f'Block #{block_index} dibuat sebelum Merkle root tersedia.'}, 409
+    header_signature = sign_header(SECRET_CHAIN_KEY, block)
+    if not hmac.compare_digest(header_signature, str(block['header_signature'])) and not verify_block_signature(block):
+        # header_signature lama (tanpa tag domain) hanya diganti jika isi block masih sah
+        return {'error': f'Block #{block_index} tidak lolos verifikasi signature.'}, 409
+    return {
+        'block_index': block_index,
+        'tx_index': tx_index,
+        'transaction': txs[tx_index],
+        'branch': chain_obj.merkle_proof(pos, tx_index),
+        'header': block_header(block),
+        'header_signature': header_signature,
+    }
+
+TX_QUERY_LIMIT = 50
+TX_QUERY_MAX_LIMIT = 500
+
+def parse_time_arg(value):
+    """Unix timestamp (angka) atau tanggal/waktu ISO (YYYY-MM-DD[THH:MM[:SS]]) -> float."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def parse_int_arg(value):
+    return None if value is None or value == '' else int(value)
+
+@shop.route('/api/transactions')
+@login_required
+def api_transactions():
+    """Query transaksi: ?since=&until=&min_total=&max_total=&sender=&limit=&cursor=
+
+    Admin bisa memfilter sender mana pun; buyer selalu dibatasi ke transaksinya sendiri.
+    `next` = cursor halaman berikutnya (None jika habis).
+    """
+    try:
+        since = parse_time_arg(request.args.get('since'))
+        until = parse_time_arg(request.args.get('until'))
+        min_total = parse_int_arg(request.args.get('min_total'))
+        max_total = parse_int_arg(request.args.get('max_total'))
+        limit = min(max(1, request.args.get('limit', TX_QUERY_LIMIT, type=int)), TX_QUERY_MAX_LIMIT)
+    except ValueError as e:
+        return {'error': f'Parameter tidak valid: {e}'}, 400
+    sender = request.args.get('sender') or None
+    if current_user.role != 'admin':
+        sender = current_user.username
+    try:
+        txs, order, next_cursor = get_chain().query_transactions(
+            since=since, until=until, min_total=min_total, max_total=max_total,
+            sender=sender, limit=limit, cursor=request.args.get('cursor') or None)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {'order': order, 'limit': limit, 'count': len(txs), 'next': next_cursor, 'transactions': txs}
+
+@shop.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
@@ -498,20 +609,20 @@ def login():
 
         if user and check_password_hash(user.password, password):
             login_user(user)
-            app.logger.info("User logged in.", extra={'user': username, 'role': user.role})
+            logger.info("User logged in.", extra={'user': username, 'role': user.role})
             flash(f"Berhasil login! Selamat datang kembali, {user.username}.", "success")
             # redirect admin to admin dashboard
             if user.role == 'admin':
-                return redirect(url_for('admin_dashboard'))
-            return redirect(url_for('home'))
+                return redirect(url_for('shop.admin_dashboard'))
+            return redirect(url_for('shop.home'))
         else:
-            app.logger.warning("Failed login attempt.", extra={'user': username})
+            logger.warning("Failed login attempt.", extra={'user': username})
             flash("Username atau password salah!", "danger")
-            return redirect(url_for('login'))
+            return redirect(url_for('shop.login'))
 
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@shop.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
@@ -519,12 +630,12 @@ def register():
 
         if not username or not password:
             flash("Username dan password wajib diisi.", "warning")
-            return redirect(url_for('register'))
+            return redirect(url_for('shop.register'))
 
         existing = User.query.filter_by(username=username).first()
         if existing:
             flash("Akun sudah terdaftar! Silakan login.", "warning")
-            return redirect(url_for('register'))
+            return redirect(url_for('shop.register'))
 
         hashed = generate_password_hash(password)
         user = User(username=username, password=hashed, role='buyer')
@@ -532,328 +643,490 @@ def register():
         db.session.commit()
 
         flash("Registrasi berhasil! Anda sudah dapat login.", "success")
-        return redirect(url_for('login'))
+        return redirect(url_for('shop.login'))
 
     return render_template('register.html')
 
-@app.route('/logout')
+@shop.route('/logout')
 @login_required
 def logout():
-    app.logger.info("User logged out.", extra={'user': current_user.username})
+    logger.info("User logged out.", extra={'user': current_user.username})
     logout_user()
     # remove only user-related session keys (don't clear whole session)
     session.pop('cart', None)
     session.modified = True
-    return redirect(url_for('home'))
+    return redirect(url_for('shop.home'))
 
-@app.route('/debug_session')
+@shop.route('/debug_session')
 def debug_session():
     return {"cart": session.get('cart')}
 
 # ----------------------------
-# 8. Routes (Admin Tools & Blockchain Explorer)
+# 6. Routes (Admin Tools & Blockchain Explorer)
 # ----------------------------
-@app.route('/admin')
+ADMIN_TX_PAGE_SIZE = 50
+
+@shop.route('/admin')
 @login_required
 def admin_dashboard():
     if current_user.role != 'admin':
         flash('Akses Ditolak! Anda bukan Admin.', 'danger')
-        return redirect(url_for('home'))
+        return redirect(url_for('shop.home'))
+
+    # Hanya halaman transaksi terbaru (cursor = index block); total & jumlah transaksi dari rollup
+    chain_obj = get_chain()
+    transactions, older_cursor = chain_obj.recent_transactions(ADMIN_TX_PAGE_SIZE,
+                                                                before=request.args.get('before', type=int))
+    for tx in transactions:
+        tx["detailed_items"] = priced_items(tx)
 
-    all_transactions = shop_chain.get_all_transactions()
-    
-    # CRITICAL FIX: Preprocess items for safe rendering and detailed view
-    for tx in all_transactions:
-        tx["detailed_items"] = [] 
-        raw = tx.get('items', "")
-        
-        # Split string transaksi ("Item (xQty)")
-        if isinstance(raw, str):
-            for item_str in raw.split(','):
-                item_str = item_str.strip()
-                if not item_str: continue
-
-                try:
-                    # 1. Parsing Nama dan Qty dari format "Nama Produk (xQty)"
-                    # rsplit(' (x', 1) memisahkan "Nama Produk" dan "Qty)"
-                    name_qty_str, qty_part = item_str.rsplit(' (x', 1) 
-                    name = name_qty_str.strip()
-                    
-                    # 2. Ambil Quantity yang bersih (hapus kurung tutup ')' )
-                    # Contoh: "1)" menjadi "1"
-                    qty_str = qty_part.strip().rstrip(')')
-                    qty_clean = int(qty_str) if qty_str.isdigit() else 1
-
-                    # 3. Cari produk (Case Insensitive Search)
-                    # Tambahkan db.func.lower untuk mencari tanpa case sensitivity
-                    product = Product.query.filter(
-                        db.func.lower(Product.name) == db.func.lower(name)
-                    ).first()
-                    
-                    # Fallback ke pencarian biasa jika pencarian lower gagal
-                    if not product:
-                        product = Product.query.filter_by(name=name).first()
-                    
-                    price_clean = product.price if product else 0
-
-                    tx["detailed_items"].append({
-                        'name': name,
-                        'qty': qty_clean,
-                        'price': price_clean, 
-                        'subtotal': (price_clean * qty_clean) 
-                    })
-                except ValueError:
-                    # Menangani format yang tidak sesuai ("Item (xQty)")
-                    tx["detailed_items"].append({
-                        'name': item_str,
-                        'qty': 1,
-                        'price': 0,
-                        'subtotal': 0
-                    })
-                except Exception:
-                    # Fallback jika error lainnya
-                    tx["detailed_items"].append({
-                        'name': item_str,
-                        'qty': 1,
-                        'price': 0,
-                        'subtotal': 0
-                    })
-        else:
-            tx["detailed_items"] = [{'name': str(raw), 'qty': 1, 'price': 0, 'subtotal': 0}]
-            
     all_users = User.query.all()
-    total_revenue = sum(int(tx.get('total', 0)) for tx in all_transactions)
+    # O(1): total dari rollup (hanya block yang belum ter-apply yang diproses)
+    sync_sales_rollup(chain_obj.chain, persist=False)
+    totals = sales_rollup.totals()
 
     return render_template('admin.html',
-                           transactions=all_transactions,
+                           transactions=transactions,
                            users=all_users,
-                           revenue=total_revenue)
+                           revenue=totals['revenue'],
+                           total_transactions=totals['orders'],
+                           older_cursor=older_cursor)
+
+ANALYTICS_TOP_N = 20
+
+@shop.route('/admin/analytics')
+@login_required
+def admin_analytics():
+    if current_user.role != 'admin':
+        flash('Akses Ditolak! Anda bukan Admin.', 'danger')
+        return redirect(url_for('shop.home'))
+    sync_sales_rollup(get_chain().chain, persist=False)
+    return render_template('admin_analytics.html',
+                           totals=sales_rollup.totals(),
+                           height=sales_rollup.height,
+                           by_day=sales_rollup.breakdown('by_day', limit=30),
+                           by_product=sales_rollup.breakdown('by_product', limit=ANALYTICS_TOP_N),
+                           by_category=sales_rollup.breakdown('by_category'),
+                           by_buyer=sales_rollup.breakdown('by_buyer', limit=ANALYTICS_TOP_N))
+
+@shop.route('/admin/analytics/rebuild', methods=['POST'])
+@login_required
+def admin_rebuild_analytics():
+    if current_user.role != 'admin':
+        flash('Akses Ditolak.', 'danger')
+        return redirect(url_for('shop.home'))
+    try:
+        # Block dibaca satu per satu (layout compact: tanpa materialisasi seluruh chain)
+        blocks = sales_rollup.rebuild(get_chain().chain)
+        with store_lock:  # file rollup juga ditulis writer (dan worker lain)
+            sales_rollup.save()
+        flash(f'Rollup penjualan dibangun ulang dari {blocks} block.', 'success')
+        logger.info("Admin rebuilt sales rollup", extra={'user': current_user.username, 'height': blocks})
+    except Exception as e:
+        logger.error("Sales rollup rebuild failed: %s", e)
+        flash('Rebuild rollup gagal: ' + str(e), 'danger')
+    return redirect(url_for('shop.admin_analytics'))
 
 # app.py: Ganti fungsi explorer() yang sudah ada (untuk data explorer)
-@app.route('/explorer')
+EXPLORER_PAGE_SIZE = 20
+EXPLORER_MAX_PAGE_SIZE = 100
+
+def explorer_block(pos, block):
+    """View block untuk explorer / API (salinan: block asli yang ditandatangani tidak diubah)."""
+    txs = [dict(tx, line_items=line_items(tx)) for tx in block.get('transactions', [])]
+    return {
+        'index': block.get('index'),
+        'timestamp': block.get('timestamp'),
+        'tx_count': len(txs),
+        'previous_hash': block.get('previous_hash'),
+        'hash': get_chain().block_hash(pos),
+        'proof': block.get('proof'),
+        'signature': block.get('signature', 'N/A'),
+        'transactions': txs
+    }
+
+def explorer_page_size():
+    limit = request.args.get('limit', EXPLORER_PAGE_SIZE, type=int)
+    return max(1, min(limit, EXPLORER_MAX_PAGE_SIZE))
+
+@shop.route('/explorer')
 @login_required
 def explorer():
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
-    
-    chain = shop_chain.chain
-    blocks = []
-    for b in chain:
-        txs = []
-        # Menggunakan logika parsing items_list agar Explorer berfungsi
-        for tx in b.get('transactions', []):
-            raw = tx.get('items', "")
-            if isinstance(raw, str):
-                tx["items_list"] = [s.strip() for s in raw.split(',') if s.strip()]
-            else:
-                tx["items_list"] = [str(raw)]
-            txs.append(tx)
-
-        blocks.append({
-            'index': b.get('index'),
-            'timestamp': format_datetime(b.get('timestamp')),
-            'tx_count': len(txs),
-            'previous_hash': b.get('previous_hash'),
-            'proof': b.get('proof'),
-            'signature': b.get('signature', 'N/A'),
-            'transactions': txs
-        })
-    total_blocks = len(blocks)
-    total_txs = sum(b['tx_count'] for b in blocks)
-    return render_template('explorer.html', blocks=blocks, total_blocks=total_blocks, total_txs=total_txs)
-
-@app.route('/admin/backup/download/<path:filename>')
+        return redirect(url_for('shop.home'))
+
+    # Cursor = index block; halaman berisi block terbaru dengan index < before
+    limit = explorer_page_size()
+    chain_obj = get_chain()
+    total_blocks = len(chain_obj.chain)
+    before = request.args.get('before', total_blocks + 1, type=int)
+    before = max(1, min(before, total_blocks + 1))
+    start = max(1, before - limit)
+    blocks = [explorer_block(pos, b) for pos, b in chain_obj.get_blocks(start, before - start)]
+    older_cursor = start if start > 1 else None
+
+    total_txs = chain_obj.count_transactions()
+    return render_template('explorer.html', blocks=blocks, total_blocks=total_blocks, total_txs=total_txs,
+                           older_cursor=older_cursor, limit=limit)
+
+@shop.route('/api/blocks')
+@login_required
+def api_blocks():
+    """Block berurutan naik: ?from=<index>&limit=N. `next` = cursor halaman berikutnya (None jika habis)."""
+    if current_user.role != 'admin':
+        return {'error': 'Akses Ditolak.'}, 403
+    start = max(1, request.args.get('from', 1, type=int))
+    limit = explorer_page_size()
+    chain_obj = get_chain()
+    blocks = [explorer_block(pos, b) for pos, b in chain_obj.get_blocks(start, limit)]
+    height = len(chain_obj.chain)
+    next_index = start + limit if start + limit <= height else None
+    return {'height': height, 'from': start, 'limit': limit, 'next': next_index, 'blocks': blocks}
+
+@shop.route('/api/blocks/<int:index>')
+@login_required
+def api_block(index):
+    if current_user.role != 'admin':
+        return {'error': 'Akses Ditolak.'}, 403
+    found = get_chain().get_blocks(index, 1) if index >= 1 else []
+    if not found:
+        return {'error': f'Block #{index} tidak ditemukan.'}, 404
+    return explorer_block(*found[0])
+
+@shop.route('/metrics')
+def metrics():
+    """Prometheus text format. Wajib METRICS_TOKEN, atau opt-in METRICS_ALLOW_LOOPBACK untuk localhost."""
+    if METRICS_TOKEN:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+            return Response('unauthorized\n', status=401, content_type='text/plain')
+    elif not METRICS_ALLOW_LOOPBACK or request.remote_addr not in ('127.0.0.1', '::1'):
+        return Response('forbidden\n', status=403, content_type='text/plain')
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@shop.route('/admin/profiles', methods=['GET', 'POST'])
+@login_required
+def admin_profiles():
+    if current_user.role != 'admin':
+        flash('Akses Ditolak! Anda bukan Admin.', 'danger')
+        return redirect(url_for('shop.home'))
+    token = None
+    if request.method == 'POST':
+        # Token untuk memprofil request dari luar browser (curl, load test) tanpa session admin
+        token = make_profile_token(request_profiler.secret, current_user.id, ttl=PROFILE_TOKEN_TTL)
+        logger.info("Admin created profiling token", extra={'user': current_user.username})
+    selected = request_profiler.get(request.args.get('id', type=int)) if request.args.get('id') else None
+    return render_template('admin_profiles.html',
+                           profiles=request_profiler.list(),
+                           selected=selected,
+                           summary=summarize_profile(selected) if selected else None,
+                           token=token,
+                           token_ttl=PROFILE_TOKEN_TTL,
+                           sample_rate=PROFILE_SAMPLE_RATE,
+                           mode=PROFILE_MODE)
+
+@shop.route('/admin/profiles/<int:profile_id>/download')
+@login_required
+def admin_profile_download(profile_id):
+    if current_user.role != 'admin':
+        flash('Akses Ditolak.', 'danger')
+        return redirect(url_for('shop.home'))
+    entry = request_profiler.get(profile_id)
+    if entry is None:
+        flash('Profil tidak ditemukan (sudah tergeser dari buffer).', 'warning')
+        return redirect(url_for('shop.admin_profiles'))
+    if entry['format'] == 'prof':
+        name, mimetype = f'profile-{profile_id}.prof', 'application/octet-stream'
+    else:
+        name, mimetype = f'profile-{profile_id}.folded.txt', 'text/plain'
+    return send_file(io.BytesIO(entry['payload']), as_attachment=True, download_name=name, mimetype=mimetype)
+
+@shop.route('/admin/backup/download/<path:filename>')
 @login_required
 def admin_download_backup(filename):
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
+        return redirect(url_for('shop.home'))
     
+    refresh_backups()
+    if backup_store.has_snapshot(filename):
+        # Snapshot incremental -> rakit ulang menjadi format legacy single-JSON
+        payload = json.dumps(backup_store.restore(filename), indent=2, ensure_ascii=False).encode('utf-8')
+        return send_file(io.BytesIO(payload), as_attachment=True, download_name=filename,
+                         mimetype='application/json')
+
     fpath = os.path.join(CHAIN_BACKUP_DIR, filename)
     # Security Check: Prevent directory traversal
     if not os.path.exists(fpath) or not fpath.startswith(CHAIN_BACKUP_DIR):
         flash('File tidak ditemukan atau akses ditolak.', 'warning')
-        return redirect(url_for('admin_backups'))
+        return redirect(url_for('shop.admin_backups'))
     
     return send_file(fpath, as_attachment=True)
 
 
 # Admin Backup & Restore Routes
-@app.route('/admin/backups')
+@shop.route('/admin/backups')
 @login_required
 def admin_backups():
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
-    files = []
-    if os.path.exists(CHAIN_BACKUP_DIR):
-        # List files, filter, and sort (reverse=True for latest first)
-        all_files = os.listdir(CHAIN_BACKUP_DIR)
-        backup_files = [f for f in all_files if f.startswith('blockchain_') and f.endswith('.json')]
-        files = sorted(backup_files, reverse=True)
+        return redirect(url_for('shop.home'))
+    # Snapshot incremental (dari manifest) + backup legacy, terbaru lebih dulu
+    refresh_backups()
+    files = sorted(set(backup_store.list_snapshots()) | set(list_legacy_backups()), reverse=True)
     return render_template('admin_backups.html', backups=files)
 
-@app.route('/admin/restore', methods=['POST'])
+@shop.route('/admin/restore', methods=['POST'])
 @login_required
 def admin_restore():
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
+        return redirect(url_for('shop.home'))
         
     filename = request.form.get('filename')
     if not filename:
         flash('File tidak dipilih.', 'warning')
-        return redirect(url_for('admin_backups'))
+        return redirect(url_for('shop.admin_backups'))
         
     src = os.path.join(CHAIN_BACKUP_DIR, filename)
-    if not os.path.exists(src):
+    refresh_backups()
+    if not backup_store.has_snapshot(filename) and (
+            not os.path.exists(src) or not src.startswith(CHAIN_BACKUP_DIR)):
         flash('Backup tidak ditemukan.', 'danger')
-        return redirect(url_for('admin_backups'))
+        return redirect(url_for('shop.admin_backups'))
         
     try:
-        # Load and validate before replacing
-        with open(src, 'r', encoding='utf-8') as f:
-            data_to_restore = json.load(f)
-            
-        # Write to temp file, then atomic replace the main chain file
-        tmp = BLOCKCHAIN_FILE + '.tmp'
-        with open(tmp, 'w', encoding='utf-8') as wf:
-            json.dump(data_to_restore, wf, indent=2, ensure_ascii=False)
-        os.replace(tmp, BLOCKCHAIN_FILE)
-        
-        # Reload to memory and re-verify integrity
-        loaded = load_chain_from_file_safe()
-        if loaded:
-            global shop_chain
-            shop_chain = Blockchain(chain=loaded)
-            flash(f'Backup {filename} berhasil direstore.', 'success')
-            app.logger.info("Admin restored chain from backup", extra={'user': current_user.username, 'backup': filename})
+        # Streaming: setiap block diverifikasi saat dibaca, block rusak pertama membatalkan restore
+        if backup_store.has_snapshot(filename):
+            imported = import_chain_stream(backup_store.iter_blocks(filename))
         else:
-            flash('Restore gagal: file backup corrupt atau tidak valid.', 'danger')
-            # Fallback will attempt to load latest good chain
-            
+            with open(src, 'rb') as f:
+                imported = import_chain_stream(iter_blocks(f))
+        flash(f'Backup {filename} berhasil direstore.', 'success')
+        logger.info("Admin restored chain from backup",
+                        extra={'user': current_user.username, 'backup': filename, 'height': len(imported.chain)})
+    except ValueError as e:
+        logger.warning("Restore rejected: %s", e)
+        flash(f'Restore gagal: file backup corrupt atau tidak valid ({e}).', 'danger')
     except Exception as e:
-        app.logger.error("Restore error: %s", e)
+        logger.error("Restore error: %s", e)
         flash('Restore gagal karena kesalahan server: ' + str(e), 'danger')
         
-    return redirect(url_for('admin_backups'))
+    return redirect(url_for('shop.admin_backups'))
 
-@app.route('/admin/export_chain')
+@shop.route('/admin/export_chain')
 @login_required
 def admin_export_chain():
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
-    if not os.path.exists(BLOCKCHAIN_FILE):
-        flash('Tidak ada chain untuk diekspor.', 'warning')
-        return redirect(url_for('admin_dashboard'))
-    return send_file(BLOCKCHAIN_FILE, as_attachment=True, download_name='devsecops_blockchain.json')
+        return redirect(url_for('shop.home'))
+    fmt = request.args.get('format', 'json')
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+    if fmt not in EXPORT_FORMATS:
+        flash('Format export tidak dikenal.', 'warning')
+        return redirect(url_for('shop.admin_backups'))
+    # Pastikan semua block yang masih antre sudah tertulis sebelum diekspor
+    chain_persister.flush()
+    if CHAIN_STORAGE == 'legacy':
+        if fmt == 'json' and not compress:
+            if not os.path.exists(BLOCKCHAIN_FILE):
+                flash('Tidak ada chain untuk diekspor.', 'warning')
+                return redirect(url_for('shop.admin_dashboard'))
+            return send_file(BLOCKCHAIN_FILE, as_attachment=True, download_name='devsecops_blockchain.json')
+        chain_obj = get_chain()
+        records = (chain_obj.block_record(p) for p in range(len(chain_obj.chain)))
+    else:
+        # Segment store -> stream record langsung dari disk (memori konstan);
+        # get_chain() mengejar manifest yang mungkin sudah ditulis worker lain.
+        # Segment dibuka di bawah store_lock: import/restore (juga di worker lain) yang menghapus
+        # segment lama setelahnya tidak memotong download yang sedang berjalan
+        get_chain()
+        with store_lock:
+            records = chain_store.iter_records()
+    filename = 'devsecops_blockchain.' + fmt + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('application/x-ndjson' if fmt == 'ndjson' else 'application/json')
+    return Response(export_chunks(records, fmt, compress), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@shop.route('/admin/audit_chain', methods=['POST'])
+@login_required
+def admin_audit_chain():
+    if current_user.role != 'admin':
+        flash('Akses Ditolak.', 'danger')
+        return redirect(url_for('shop.home'))
+    chain_persister.flush()
+    try:
+        report = audit_chain(get_chain())
+        flash(f"Audit penuh berhasil: {report['height']} block valid "
+              f"({report['blocks_per_second']} block/detik).", 'success')
+        logger.info("Admin ran full chain audit", extra={'user': current_user.username, 'report': report})
+    except Exception as e:
+        logger.error("Chain audit failed: %s", e)
+        flash('Audit gagal: ' + str(e), 'danger')
+    return redirect(url_for('shop.admin_backups'))
 
-@app.route('/admin/import_chain', methods=['POST'])
+@shop.route('/admin/import_chain', methods=['POST'])
 @login_required
 def admin_import_chain():
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('home'))
+        return redirect(url_for('shop.home'))
         
     f = request.files.get('file')
     if not f or f.filename == '':
         flash('File tidak diunggah.', 'warning')
-        return redirect(url_for('admin_backups'))
+        return redirect(url_for('shop.admin_backups'))
         
     try:
-        data = json.load(f.stream)
-        # Attempt to validate and write to temp/replace
-        
-        tmp = BLOCKCHAIN_FILE + '.tmp'
-        with open(tmp, 'w', encoding='utf-8') as wf:
-            json.dump(data, wf, indent=2, ensure_ascii=False)
-        os.replace(tmp, BLOCKCHAIN_FILE)
-        
-        # Verify and reload
-        loaded = load_chain_from_file_safe()
-        if loaded:
-            global shop_chain
-            shop_chain = Blockchain(chain=loaded)
-            flash('Import chain berhasil dan diterapkan.', 'success')
-            app.logger.info("Admin imported chain", extra={'user': current_user.username})
-        else:
-            flash('Import gagal: data invalid atau korup.', 'danger')
-            
+        # Streaming: parse + verifikasi block satu per satu langsung dari upload (JSON array / NDJSON / .gz)
+        imported = import_chain_stream(iter_blocks(f.stream))
+        flash('Import chain berhasil dan diterapkan.', 'success')
+        logger.info("Admin imported chain", extra={'user': current_user.username, 'height': len(imported.chain)})
+    except ValueError as e:
+        logger.warning("Import rejected: %s", e)
+        flash(f'Import gagal: data invalid atau korup ({e}).', 'danger')
     except Exception as e:
-        app.logger.error("Import error: %s", e)
+        logger.error("Import error: %s", e)
         flash('Import gagal karena kesalahan format file atau server: ' + str(e), 'danger')
         
-    return redirect(url_for('admin_backups'))
-@app.route('/admin/delete_user/<int:user_id>', methods=['POST'])
+    return redirect(url_for('shop.admin_backups'))
+@shop.route('/admin/delete_user/<int:user_id>', methods=['POST'])
 @login_required
 def admin_delete_user(user_id):
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     user = db.session.get(User, user_id)
     if not user:
         flash('Pengguna tidak ditemukan.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     # Mencegah admin menghapus dirinya sendiri
     if user.id == current_user.id:
         flash('Anda tidak dapat menghapus akun Anda sendiri.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     username = user.username
     try:
         db.session.delete(user)
         db.session.commit()
         flash(f'Pengguna "{username}" berhasil dihapus.', 'success')
-        app.logger.info("Admin deleted user", extra={'admin_user': current_user.username, 'deleted_user': username})
+        logger.info("Admin deleted user", extra={'admin_user': current_user.username, 'deleted_user': username})
     except IntegrityError:
         db.session.rollback()
         flash('Gagal menghapus pengguna karena terkait dengan data lain (mis. transaksi).', 'danger')
     except Exception as e:
         db.session.rollback()
-        app.logger.error("User deletion error: %s", e)
+        logger.error("User deletion error: %s", e)
         flash('Gagal menghapus pengguna karena error server.', 'danger')
 
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('shop.admin_dashboard'))
 
 
-@app.route('/admin/change_role/<int:user_id>', methods=['POST'])
+@shop.route('/admin/change_role/<int:user_id>', methods=['POST'])
 @login_required
 def admin_change_role(user_id):
     if current_user.role != 'admin':
         flash('Akses Ditolak.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     user = db.session.get(User, user_id)
     new_role = request.form.get('new_role')
 
     if not user or new_role not in ['admin', 'buyer']:
         flash('Data tidak valid.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     if user.id == current_user.id and new_role != 'admin':
         flash('Anda tidak dapat menghapus hak admin dari akun Anda sendiri.', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('shop.admin_dashboard'))
 
     old_role = user.role
     user.role = new_role
     db.session.commit()
     flash(f'Peran pengguna "{user.username}" diubah dari {old_role} menjadi {new_role}.', 'success')
-    app.logger.info("Admin changed user role", extra={'admin_user': current_user.username, 'target_user': user.username, 'new_role': new_role})
+    logger.info("Admin changed user role", extra={'admin_user': current_user.username, 'target_user': user.username, 'new_role': new_role})
 
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('shop.admin_dashboard'))
 
 # ----------------------------
-# 9. App start
+# 7. App factory & start
 # ----------------------------
+def create_app(config=None):
+    """Bangun Flask app: DB, session, Talisman, hook logging/metrics/profiling, blueprint, warm-up chain.
+
+    `config` menimpa app.config (mis. {'CHAIN_WARMUP': 'lazy'} untuk skrip/test).
+    """
+    global session_store
+    app = Flask(__name__, static_folder='static', template_folder='templates')
+    app.config['SECRET_KEY'] = SECRET_KEY
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ecommerce.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Session config: 'sqlite' (satu file WAL + sweeper expiry) atau 'filesystem' (Flask-Session lama)
+    app.config["SESSION_PERMANENT"] = True
+    app.config["SESSION_USE_SIGNER"] = True
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+    app.config['CHAIN_WARMUP'] = CHAIN_WARMUP
+    app.config.update(config or {})
+    if SESSION_BACKEND == 'sqlite':
+        session_store = SQLiteSessionInterface(SESSION_DB_FILE,
+                                               sweep_interval=SESSION_SWEEP_INTERVAL,
+                                               use_signer=app.config["SESSION_USE_SIGNER"],
+                                               logger=logger)
+        app.session_interface = session_store
+        atexit.register(session_store.stop)
+    else:
+        app.config["SESSION_TYPE"] = "filesystem"
+        app.config["SESSION_FILE_DIR"] = SESSION_DIR
+        if not os.path.exists(SESSION_DIR):
+            os.makedirs(SESSION_DIR, exist_ok=True)
+        Session(app)
+
+    # CSP lihat `csp` di section 1
+    Talisman(app, force_https=False, content_security_policy=csp)
+
+    log_pipeline.start()
+    atexit.register(log_pipeline.stop)  # atexit LIFO: berjalan setelah writer/producer selesai menulis log
+    if log_pipeline.handler not in logger.handlers:
+        logger.addHandler(log_pipeline.handler)
+    logger.setLevel(logging.INFO)
+    logger.info("Application starting up.")
+
+    metrics_registry.configure(METRICS_DIR or None, flush_interval=METRICS_FLUSH_INTERVAL).start()
+    atexit.register(metrics_registry.stop)
+
+    db.init_app(app)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _count_query)
+        event.listen(db.engine, 'after_cursor_execute', _profile_query)
+    login_manager.init_app(app)
+
+    # Urutan hook sama seperti sebelumnya: after_request dijalankan terbalik (metrics dulu, lalu profiler)
+    app.before_request(_metrics_start)
+    app.before_request(_profile_start)
+    app.after_request(_profile_response)
+    app.teardown_request(_profile_teardown)
+    app.after_request(_metrics_finish)
+    app.register_blueprint(shop)
+
+    # Rollup penjualan butuh katalog produk (DB) -> app context
+    configure_rollup(priced_items, app.app_context)
+    atexit.register(chain_storage.shutdown)  # seal sisa mempool + flush writer sebelum log pipeline berhenti
+
+    if app.config['CHAIN_WARMUP'] == 'eager':
+        chain_storage.warm_up()
+    elif app.config['CHAIN_WARMUP'] == 'background':
+        chain_storage.warm_up(background=True)
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
         seed_products()
         seed_admin()
         # Ensure current shop_chain persisted
-        save_chain_to_file(shop_chain)
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5002)))
\ No newline at end of file
+        chain_persister.submit(get_chain(), wait=True)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5002)))
@@ -0,0 +1,151 @@
+# block_producer.py — Thread-safe mempool + batched block production
+# --------------------------------------------------------------------------
+# Checkout hanya memasukkan transaksi ke mempool dan langsung mendapat tx_id.
+# Producer thread menyegel (seal) block ketika mempool mencapai `max_txs`
+# transaksi ATAU `window_ms` sudah lewat sejak transaksi pertama masuk,
+# sehingga banyak order berbagi satu block (satu signature, satu hash).
+#
+# `seal_fn(transactions, proof)` (opsional) menggantikan penyegelan default
+# chain_getter().seal_transactions, mis. untuk store bersama antar worker yang
+# harus menyegel di bawah lock antar-process. Jika seal gagal, batch kembali ke
+# depan mempool dan dicoba lagi setelah window berikutnya.
+# --------------------------------------------------------------------------
+import threading
+import time
+from collections import OrderedDict
+
+PRODUCER_MODES = ('batched', 'immediate')
+
+
+class BlockProducer:
+    def __init__(self, chain_getter, build_tx, max_txs=500, window_ms=200, proof=12345,
+                 mode='batched', on_block=None, logger=None, confirmed_cache=100000, seal_fn=None):
+        if mode not in PRODUCER_MODES:
+            raise ValueError(f"Unknown producer mode: {mode}")
+        self.chain_getter = chain_getter
+        self.build_tx = build_tx
+        self.max_txs = max(1, int(max_txs))
+        self.window_ms = float(window_ms)
+        self.proof = proof
+        self.mode = mode
+        self.on_block = on_block
+        self.logger = logger
+        self.confirmed_cache = int(confirmed_cache)
+        self.seal_fn = seal_fn or self._seal_default
+
+        self._cond = threading.Condition()
+        self._seal_lock = threading.Lock()  # block disegel berurutan (FIFO)
+        self._mempool = []
+        self._first_pending_at = None
+        self._confirmed = OrderedDict()
+        self._thread = None
+        self._stopping = False
+
+    # ----------------------------
+    # Mempool
+    # ----------------------------
+    def submit(self, sender, items, total):
+        """Masukkan transaksi ke mempool. Return tx_id (status 'pending')."""
+        tx = self.build_tx(sender, items, total)
+        with self._cond:
+            if not self._mempool:
+                self._first_pending_at = time.monotonic()
+            self._mempool.append(tx)
+            self._cond.notify_all()
+        if self.mode == 'immediate':
+            self.seal()
+        else:
+            self._ensure_worker()
+        return tx['tx_id']
+
+    def pending(self, sender=None):
+        with self._cond:
+            return [dict(tx) for tx in self._mempool if sender is None or tx.get('sender') == sender]
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._mempool)
+
+    def status(self, tx_id):
+        """Return dict {'status': pending|confirmed|unknown, 'block_index', 'sender'}."""
+        with self._cond:
+            for tx in self._mempool:
+                if tx.get('tx_id') == tx_id:
+                    return {'status': 'pending', 'block_index': None, 'sender': tx.get('sender')}
+            if tx_id in self._confirmed:
+                block_index, sender = self._confirmed[tx_id]
+                return {'status': 'confirmed', 'block_index': block_index, 'sender': sender}
+        return {'status': 'unknown', 'block_index': None, 'sender': None}
+
+    # ----------------------------
+    # Sealing
+    # ----------------------------
+    def seal(self):
+        """Segel semua transaksi di mempool (maks `max_txs` per block). Return list block baru."""
+        blocks = []
+        with self._seal_lock:
+            while True:
+                with self._cond:
+                    batch = self._mempool[:self.max_txs]
+                    if not batch:
+                        return blocks
+                    del self._mempool[:len(batch)]
+                    self._first_pending_at = time.monotonic() if self._mempool else None
+                try:
+                    block = self.seal_fn(batch, self.proof)
+                except Exception as e:
+                    with self._cond:
+                        self._mempool[:0] = batch
+                        self._first_pending_at = time.monotonic()
+                    if self.logger:
+                        self.logger.error("Sealing block failed; batch returned to mempool: %s", e)
+                    return blocks
+                with self._cond:
+                    for tx in batch:
+                        self._confirmed[tx['tx_id']] = (block['index'], tx.get('sender'))
+                    while len(self._confirmed) > self.confirmed_cache:
+                        self._confirmed.popitem(last=False)
+                blocks.append(block)
+                if self.on_block:
+                    try:
+                        self.on_block(block)
+                    except Exception as e:
+                        if self.logger:
+                            self.logger.error("Block producer callback failed: %s", e)
+
+    def _seal_default(self, transactions, proof):
+        return self.chain_getter().seal_transactions(transactions, proof=proof)
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='block-producer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._mempool and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._mempool:
+                    return
+                # Tunggu sampai block penuh atau jendela waktu habis
+                while self._mempool and len(self._mempool) < self.max_txs and not self._stopping:
+                    remaining = self._first_pending_at + self.window_ms / 1000.0 - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.seal()
+
+    def stop(self, timeout=5.0):
+        """Segel sisa mempool lalu hentikan producer thread (shutdown / restore)."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self.seal()
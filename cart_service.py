@@ -0,0 +1,98 @@
+# cart_service.py — Cart pricing + atomic bulk cart operations
+# --------------------------------------------------------------------------
+# Cart di session berbentuk {"<product_id>": qty}. Seluruh cart di-price
+# sekaligus dari katalog in-memory (ProductResolver), bukan satu query per
+# baris. Operasi bulk (add / remove / set) divalidasi pada salinan cart dan
+# hanya diterapkan jika SEMUA operasi valid (atomic), sehingga satu request
+# API = satu kali tulis session.
+# --------------------------------------------------------------------------
+MAX_QTY_PER_LINE = 999
+MAX_OPS_PER_REQUEST = 100
+CART_OPS = ('add', 'remove', 'set')
+
+
+class CartError(ValueError):
+    pass
+
+
+def normalize_cart(raw):
+    """Salinan cart dengan key str dan qty int > 0 (baris rusak dibuang)."""
+    cart = {}
+    for p_id, qty in (raw or {}).items():
+        try:
+            pid, qty = int(p_id), int(qty)
+        except (TypeError, ValueError):
+            continue
+        if qty > 0:
+            cart[str(pid)] = qty
+    return cart
+
+
+def price_cart(cart, resolver):
+    """Return (lines, total). lines: [{'product', 'quantity', 'total'}] urut sesuai cart."""
+    lines = []
+    total = 0
+    cart = normalize_cart(cart)
+    products = resolver.get_many(cart.keys())
+    for p_id, qty in cart.items():
+        product = products.get(int(p_id))
+        if product:
+            subtotal = product.price * qty
+            total += subtotal
+            lines.append({'product': product, 'quantity': qty, 'total': subtotal})
+    return lines, total
+
+
+def apply_cart_ops(cart, ops, resolver, max_qty=MAX_QTY_PER_LINE):
+    """Terapkan list operasi ke salinan cart. Raise CartError tanpa mengubah apa pun jika ada yang invalid.
+
+    Operasi: {"op": "add"|"remove"|"set", "product_id": int, "qty": int}
+      - add    : tambah qty (default 1)
+      - remove : hapus baris produk
+      - set    : set qty (0 = hapus)
+    """
+    if not isinstance(ops, list) or not ops:
+        raise CartError("ops harus berupa list yang tidak kosong")
+    if len(ops) > MAX_OPS_PER_REQUEST:
+        raise CartError(f"Maksimal {MAX_OPS_PER_REQUEST} operasi per request")
+
+    new_cart = normalize_cart(cart)
+    for n, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get('op') not in CART_OPS:
+            raise CartError(f"Operasi #{n + 1} tidak dikenal")
+        try:
+            pid = int(op.get('product_id'))
+            qty = int(op.get('qty', 1 if op['op'] == 'add' else 0))
+        except (TypeError, ValueError):
+            raise CartError(f"Operasi #{n + 1}: product_id/qty harus angka")
+        key = str(pid)
+
+        if op['op'] == 'remove':
+            new_cart.pop(key, None)
+            continue
+        if resolver.get(pid) is None:
+            raise CartError(f"Operasi #{n + 1}: produk {pid} tidak ditemukan")
+        if op['op'] == 'add':
+            if qty <= 0:
+                raise CartError(f"Operasi #{n + 1}: qty add harus > 0")
+            qty = new_cart.get(key, 0) + qty
+        if qty < 0:
+            raise CartError(f"Operasi #{n + 1}: qty tidak boleh negatif")
+        if qty > max_qty:
+            raise CartError(f"Operasi #{n + 1}: qty maksimal {max_qty} per produk")
+        if qty == 0:
+            new_cart.pop(key, None)
+        else:
+            new_cart[key] = qty
+    return new_cart
+
+
+def cart_json(cart, resolver):
+    """Representasi JSON cart yang sudah di-price (untuk API)."""
+    lines, total = price_cart(cart, resolver)
+    return {
+        'items': [{'product_id': l['product'].id, 'name': l['product'].name, 'unit_price': l['product'].price,
+                   'qty': l['quantity'], 'subtotal': l['total']} for l in lines],
+        'total': total,
+        'count': sum(l['quantity'] for l in lines),
+    }
@@ -0,0 +1,64 @@
+# catalog_cache.py — Versioned catalog cache for the home / category pages
+# --------------------------------------------------------------------------
+# Hasil query produk dan fragment HTML grid produk di-cache per kategori,
+# dengan key versi katalog (ProductResolver.version = hash isi katalog,
+# berubah setiap isi Product berubah). Versi yang sama dipakai untuk ETag sehingga
+# pengunjung berulang mendapat 304 Not Modified tanpa query maupun render.
+# --------------------------------------------------------------------------
+import hashlib
+import json
+import threading
+
+
+class CatalogCache:
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._version = None
+        self._products = {}
+        self._fragments = {}
+
+    @property
+    def version(self):
+        return self.resolver.version
+
+    @property
+    def last_modified(self):
+        return self.resolver.changed_at
+
+    def _sync(self):
+        """Buang semua entry jika versi katalog sudah berubah. Return versi saat ini."""
+        version = self.resolver.version
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._products, self._fragments = {}, {}
+                    self._version = version
+        return version
+
+    def products(self, category=None):
+        """Produk dalam `category` (None = semua), urut id."""
+        version = self._sync()
+        key = category or ''
+        products = self._products.get(key)
+        if products is None:
+            products = [p for p in self.resolver.all() if not category or p.category == category]
+            if self.resolver.version == version:
+                self._products[key] = products
+        return products
+
+    def fragment(self, category, render_fn):
+        """HTML grid produk untuk `category`; `render_fn(products)` hanya dipanggil saat cache miss."""
+        version = self._sync()
+        key = category or ''
+        html = self._fragments.get(key)
+        if html is None:
+            html = render_fn(self.products(category))
+            if self.resolver.version == version:
+                self._fragments[key] = html
+        return html
+
+    def etag(self, category, *parts):
+        """ETag dari versi katalog + kategori + bagian halaman lain yang bervariasi per user."""
+        payload = json.dumps([self.version, category or ''] + list(parts), sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
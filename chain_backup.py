@@ -0,0 +1,223 @@
+# chain_backup.py — Content-addressed, compressed, incremental chain backups
+# --------------------------------------------------------------------------
+# Setiap backup (snapshot) hanya menulis block yang ditambahkan sejak snapshot
+# sebelumnya. Block disimpan sebagai segment NDJSON terkompresi gzip yang
+# dialamatkan oleh SHA-256 isinya, sehingga konten identik tidak pernah
+# ditulis dua kali.
+#
+# Layout folder:
+#   chain_backups/
+#     manifest.json                 -> daftar snapshot + segment yang dirujuk
+#     objects/<sha256>.ndjson.gz    -> segment block (immutable, dedup)
+#     blockchain_*.json             -> backup legacy (masih bisa direstore)
+# --------------------------------------------------------------------------
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+MANIFEST_NAME = 'manifest.json'
+OBJECTS_DIR = 'objects'
+OBJECT_SUFFIX = '.ndjson.gz'
+BACKUP_FORMAT = 1
+
+
+def encode_blocks(blocks):
+    return b''.join(
+        (json.dumps(b, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8') for b in blocks)
+
+
+def decode_blocks(raw):
+    return [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+
+class IncrementalBackupStore:
+    """Backup incremental berbasis manifest.
+
+    Segment milik satu snapshot digabung seperti binary counter (dua segment
+    terakhir dengan jumlah block yang sama di-merge), sehingga jumlah segment
+    per snapshot tetap O(log n) dan setiap block hanya ditulis ulang O(log n) kali.
+    """
+
+    def __init__(self, directory, compresslevel=6):
+        self.directory = directory
+        self.compresslevel = compresslevel
+        self._lock = threading.RLock()
+        self._manifest = None
+
+    # ----------------------------
+    # Manifest helpers
+    # ----------------------------
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _read_manifest(self):
+        if self._manifest is None:
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {'format': BACKUP_FORMAT, 'snapshots': []}
+        return self._manifest
+
+    def reload(self):
+        """Buang cache manifest; dibaca ulang dari disk (bisa ditulis process lain)."""
+        with self._lock:
+            self._manifest = None
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+        self._manifest = manifest
+
+    # ----------------------------
+    # Object (segment) helpers
+    # ----------------------------
+    def _object_path(self, digest):
+        return os.path.join(self.directory, OBJECTS_DIR, digest + OBJECT_SUFFIX)
+
+    def _put_object(self, blocks, written, raw=None):
+        """Tulis segment jika belum ada (dedup by hash). Return deskriptor segment."""
+        if raw is None:
+            raw = encode_blocks(blocks)
+        return self._put_raw(raw, blocks[0].get('index'), blocks[-1].get('index'), len(blocks), written)
+
+    def _put_raw(self, raw, first_index, last_index, count, written):
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with gzip.open(tmp, 'wb', compresslevel=self.compresslevel) as f:
+                f.write(raw)
+            os.replace(tmp, path)
+            written.append(digest)
+        return {'hash': digest, 'first_index': first_index, 'last_index': last_index, 'count': count}
+
+    def _get_raw(self, digest):
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            raw = f.read()
+        if hashlib.sha256(raw).hexdigest() != digest:
+            raise ValueError(f"Backup object {digest[:12]} is corrupt (hash mismatch)")
+        return raw
+
+    def _get_object(self, digest):
+        return decode_blocks(self._get_raw(digest))
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def snapshot(self, chain, name=None, record_fn=None):
+        """Buat snapshot baru dari `chain` (list of block). Return nama snapshot (snapshot lama jika isinya identik)."""
+        if not chain:
+            return None
+        with self._lock:
+            manifest = self._read_manifest()
+            snapshots = list(manifest.get('snapshots', []))
+            last = snapshots[-1] if snapshots else None
+            tip_signature = chain[-1].get('signature')
+
+            # Isi identik dengan snapshot terakhir -> tidak perlu snapshot baru
+            if last and last['height'] == len(chain) and last['tip_signature'] == tip_signature:
+                return last['name']
+
+            written = []
+            h = last['height'] if last else 0
+            if last and 0 < h <= len(chain) and chain[h - 1].get('signature') == last['tip_signature']:
+                segments = [dict(s) for s in last['segments']]
+                if h < len(chain):
+                    delta = chain[h:]
+                    raw = b''.join(record_fn(p) for p in range(h, h + len(delta))) if record_fn else None
+                    segments.append(self._put_object(delta, written, raw))
+            else:
+                # Chain berubah (restore/import) -> satu segment penuh (tetap dedup by hash)
+                segments = [self._put_object(chain, written)]
+
+            while len(segments) >= 2 and segments[-2]['count'] <= segments[-1]['count']:
+                # Segment berisi NDJSON, jadi merge cukup menyambung byte tanpa decode/encode ulang
+                left, right = segments[-2], segments[-1]
+                raw = self._get_raw(left['hash']) + self._get_raw(right['hash'])
+                segments[-2:] = [self._put_raw(raw, left['first_index'], right['last_index'],
+                                               left['count'] + right['count'], written)]
+
+            name = name or time.strftime("blockchain_%Y%m%d-%H%M%S.json")
+            # Dua snapshot di detik yang sama: yang terbaru menggantikan (sama seperti backup legacy)
+            replaced = [s for s in snapshots if s['name'] == name]
+            snapshots = [s for s in snapshots if s['name'] != name]
+            snapshots.append({
+                'name': name,
+                'created': time.time(),
+                'height': len(chain),
+                'tip_signature': tip_signature,
+                'segments': segments,
+            })
+            self._write_manifest(dict(manifest, format=BACKUP_FORMAT, snapshots=snapshots))
+
+            # Segment perantara hasil merge (dan milik snapshot yang tergantikan) tidak dirujuk lagi
+            candidates = set(written) | {seg['hash'] for s in replaced for seg in s['segments']}
+            self._remove_objects(candidates - self._live_objects(snapshots))
+            return name
+
+    def prune(self, limit=20):
+        """Simpan `limit` snapshot terbaru dan hapus object yang tidak lagi dirujuk."""
+        with self._lock:
+            manifest = self._read_manifest()
+            snapshots = manifest.get('snapshots', [])
+            if len(snapshots) <= limit:
+                return
+            dropped, kept = snapshots[:-limit], snapshots[-limit:]
+            self._write_manifest(dict(manifest, snapshots=kept))
+            self._remove_objects({seg['hash'] for s in dropped for seg in s['segments']} - self._live_objects(kept))
+
+    @staticmethod
+    def _live_objects(snapshots):
+        return {seg['hash'] for s in snapshots for seg in s['segments']}
+
+    def _remove_objects(self, digests):
+        for digest in digests:
+            try:
+                os.remove(self._object_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def list_snapshots(self):
+        """Nama snapshot, terbaru lebih dulu."""
+        with self._lock:
+            return [s['name'] for s in reversed(self._read_manifest().get('snapshots', []))]
+
+    def has_snapshot(self, name):
+        return self._find(name) is not None
+
+    def _find(self, name):
+        with self._lock:
+            for s in self._read_manifest().get('snapshots', []):
+                if s['name'] == name:
+                    return s
+        return None
+
+    def iter_blocks(self, name):
+        """Generator block snapshot `name`, satu segment backup di memori pada satu waktu."""
+        snap = self._find(name)
+        if snap is None:
+            raise KeyError(name)
+        count = 0
+        for seg in snap['segments']:
+            for block in self._get_object(seg['hash']):
+                count += 1
+                yield block
+        if count != snap['height']:
+            raise ValueError(f"Snapshot {name} is incomplete")
+
+    def restore(self, name):
+        """Bangun ulang chain pada titik snapshot `name` (hanya membaca segment yang dirujuk)."""
+        return list(self.iter_blocks(name))
+
+    def latest(self):
+        names = self.list_snapshots()
+        return self.restore(names[0]) if names else None
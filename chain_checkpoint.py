@@ -0,0 +1,84 @@
+# chain_checkpoint.py — Signed checkpoints for fast startup verification
+# --------------------------------------------------------------------------
+# Checkpoint mencatat height, hash block tip, dan digest berantai seluruh
+# record store sampai height tersebut, lalu ditandatangani HMAC. Saat startup
+# prefix chain cukup dicocokkan dengan digest (sha256 murah atas byte record);
+# hanya block SETELAH checkpoint yang HMAC-nya dihitung ulang.
+# --------------------------------------------------------------------------
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+CHECKPOINT_FILE = 'checkpoints.json'
+
+
+class CheckpointLog:
+    def __init__(self, directory, key, keep=16):
+        self.directory = directory
+        self.key = key
+        self.keep = int(keep)
+        self._lock = threading.RLock()
+        self._checkpoints = None
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, CHECKPOINT_FILE)
+
+    def _sign(self, cp):
+        payload = json.dumps({k: cp[k] for k in ('height', 'tip_hash', 'digest', 'created')},
+                             sort_keys=True).encode('utf-8')
+        return hmac.new(self.key, payload, hashlib.sha256).hexdigest()
+
+    def _load(self):
+        if self._checkpoints is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._checkpoints = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._checkpoints = []
+        return self._checkpoints
+
+    def _save(self, checkpoints):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(checkpoints, f, indent=1)
+        os.replace(tmp, self.path)
+        self._checkpoints = checkpoints
+
+    def add(self, height, tip_hash, digest):
+        with self._lock:
+            cp = {'height': int(height), 'tip_hash': tip_hash, 'digest': digest, 'created': time.time()}
+            cp['hmac'] = self._sign(cp)
+            checkpoints = [c for c in self._load() if c['height'] < cp['height']] + [cp]
+            self._save(checkpoints[-self.keep:])
+            return cp
+
+    def latest(self, max_height=None):
+        """Checkpoint terbaru dengan signature valid (dan height <= max_height)."""
+        with self._lock:
+            for cp in reversed(self._load()):
+                if max_height is not None and cp.get('height', 0) > max_height:
+                    continue
+                try:
+                    if hmac.compare_digest(cp.get('hmac', ''), self._sign(cp)):
+                        return cp
+                except (KeyError, TypeError):
+                    continue
+        return None
+
+    def reload(self):
+        """Buang cache; dibaca ulang dari disk (file bisa ditulis process lain)."""
+        with self._lock:
+            self._checkpoints = None
+
+    def reset(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._checkpoints = []
@@ -0,0 +1,394 @@
+# chain_core.py — Chain core: HMAC-signed blocks, transaction schema v2, Blockchain
+# --------------------------------------------------------------------------
+# Logika chain murni tanpa Flask/SQLAlchemy dan tanpa I/O saat import:
+# test, CLI (migrate_transactions, chain_validator) dan worker web memakai
+# modul ini langsung. Penyimpanan ada di chain_storage.py, web di app.py.
+# --------------------------------------------------------------------------
+import hmac
+import json
+import logging
+import os
+import threading
+import uuid
+from time import time as now_time
+
+from chain_store import encode_block
+from chain_validator import canonical_hash, hmac_signature, validate_chain
+from compact_chain import CompactChain
+from merkle import merkle_branch, merkle_levels, merkle_root, sign_header, verify_block_merkle
+from metrics import REGISTRY
+from pow_miner import ProofOfWorkMiner, verify_proof
+from tx_index import TransactionIndex
+
+# CRITICAL SECURITY: MUST BE SET TO RANDOM STRING AND NOT COMMITTED TO REPO
+SECRET_CHAIN_KEY = os.environ.get('SECRET_CHAIN_KEY', 'devchainsecret-changeinprod-887766').encode()
+
+# Proof-of-work: jumlah bit nol di depan hash (0 = tanpa mining, proof konstanta seperti sebelumnya)
+POW_DIFFICULTY = int(os.environ.get('POW_DIFFICULTY', 0))
+POW_WORKERS = int(os.environ.get('POW_WORKERS', 0)) or None  # default: semua core
+
+# Representasi chain di memori: 'dict' (list of dict) | 'compact' (kolumnar, lihat compact_chain.py)
+CHAIN_MEMORY_LAYOUT = os.environ.get('CHAIN_MEMORY_LAYOUT', 'dict').lower()
+
+# Logger yang sama dengan app.logger (Flask app bernama 'app')
+logger = logging.getLogger('app')
+
+def sign_block(block_dict):
+    """Generates HMAC signature for a block."""
+    # Shared with the parallel validator workers (signature field itself is excluded)
+    return hmac_signature(SECRET_CHAIN_KEY, block_dict)
+
+pow_miner = ProofOfWorkMiner(POW_DIFFICULTY, workers=POW_WORKERS, logger=logger)
+
+@REGISTRY.timed('chain_verify_signature_seconds', 'HMAC verification per block.',
+                          buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01))
+def verify_block_signature(block_dict):
+    """Verifies HMAC signature for a block."""
+    sig = block_dict.get('signature')
+    if not sig:
+        return False
+    expected = sign_block(block_dict)
+    return hmac.compare_digest(expected, sig)
+
+# Transaction schema v2: structured line items instead of "Name (xQty), ..." strings
+TX_SCHEMA_VERSION = 2
+
+def clean_line_item(item):
+    unit_price = int(item.get('unit_price', 0) or 0)
+    qty = int(item.get('qty', 1) or 1)
+    return {
+        'product_id': item.get('product_id'),
+        'name': str(item.get('name', '')),
+        'unit_price': unit_price,
+        'qty': qty,
+        'subtotal': int(item.get('subtotal', unit_price * qty)),
+    }
+
+def parse_legacy_items(raw):
+    """Parse legacy "Nama Produk (xQty), ..." string into line items (price unknown)."""
+    items = []
+    for item_str in str(raw).split(','):
+        item_str = item_str.strip()
+        if not item_str: continue
+        name, qty = item_str, 1
+        if ' (x' in item_str:
+            name_part, qty_part = item_str.rsplit(' (x', 1)
+            qty_str = qty_part.strip().rstrip(')')
+            if qty_str.isdigit():
+                name, qty = name_part.strip(), int(qty_str)
+        items.append({'product_id': None, 'name': name, 'unit_price': 0, 'qty': qty, 'subtotal': 0})
+    return items
+
+def line_items(tx):
+    """Line items of a transaction: v2 returns the stored list as-is, legacy strings are parsed."""
+    raw = tx.get('items', "")
+    if isinstance(raw, list):
+        return raw
+    if isinstance(raw, str):
+        return parse_legacy_items(raw)
+    return [{'product_id': None, 'name': str(raw), 'unit_price': 0, 'qty': 1, 'subtotal': 0}]
+
+class Blockchain:
+    def __init__(self, chain=None, layout=None):
+        layout = layout or CHAIN_MEMORY_LAYOUT
+        if layout == 'compact':
+            # CompactChain hasil load streaming dipakai langsung (tanpa salinan kedua)
+            self.chain = chain if isinstance(chain, CompactChain) else CompactChain(chain if chain is not None else ())
+        else:
+            self.chain = list(chain) if chain is not None else []
+        self.pending_transactions = []
+        # Guards chain + pending_transactions against concurrent checkouts / block producer
+        self.lock = threading.RLock()
+        # Secondary index: sender -> [(block position, tx position), ...] in chain order
+        self.sender_index = {}
+        # tx_id -> (block position, tx position): status/lookup transaksi langsung dari chain
+        self.tx_positions = {}
+        # Index terurut (timestamp, total) untuk range query /api/transactions
+        self.tx_index = TransactionIndex()
+        self.rebuild_index()
+        # Sidecar cache per block position: canonical hash + NDJSON record bytes.
+        # Sealed blocks are immutable, so entries live until the Blockchain is replaced.
+        self.block_meta = {}
+        if not self.chain:
+            self.create_block(proof=100, previous_hash='1')
+
+    def rebuild_index(self):
+        with self.lock:
+            self.sender_index = {}
+            self.tx_positions = {}
+            self.tx_index = TransactionIndex()
+            for pos, block in enumerate(self.chain):
+                self._index_block(pos, block, bulk=True)
+            self.tx_index.finish_bulk()
+
+    def _index_block(self, pos, block, bulk=False):
+        for tx_pos, tx in enumerate(block.get('transactions', [])):
+            self.sender_index.setdefault(tx.get('sender'), []).append((pos, tx_pos))
+            if tx.get('tx_id'):
+                self.tx_positions[tx['tx_id']] = (pos, tx_pos)
+        self.tx_index.add_block(pos, block, bulk=bulk)
+
+    def create_block(self, proof, previous_hash=None):
+        with self.lock:
+            transactions, self.pending_transactions = self.pending_transactions, []
+        return self.mine_block(transactions, proof, previous_hash)
+
+    @REGISTRY.timed('chain_create_block_seconds', 'Sealing one block (merkle, proof-of-work, signatures).')
+    def mine_block(self, transactions, proof, previous_hash=None):
+        """Segel `transactions` menjadi block baru di tip chain.
+
+        Proof-of-work berjalan TANPA memegang lock: header di-snapshot di bawah lock, di-mining,
+        lalu di-append hanya jika tip belum berubah; jika berubah, mining diulang di atas tip baru.
+        """
+        while True:
+            with self.lock:
+                block = self.prepare_block(transactions, proof, previous_hash)
+                if not pow_miner.difficulty:
+                    self.commit_block(block)
+                    return block
+            # Proof-of-work (POW_DIFFICULTY > 0): proof diganti nonce hasil mining
+            pow_miner.seal(block)
+            with self.lock:
+                if self.commit_block(block):
+                    return block
+            previous_hash = None
+
+    def prepare_block(self, transactions, proof, previous_hash=None):
+        """Header block berikutnya (belum di-mining / ditandatangani) di atas tip saat ini."""
+        with self.lock:
+            block = {
+                'index': len(self.chain) + 1,
+                'timestamp': now_time(),
+                'transactions': list(transactions),
+                'proof': proof,
+                'previous_hash': previous_hash or (self.block_hash(len(self.chain) - 1) if self.chain else '1')
+            }
+            block['merkle_root'] = merkle_root(block['transactions'])
+            return block
+
+    def commit_block(self, block):
+        """Tanda tangani + append block hasil prepare_block. False jika tip sudah berubah sejak prepare."""
+        with self.lock:
+            if block['index'] != len(self.chain) + 1:
+                return False
+            if self.chain and block['previous_hash'] != self.block_hash(len(self.chain) - 1):
+                return False
+            # Header signature (termasuk merkle_root) -> bukti satu transaksi tanpa seluruh block
+            block['header_signature'] = sign_header(SECRET_CHAIN_KEY, block)
+            # CRITICAL: Add HMAC Signature to the block
+            block['signature'] = sign_block(block)
+
+            self.chain.append(block)
+            self._index_block(len(self.chain) - 1, block)
+            self.block_meta[len(self.chain) - 1] = {'hash': self.hash(block)}
+            return True
+
+    def append_block(self, block, record=None):
+        """Tambahkan block yang sudah disegel di tempat lain (worker lain, lewat store bersama).
+
+        Pemanggil sudah memverifikasi block; `record` = byte NDJSON dari store (di-cache).
+        """
+        with self.lock:
+            self.chain.append(block)
+            pos = len(self.chain) - 1
+            self._index_block(pos, block)
+            self.block_meta[pos] = {'record': record} if record is not None else {}
+            return block
+
+    def seal_transactions(self, transactions, proof):
+        """Append a batch of prepared transactions (from the mempool) as one new block."""
+        return self.mine_block(transactions, proof)
+
+    @staticmethod
+    def build_transaction(sender, items, total, tx_id=None):
+        # v2: list of line-item dicts is stored structured
+        if isinstance(items, (list, tuple)) and items and all(isinstance(x, dict) for x in items):
+            return {
+                'tx_id': tx_id or uuid.uuid4().hex,
+                'version': TX_SCHEMA_VERSION,
+                'sender': sender,
+                'items': [clean_line_item(x) for x in items],
+                'total': int(total),
+                'timestamp': now_time()
+            }
+
+        # Legacy: normalize items to readable string (prevents built-in method leak)
+        if isinstance(items, (list, tuple)):
+            try:
+                items_str = ", ".join(str(x) for x in items)
+            except Exception:
+                items_str = str(items)
+        elif isinstance(items, dict):
+            try:
+                items_str = json.dumps(items, ensure_ascii=False, default=str)
+            except Exception:
+                items_str = str(items)
+        else:
+            items_str = str(items)
+
+        if "<built-in" in items_str:
+            items_str = "CORRUPTED_ITEM_REMOVED"
+
+        return {
+            'tx_id': tx_id or uuid.uuid4().hex,
+            'sender': sender,
+            'items': items_str,
+            'total': int(total),
+            'timestamp': now_time()
+        }
+
+    def add_transaction(self, sender, items, total):
+        tx = self.build_transaction(sender, items, total)
+        with self.lock:
+            self.pending_transactions.append(tx)
+            return (self.last_block['index'] + 1) if self.last_block else 1
+
+    @property
+    def last_block(self):
+        return self.chain[-1] if self.chain else None
+
+    @staticmethod
+    def hash(block):
+        return canonical_hash(block)
+
+    def block_hash(self, pos):
+        """Cached canonical hash of the block at list position `pos`."""
+        meta = self.block_meta.setdefault(pos, {})
+        if 'hash' not in meta:
+            meta['hash'] = self.hash(self.chain[pos])
+        return meta['hash']
+
+    def block_record(self, pos):
+        """Cached compact NDJSON bytes of the block (storage, backup and export format)."""
+        meta = self.block_meta.setdefault(pos, {})
+        if 'record' not in meta:
+            meta['record'] = encode_block(self.chain[pos])
+        return meta['record']
+
+    def merkle_proof(self, pos, tx_pos):
+        """Merkle branch transaksi `tx_pos` di block posisi `pos` (tree di-cache per block)."""
+        meta = self.block_meta.setdefault(pos, {})
+        if 'merkle' not in meta:
+            meta['merkle'] = merkle_levels(self.chain[pos].get('transactions', []))
+        return merkle_branch(meta['merkle'], tx_pos)
+
+    def validate(self, workers=None, chunk_size=None):
+        """Full validation (index, HMAC, previous_hash links) across a process pool.
+
+        Chain hanya bertambah di ujung: cukup snapshot height, range dibaca langsung dari chain
+        (tanpa menyalin / materialisasi seluruh block layout compact sekaligus).
+        """
+        with self.lock:
+            height = len(self.chain)
+        return validate_chain(self.chain, SECRET_CHAIN_KEY, workers=workers, chunk_size=chunk_size, height=height)
+
+    def count_transactions_by_user(self, username):
+        return len(self.sender_index.get(username, ()))
+
+    def count_transactions(self):
+        return sum(len(v) for v in self.sender_index.values())
+
+    def get_blocks(self, start_index, limit):
+        """Block dengan index start_index .. start_index+limit-1 (list of (pos, block))."""
+        with self.lock:
+            start = max(0, int(start_index) - 1)
+            return [(pos, self.chain[pos]) for pos in range(start, min(start + int(limit), len(self.chain)))]
+
+    def recent_transactions(self, limit, before=None):
+        """Transaksi terbaru dari block dengan index < `before` (default: sampai tip), urut kronologis.
+
+        Block diambil utuh dari tip ke belakang sampai minimal `limit` transaksi. Return
+        (transaksi, cursor) dengan cursor = index block tertua di halaman (None jika sudah genesis).
+        """
+        with self.lock:
+            end = len(self.chain) if before is None else max(0, min(int(before) - 1, len(self.chain)))
+            pos, found = end, []
+            while pos > 0 and len(found) < limit:
+                pos -= 1
+                count = (self.chain.tx_count(pos) if isinstance(self.chain, CompactChain)
+                         else len(self.chain[pos].get('transactions', [])))
+                found[:0] = [self.transaction(pos, tx_pos) for tx_pos in range(count)]
+            return found, (pos + 1 if pos > 0 else None)
+
+    def get_transactions_by_user(self, username, limit=None, before=None):
+        """Transaksi milik `username` (urut kronologis) lewat sender index, O(k).
+
+        `before` adalah cursor (posisi ke-n transaksi user, eksklusif) dan `limit`
+        membatasi jumlah transaksi terbaru sebelum cursor tersebut.
+        """
+        with self.lock:
+            positions = self.sender_index.get(username, [])
+            end = len(positions) if before is None else max(0, min(int(before), len(positions)))
+            start = 0 if limit is None else max(0, end - int(limit))
+            selected = positions[start:end]
+        return [self.transaction(pos, tx_pos) for pos, tx_pos in selected]
+
+    def find_transaction(self, tx_id):
+        """Salinan transaksi `tx_id` + block_index, atau None jika belum/tidak ada di chain."""
+        with self.lock:
+            found = self.tx_positions.get(tx_id)
+            return self.transaction(*found) if found else None
+
+    def transaction(self, pos, tx_pos):
+        """Salinan satu transaksi + block_index (layout compact: tanpa materialisasi seluruh block)."""
+        if isinstance(self.chain, CompactChain):
+            tx_copy = self.chain.transaction(pos, tx_pos)
+            tx_copy['block_index'] = self.chain.block_index(pos)
+        else:
+            block = self.chain[pos]
+            tx_copy = block['transactions'][tx_pos].copy()
+            tx_copy['block_index'] = block['index']
+        return tx_copy
+
+    def _tx_at(self, pos, tx_pos):
+        if isinstance(self.chain, CompactChain):
+            return self.chain.transaction(pos, tx_pos), self.chain.block_timestamp(pos)
+        block = self.chain[pos]
+        return block['transactions'][tx_pos], block.get('timestamp')
+
+    def query_transactions(self, since=None, until=None, min_total=None, max_total=None,
+                           sender=None, limit=50, cursor=None):
+        """Range query lewat index terurut: O(log n + hasil). Return (transaksi, order, next_cursor).
+
+        Raise ValueError jika cursor tidak valid.
+        """
+        with self.lock:
+            positions = None if sender is None else self.sender_index.get(sender, [])
+            found, order, next_cursor = self.tx_index.query(
+                self._tx_at, since=since, until=until, min_total=min_total, max_total=max_total,
+                sender_positions=positions, limit=limit, cursor=cursor)
+            results = [self.transaction(pos, tx_pos) for pos, tx_pos in found]
+        return results, order, next_cursor
+
+    def get_all_transactions(self):
+        all_tx = []
+        for block in self.chain:
+            for tx in block.get('transactions', []):
+                tx_copy = tx.copy()
+                tx_copy['block_index'] = block['index']
+                all_tx.append(tx_copy)
+        return all_tx
+
+def verify_block(block, pos):
+    """Validasi struktur + HMAC + proof + merkle satu block di posisi `pos`. Raise ValueError."""
+    if not isinstance(block, dict) or int(block.get('index', -1)) != pos+1:
+        raise ValueError(f"Block structure or index mismatch at block {pos+1}")
+
+    if not verify_block_signature(block):
+         raise ValueError(f"HMAC Signature mismatch at block {block.get('index')}")
+
+    if not verify_proof(block):
+        raise ValueError(f"Proof-of-work invalid at block {block.get('index')}")
+
+    if not verify_block_merkle(block):
+        raise ValueError(f"Merkle root mismatch at block {block.get('index')}")
+
+@REGISTRY.timed('chain_verify_seconds', 'Structural + HMAC verification of a loaded chain.')
+def verify_chain_data(chain, start=0):
+    """Validasi struktur + HMAC chain mulai posisi `start`. Raise ValueError jika tidak valid."""
+    if not isinstance(chain, list) or len(chain) == 0:
+        raise ValueError("Blockchain root is empty or not a list")
+
+    for i in range(start, len(chain)):
+        verify_block(chain[i], i)
+    return chain
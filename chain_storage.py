@@ -0,0 +1,509 @@
+# chain_storage.py — Chain persistence + lazily loaded active chain
+# --------------------------------------------------------------------------
+# Segment store / legacy JSON, checkpoint, backup incremental, rollup penjualan,
+# write-behind persister dan block producer. Semua objek dibuat tanpa I/O;
+# chain aktif baru dimuat + diverifikasi saat get_chain() pertama kali dipanggil
+# (atau oleh warm-up di create_app), sehingga import modul ini murah.
+#
+# CHAIN_SHARED_STORE=1: beberapa worker WSGI (gunicorn -w N, tanpa --preload)
+# berbagi CHAIN_STORE_DIR. Setiap block disegel + di-append di bawah file lock
+# (store_lock) setelah chain lokal mengejar tip store; worker lain melihat tip
+# berubah lewat stat() manifest dan hanya membaca + memverifikasi block baru.
+# Import/restore di satu worker -> worker lain memuat ulang chain dari store.
+# --------------------------------------------------------------------------
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from block_producer import BlockProducer
+from chain_backup import IncrementalBackupStore
+from chain_checkpoint import CheckpointLog
+from chain_core import (CHAIN_MEMORY_LAYOUT, SECRET_CHAIN_KEY, Blockchain, logger, pow_miner, verify_block,
+                        verify_chain_data)
+from chain_store import SegmentedChainStore, chain_digest, encode_block
+from compact_chain import CompactChain
+from chain_stream import import_blocks
+from chain_writer import WriteBehindPersister
+from metrics import REGISTRY
+from pow_miner import close_pools
+from process_lock import ProcessLock
+from sales_rollup import SalesRollup
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BLOCKCHAIN_FILE = os.path.join(APP_DIR, 'blockchain.json')
+CHAIN_BACKUP_DIR = os.path.join(APP_DIR, 'chain_backups')
+CHAIN_STORE_DIR = os.path.join(APP_DIR, 'chain_store')
+
+# Storage engine: 'segmented' (append-only log, O(1) per block) atau 'legacy' (rewrite blockchain.json)
+CHAIN_STORAGE = os.environ.get('CHAIN_STORAGE', 'segmented').lower()
+CHAIN_FSYNC_POLICY = os.environ.get('CHAIN_FSYNC_POLICY', 'always').lower()
+CHAIN_SEGMENT_MAX_BYTES = int(os.environ.get('CHAIN_SEGMENT_MAX_BYTES', 8 * 1024 * 1024))
+
+# Startup verification: 'checkpoint' (hanya block setelah checkpoint terakhir) | 'full'
+CHAIN_STARTUP_VERIFY = os.environ.get('CHAIN_STARTUP_VERIFY', 'checkpoint').lower()
+CHAIN_CHECKPOINT_INTERVAL = int(os.environ.get('CHAIN_CHECKPOINT_INTERVAL', 256))
+
+# Write-behind persistence: 'sync' | 'group' (group commit tiap N ms) | 'async'
+CHAIN_DURABILITY = os.environ.get('CHAIN_DURABILITY', 'group').lower()
+CHAIN_GROUP_COMMIT_MS = int(os.environ.get('CHAIN_GROUP_COMMIT_MS', 50))
+CHAIN_PERSIST_QUEUE_SIZE = int(os.environ.get('CHAIN_PERSIST_QUEUE_SIZE', 64))
+
+# Mempool / block producer: 'batched' (seal tiap BLOCK_MAX_TXS tx atau BLOCK_INTERVAL_MS) | 'immediate'
+BLOCK_PRODUCER_MODE = os.environ.get('BLOCK_PRODUCER_MODE', 'batched').lower()
+BLOCK_MAX_TXS = int(os.environ.get('BLOCK_MAX_TXS', 500))
+BLOCK_INTERVAL_MS = int(os.environ.get('BLOCK_INTERVAL_MS', 200))
+
+RESET_BLOCKCHAIN = os.environ.get('RESET_BLOCKCHAIN', 'False').lower() in ('1', 'true', 'yes')
+
+# Store bersama antar process (multi worker); butuh CHAIN_STORAGE=segmented.
+# RESET_BLOCKCHAIN dijalankan oleh setiap worker yang start -> jangan dipakai bersamaan
+CHAIN_SHARED_STORE = os.environ.get('CHAIN_SHARED_STORE', 'False').lower() in ('1', 'true', 'yes')
+CHAIN_STORE_LOCK_FILE = os.path.join(APP_DIR, 'chain_store.lock')
+if CHAIN_SHARED_STORE and CHAIN_STORAGE == 'legacy':
+    raise ValueError("CHAIN_SHARED_STORE requires CHAIN_STORAGE=segmented")
+
+# ----------------------------
+# Robust file I/O for blockchain (Atomic Save, Auto-Backup, Recovery)
+# ----------------------------
+backup_store = IncrementalBackupStore(CHAIN_BACKUP_DIR)
+
+def list_legacy_backups():
+    """Backup legacy (satu file JSON penuh per backup), terbaru lebih dulu."""
+    if not os.path.exists(CHAIN_BACKUP_DIR): return []
+    return sorted(
+        [f for f in os.listdir(CHAIN_BACKUP_DIR) if f.startswith('blockchain_') and f.endswith('.json')],
+        reverse=True
+    )
+
+def cleanup_old_backups(limit=20):
+    """Hapus snapshot lama (dan segment yang tidak dirujuk lagi) agar folder tidak membengkak."""
+    try:
+        backup_store.prune(limit)
+    except Exception as e:
+        logger.warning("cleanup_old_backups failed: %s", e)
+
+@REGISTRY.timed('chain_backup_seconds', 'Incremental backup snapshot.')
+def backup_blockchain(data, record_fn=None):
+    """Simpan snapshot incremental: hanya block baru sejak backup terakhir yang ditulis."""
+    try:
+        backup_store.snapshot(data, record_fn=record_fn)
+        cleanup_old_backups()
+    except Exception as e:
+        logger.warning("backup_blockchain failed: %s", e)
+
+def load_latest_backup():
+    """Coba muat backup terbaru dari folder jika file utama korup."""
+    try:
+        data = backup_store.latest()
+        if isinstance(data, list) and data: return data
+    except Exception as e:
+        logger.warning("Latest incremental snapshot unreadable: %s", e)
+    try:
+        for fname in list_legacy_backups():
+            with open(os.path.join(CHAIN_BACKUP_DIR, fname), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list): return data
+    except Exception:
+        pass
+    return None
+
+chain_store = SegmentedChainStore(CHAIN_STORE_DIR,
+                                  segment_max_bytes=CHAIN_SEGMENT_MAX_BYTES,
+                                  fsync_policy=CHAIN_FSYNC_POLICY)
+
+def write_chain_legacy(data, path=BLOCKCHAIN_FILE):
+    """Tulis chain dalam format legacy (satu file JSON) secara atomic."""
+    temp_file = path + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data if isinstance(data, list) else list(data), f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, path)
+
+chain_checkpoints = CheckpointLog(CHAIN_STORE_DIR, SECRET_CHAIN_KEY)
+
+def maybe_checkpoint(hash_fn):
+    """Tulis checkpoint bertanda tangan setiap CHAIN_CHECKPOINT_INTERVAL block."""
+    height = chain_store.height
+    last = chain_checkpoints.latest()
+    if height and (last is None or height - last['height'] >= CHAIN_CHECKPOINT_INTERVAL):
+        chain_checkpoints.add(height, hash_fn(height - 1), chain_store.digest)
+
+def _reload_shared_state():
+    """Lock antar-process baru didapat: manifest/checkpoint/backup mungkin ditulis worker lain."""
+    chain_store.refresh(force=True)
+    chain_checkpoints.reload()
+    backup_store.reload()
+
+# Semua penulisan store/checkpoint/backup lewat lock ini (reentrant); mode shared: + flock antar process
+store_lock = ProcessLock(CHAIN_STORE_LOCK_FILE, interprocess=CHAIN_SHARED_STORE,
+                         on_acquire=_reload_shared_state)
+
+def refresh_backups():
+    """Mode shared: snapshot bisa ditambah worker lain -> baca ulang manifest backup."""
+    if CHAIN_SHARED_STORE:
+        backup_store.reload()
+
+# Rollup penjualan (per hari/produk/kategori/buyer), disimpan di samping chain store.
+# item_fn butuh katalog produk (DB) -> diisi create_app() lewat configure_rollup();
+# sebelum itu rollup tidak disinkron (dikejar incremental saat sync berikutnya).
+sales_rollup = SalesRollup(CHAIN_STORE_DIR, None)
+rollup_context = contextlib.nullcontext
+
+def configure_rollup(item_fn, context=None):
+    """`item_fn(tx)` -> line item rollup; `context()` dibuka saat sync (mis. app.app_context)."""
+    global rollup_context
+    sales_rollup.item_fn = item_fn
+    rollup_context = context or contextlib.nullcontext
+
+@REGISTRY.timed('sales_rollup_sync_seconds', 'Sales rollup catch-up + save.')
+def sync_sales_rollup(data, persist=True):
+    """Kejar rollup ke chain `data` (incremental, rebuild jika chain diganti) lalu simpan."""
+    if sales_rollup.item_fn is None:
+        return 0
+    try:
+        # Katalog butuh app context (dipanggil juga dari thread writer)
+        with rollup_context():
+            applied = sales_rollup.sync(data)
+        if persist:
+            sales_rollup.save()
+        return applied
+    except Exception as e:
+        logger.warning("Sales rollup sync failed: %s", e)
+        return 0
+
+@REGISTRY.timed('chain_store_persist_seconds', 'Append/rewrite of the segment store.')
+def persist_chain_store(data, record_fn, hash_fn):
+    """Append hanya block yang belum ada di store; rewrite jika chain berbeda (restore/import)."""
+    height = chain_store.height
+    if 0 < height <= len(data) and data[height - 1].get('signature') == chain_store.tip_signature:
+        end = len(data)
+        chain_store.append_many(data[height:end], records=[record_fn(p) for p in range(height, end)])
+    else:
+        # Checkpoint lama milik chain yang diganti -> tidak berlaku lagi
+        chain_checkpoints.reset()
+        chain_store.rewrite(data)
+    maybe_checkpoint(hash_fn)
+
+@REGISTRY.timed('chain_save_seconds', 'Full save_chain_to_file (store + backup + rollup).')
+def save_chain_to_file(chain_obj):
+    """Simpan blockchain secara Atomic (anti-corrupt) dan buat backup."""
+    try:
+        with store_lock:
+            data = chain_obj.chain if isinstance(chain_obj, Blockchain) else chain_obj
+            # Reuse cached hash/record bytes when persisting a live Blockchain
+            if isinstance(chain_obj, Blockchain):
+                record_fn, hash_fn = chain_obj.block_record, chain_obj.block_hash
+            else:
+                record_fn, hash_fn = (lambda pos: encode_block(data[pos])), (lambda pos: Blockchain.hash(data[pos]))
+            if CHAIN_STORAGE == 'legacy':
+                write_chain_legacy(data)
+                target = BLOCKCHAIN_FILE
+            else:
+                persist_chain_store(data, record_fn, hash_fn)
+                target = CHAIN_STORE_DIR
+            backup_blockchain(data, record_fn)
+            sync_sales_rollup(data)
+            logger.info("Blockchain saved to file (atomic).", extra={'file': target})
+    except Exception as e:
+        logger.error("Failed to save blockchain to file.", extra={'error': str(e)})
+
+def persist_active_chain(chain_obj):
+    """Callback writer: state chain yang sudah diganti (import/restore/reload) dilewati agar
+    tidak menimpa store; mode shared: block worker lain dikejar dulu."""
+    with store_lock:
+        if isinstance(chain_obj, Blockchain):
+            if chain_obj is not shop_chain:
+                logger.info("Skipping save of a replaced chain state.")
+                return
+            # Mode shared block sudah di-append oleh seal_shared; writer hanya menyusul backup +
+            # rollup, dan tidak pernah menulis ulang store yang tidak cocok dengan chain ini
+            if CHAIN_SHARED_STORE and (refresh_chain() is not chain_obj
+                                       or chain_store.height != len(chain_obj.chain)):
+                return
+        save_chain_to_file(chain_obj)
+
+def audit_chain(chain_obj):
+    """Audit penuh on-demand: validator paralel (index, HMAC, link) + digest store vs checkpoint."""
+    report = chain_obj.validate()
+    if not report['valid']:
+        raise ValueError(f"Block #{report['first_bad_index']}: {report['error']}")
+    with store_lock:
+        if CHAIN_STORAGE != 'legacy' and chain_store.exists():
+            cp = chain_checkpoints.latest()
+            if cp:
+                # Digest dihitung dari raw record (tanpa decode / memuat chain)
+                prefix_digest = None
+                for record in itertools.islice(chain_store.iter_records(), cp['height']):
+                    prefix_digest = chain_digest(prefix_digest, record)
+                if prefix_digest != cp['digest']:
+                    raise ValueError(f"Stored records do not match checkpoint at height {cp['height']}")
+    return report
+
+def _read_store(cp=None):
+    """Baca store satu pass: digest prefix checkpoint `cp`, verifikasi block sesudahnya, dan
+    append langsung ke layout memori aktif (compact: chain tidak pernah ada sebagai list of dict).
+
+    Return (chain, trusted_height); chain None jika store tidak cocok dengan checkpoint.
+    Raise ValueError pada block rusak pertama.
+    """
+    chain = CompactChain() if CHAIN_MEMORY_LAYOUT == 'compact' else []
+    height = cp['height'] if cp else 0
+    digest = None
+    for pos, record in enumerate(chain_store.iter_records()):
+        block = json.loads(record)
+        if pos < height:
+            # Prefix sampai checkpoint dijamin digest; HMAC hanya dihitung untuk tail
+            digest = chain_digest(digest, record)
+            if pos == height - 1 and (digest != cp['digest'] or Blockchain.hash(block) != cp['tip_hash']):
+                return None, 0
+        else:
+            verify_block(block, pos)
+        chain.append(block)
+    if len(chain) < height:
+        return None, 0
+    if not len(chain):
+        raise ValueError("Blockchain root is empty or not a list")
+    return chain, height
+
+def load_chain_from_file_safe():
+    """Muat chain dengan validasi integritas (HMAC + struktur) dan fallback."""
+    use_store = CHAIN_STORAGE != 'legacy' and chain_store.exists()
+    if not use_store and not os.path.exists(BLOCKCHAIN_FILE):
+        logger.info("No blockchain.json file found.")
+        return None
+    try:
+        trusted = 0
+        if use_store:
+            source = CHAIN_STORE_DIR
+            cp = chain_checkpoints.latest() if CHAIN_STARTUP_VERIFY == 'checkpoint' else None
+            chain, trusted = _read_store(cp)
+            if chain is None:
+                logger.warning("Checkpoint does not match stored chain; running full verification.",
+                                   extra={'checkpoint_height': cp['height']})
+                chain, trusted = _read_store()
+        else:
+            # Legacy single-JSON; dimigrasikan ke segment store pada save berikutnya
+            source = BLOCKCHAIN_FILE
+            with open(BLOCKCHAIN_FILE, "r", encoding="utf-8") as f:
+                chain = json.load(f)
+            verify_chain_data(chain)
+        logger.info("Blockchain loaded from file and verified.",
+                        extra={'file': source, 'height': len(chain), 'verified_from': trusted + 1})
+        return chain
+    except Exception as e:
+        logger.error("Failed to load blockchain from file: %s", e)
+        backup = load_latest_backup()
+        if backup:
+            logger.warning("Loading blockchain from latest backup instead.")
+            # Persist backup as main chain
+            save_chain_to_file(backup)
+            return backup
+        return None
+
+def import_chain_stream(blocks):
+    """Import streaming: verifikasi (index, HMAC, previous_hash) + tulis ke store staging satu pass,
+    lalu ganti chain aktif. Raise ValueError pada block rusak pertama (chain aktif tidak berubah)."""
+    current = get_chain()
+    loaded = []
+    # Staging unik per import (fs yang sama -> rename); import paralel tidak saling menimpa
+    staging = SegmentedChainStore(tempfile.mkdtemp(prefix='chain_store.import-', dir=APP_DIR),
+                                  segment_max_bytes=CHAIN_SEGMENT_MAX_BYTES,
+                                  fsync_policy=CHAIN_FSYNC_POLICY)
+
+    def sink(batch, records):
+        loaded.extend(batch)
+        if CHAIN_STORAGE != 'legacy':
+            staging.append_many(batch, records)
+
+    try:
+        import_blocks(blocks, SECRET_CHAIN_KEY, sink)
+
+        new_chain = Blockchain(chain=loaded)
+        # Writer juga memakai store_lock -> antrean dikosongkan sebelum lock diambil; state chain
+        # lama yang masih sempat masuk antrean dilewati persist_active_chain (bukan chain aktif lagi)
+        chain_persister.flush()
+        with store_lock, current.lock:
+            if CHAIN_STORAGE == 'legacy':
+                save_chain_to_file(new_chain)
+            else:
+                # Segment staging sudah terverifikasi -> cukup rename ke store aktif
+                chain_checkpoints.reset()
+                chain_store.replace_with(staging)
+                maybe_checkpoint(new_chain.block_hash)
+                backup_blockchain(loaded, new_chain.block_record)
+                sync_sales_rollup(new_chain.chain)
+            set_chain(new_chain)
+    finally:
+        shutil.rmtree(staging.directory, ignore_errors=True)
+    return new_chain
+
+# Background writer: checkout hanya mengantre state chain, worker yang menulis ke disk
+chain_persister = WriteBehindPersister(persist_active_chain,
+                                       mode=CHAIN_DURABILITY,
+                                       group_commit_ms=CHAIN_GROUP_COMMIT_MS,
+                                       max_pending=CHAIN_PERSIST_QUEUE_SIZE,
+                                       logger=logger)
+
+# ----------------------------
+# Active chain (lazy load)
+# ----------------------------
+shop_chain = None  # None = belum dimuat; akses lewat get_chain()
+_load_lock = threading.Lock()
+
+def load_active_chain():
+    """Reset / muat + verifikasi chain dari disk / genesis baru jika tidak ada chain valid."""
+    if RESET_BLOCKCHAIN:
+        # Delete file and re-init if reset requested
+        if os.path.exists(BLOCKCHAIN_FILE): os.remove(BLOCKCHAIN_FILE)
+        chain_store.reset()
+        chain_obj = Blockchain()  # fresh genesis
+        save_chain_to_file(chain_obj)
+        logger.info("Blockchain reset to new genesis.")
+        return chain_obj
+    loaded = load_chain_from_file_safe()
+    if loaded:
+        logger.info("Shop chain initialized from file.")
+        return Blockchain(chain=loaded)
+    # No valid chain found -> fresh genesis and save it
+    chain_obj = Blockchain()
+    save_chain_to_file(chain_obj)
+    logger.info("No valid chain found; created new chain and saved.")
+    return chain_obj
+
+def get_chain():
+    """Chain aktif; dimuat sekali (thread-safe) pada pemakaian pertama.
+
+    Mode shared: jika manifest store berubah (satu stat), block baru dari worker lain dikejar dulu.
+    """
+    global shop_chain
+    chain_obj = shop_chain
+    if chain_obj is None:
+        with _load_lock:
+            if shop_chain is None:
+                with store_lock:
+                    shop_chain = load_active_chain()
+            chain_obj = shop_chain
+    elif CHAIN_SHARED_STORE and chain_store.changed():
+        chain_obj = refresh_chain()
+    return chain_obj
+
+def set_chain(chain_obj):
+    """Ganti chain aktif (import / restore / migrasi); pemanggil memegang lock chain lama."""
+    global shop_chain
+    shop_chain = chain_obj
+
+def sync_chain(chain_obj):
+    """Kejar `chain_obj` ke tip store: hanya record setelah tip lokal yang dibaca + diverifikasi
+    (index, HMAC, proof, merkle, previous_hash). Pemanggil memegang store_lock.
+
+    Return False jika store tidak lagi melanjutkan chain lokal (diganti import/restore).
+    """
+    with chain_obj.lock:
+        local = len(chain_obj.chain)
+        height = chain_store.height
+        tip = chain_obj.chain[local - 1].get('signature')
+        if height <= local:
+            return height == local and chain_store.tip_signature == tip
+        records = chain_store.iter_records(local)
+        first = next(records, None)
+        if first is None or json.loads(first).get('signature') != tip:
+            return False
+        for record in records:
+            pos = len(chain_obj.chain)
+            block = json.loads(record)
+            verify_block(block, pos)
+            if block.get('previous_hash') != chain_obj.block_hash(pos - 1):
+                raise ValueError(f"Previous hash mismatch at block {pos + 1}")
+            chain_obj.append_block(block, record)
+    logger.info("Chain synced from shared store.", extra={'from_height': local, 'height': height})
+    return True
+
+def reload_chain():
+    """Muat ulang chain aktif dari store (diganti worker lain, atau append lokal gagal)."""
+    with store_lock:
+        loaded = load_chain_from_file_safe()
+        if loaded:
+            set_chain(Blockchain(chain=loaded))
+            logger.warning("Shop chain reloaded from shared store.", extra={'height': len(loaded)})
+        return shop_chain
+
+def refresh_chain():
+    """Mode shared: sinkronkan chain aktif dengan store di bawah store_lock. Store yang
+    gagal verifikasi tidak diterapkan (chain lokal tetap dipakai, error di-log)."""
+    with store_lock:
+        chain_obj = shop_chain
+        if not CHAIN_SHARED_STORE or chain_obj is None:
+            return chain_obj
+        try:
+            if sync_chain(chain_obj):
+                return chain_obj
+        except ValueError as e:
+            logger.error("Shared chain store failed verification; keeping local chain: %s", e)
+            return chain_obj
+        return reload_chain()
+
+def _store_sealed(chain_obj, block):
+    """Append block yang baru di-commit ke store. Pemanggil memegang store_lock + lock chain."""
+    pos = len(chain_obj.chain) - 1
+    try:
+        chain_store.append_many([block], records=[chain_obj.block_record(pos)])
+    except Exception:
+        # Block lokal tidak tercatat di store -> buang dengan memuat ulang dari store
+        reload_chain()
+        raise
+    maybe_checkpoint(chain_obj.block_hash)
+    return block
+
+def seal_shared(transactions, proof):
+    """Seal mode shared: kejar tip store lalu commit + append ke store sebelum lock dilepas,
+    sehingga index/previous_hash block selalu melanjutkan tip milik semua worker.
+
+    Proof-of-work (POW_DIFFICULTY > 0) berjalan tanpa store_lock maupun lock chain; jika tip
+    berubah selama mining, header disiapkan ulang di atas tip baru.
+    """
+    get_chain()  # muat chain di luar store_lock (urutan lock: _load_lock -> store_lock)
+    while True:
+        with store_lock:
+            chain_obj = refresh_chain()
+            with chain_obj.lock:
+                block = chain_obj.prepare_block(transactions, proof)
+                if not pow_miner.difficulty:
+                    chain_obj.commit_block(block)
+                    return _store_sealed(chain_obj, block)
+        pow_miner.seal(block)
+        with store_lock:
+            chain_obj = refresh_chain()
+            with chain_obj.lock:
+                if chain_obj.commit_block(block):
+                    return _store_sealed(chain_obj, block)
+
+def warm_up(background=False):
+    """Muat chain sebelum request pertama; background=True tidak menahan startup worker."""
+    if not background:
+        return get_chain()
+    thread = threading.Thread(target=get_chain, name='chain-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def on_block_sealed(block):
+    # persist chain safely (write-behind; coalesced with other sealed blocks)
+    chain_persister.submit(get_chain())
+    logger.info("Transaction mined.", extra={'block_index': block['index'], 'tx_count': len(block['transactions'])})
+
+block_producer = BlockProducer(get_chain, Blockchain.build_transaction,
+                               max_txs=BLOCK_MAX_TXS,
+                               window_ms=BLOCK_INTERVAL_MS,
+                               proof=12345,
+                               mode=BLOCK_PRODUCER_MODE,
+                               on_block=on_block_sealed,
+                               logger=logger,
+                               seal_fn=seal_shared if CHAIN_SHARED_STORE else None)
+
+def shutdown():
+    """Seal sisa mempool lalu flush writer (didaftarkan ke atexit oleh create_app)."""
+    block_producer.stop()
+    chain_persister.stop()
+    close_pools()
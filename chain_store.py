@@ -0,0 +1,352 @@
+# chain_store.py — Append-only segmented block log
+# --------------------------------------------------------------------------
+# Setiap block baru ditulis sebagai satu baris JSON (NDJSON) di akhir segment
+# aktif, sehingga biaya tulis per block O(1) berapa pun tinggi chain.
+#
+# Layout folder:
+#   chain_store/
+#     manifest.json               -> tip kecil: height, tip signature, daftar segment
+#     seg-0000000001.ndjson       -> block #1 .. #N (satu block per baris)
+#     seg-00000000NN.ndjson       -> segment berikutnya setelah roll-over
+#     seg-0000000001-<gen>.ndjson -> segment hasil replace_with/rewrite (nama unik per generasi)
+#
+# Manifest di-cache di memori. Jika beberapa process berbagi folder yang sama,
+# changed() membandingkan stat() manifest (inode, mtime_ns, size) dengan stamp
+# saat manifest terakhir dibaca/ditulis -> sinyal tip berubah seharga satu stat.
+# --------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+MANIFEST_NAME = 'manifest.json'
+SEGMENT_PREFIX = 'seg-'
+SEGMENT_SUFFIX = '.ndjson'
+STORE_FORMAT = 1
+
+DEFAULT_SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+def encode_block(block):
+    """Serialize satu block menjadi satu baris NDJSON (compact)."""
+    return (json.dumps(block, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def chain_digest(prev_digest, record):
+    """Digest berantai atas byte record: D(n) = sha256(D(n-1) || record(n))."""
+    return hashlib.sha256((prev_digest or '').encode('ascii') + record).hexdigest()
+
+
+def segment_name(first_index, generation=None):
+    suffix = f"-{generation}" if generation else ''
+    return f"{SEGMENT_PREFIX}{int(first_index):010d}{suffix}{SEGMENT_SUFFIX}"
+
+
+class SegmentedChainStore:
+    """Storage engine append-only untuk Blockchain.
+
+    fsync_policy:
+      - 'always'   : fsync setelah setiap append (paling aman)
+      - 'interval' : fsync paling sering setiap `fsync_interval` detik
+      - 'never'    : serahkan flush ke OS
+    """
+
+    def __init__(self, directory, segment_max_bytes=DEFAULT_SEGMENT_MAX_BYTES,
+                 fsync_policy='always', fsync_interval=1.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.directory = directory
+        self.segment_max_bytes = int(segment_max_bytes)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = float(fsync_interval)
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._stamp = None
+        self._last_fsync = 0.0
+
+    # ----------------------------
+    # Manifest helpers
+    # ----------------------------
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    def _empty_manifest(self):
+        return {'format': STORE_FORMAT, 'height': 0, 'tip_signature': None, 'digest': None, 'segments': []}
+
+    def _stat_stamp(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def changed(self):
+        """True jika manifest di disk berbeda dari yang di-cache (ditulis process lain)."""
+        return self._stat_stamp() != self._stamp
+
+    def refresh(self, force=False):
+        """Buang cache manifest jika berubah di disk (atau selalu, force=True). Return True jika dibuang.
+
+        force dipakai saat memegang lock antar-process: stat bisa sama walau isi berbeda
+        (inode dipakai ulang + mtime dalam satu tick clock), pembacaan ulang tidak.
+        """
+        with self._lock:
+            if not force and not self.changed():
+                return False
+            self._manifest = None
+            return True
+
+    def _read_manifest(self):
+        if self._manifest is None:
+            # Stamp diambil sebelum membaca: penulisan di antaranya tetap terdeteksi changed()
+            self._stamp = self._stat_stamp()
+            if self.exists():
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = self._empty_manifest()
+        return self._manifest
+
+    def _write_manifest(self, manifest):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+            f.flush()
+            if self.fsync_policy != 'never':
+                os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+        self._manifest = manifest
+        self._stamp = self._stat_stamp()
+
+    @property
+    def height(self):
+        with self._lock:
+            return int(self._read_manifest().get('height', 0))
+
+    @property
+    def tip_signature(self):
+        with self._lock:
+            return self._read_manifest().get('tip_signature')
+
+    @property
+    def digest(self):
+        """Digest berantai atas semua record sampai tip (dipakai oleh checkpoint)."""
+        with self._lock:
+            manifest = self._read_manifest()
+            if manifest.get('digest') is None and manifest.get('height', 0) > 0:
+                # Store lama tanpa digest -> hitung sekali dari disk
+                digest = None
+                for _, record in self._iter_records():
+                    digest = chain_digest(digest, record)
+                manifest['digest'] = digest
+            return manifest.get('digest')
+
+    def _maybe_fsync(self, f):
+        if self.fsync_policy == 'always':
+            os.fsync(f.fileno())
+        elif self.fsync_policy == 'interval':
+            t = time.monotonic()
+            if t - self._last_fsync >= self.fsync_interval:
+                os.fsync(f.fileno())
+                self._last_fsync = t
+
+    # ----------------------------
+    # Write path
+    # ----------------------------
+    def append(self, block):
+        self.append_many([block])
+
+    def append_many(self, blocks, records=None):
+        """Tambahkan block ke segment aktif. Block harus melanjutkan tip (index = height + 1).
+
+        `records` (opsional) adalah hasil encode_block yang sudah di-cache pemanggil.
+        """
+        if not blocks:
+            return
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            manifest = dict(self._read_manifest())
+            segments = [dict(s) for s in manifest.get('segments', [])]
+            height = int(manifest.get('height', 0))
+
+            for block in blocks:
+                if int(block.get('index', -1)) != height + 1:
+                    raise ValueError(
+                        f"Block index {block.get('index')} does not extend store height {height}")
+                height += 1
+
+            pending = list(records) if records is not None else [encode_block(b) for b in blocks]
+            digest = self.digest
+            for line in pending:
+                digest = chain_digest(digest, line)
+            pos = 0
+            first_index = int(blocks[0]['index'])
+            while pos < len(pending):
+                active = segments[-1] if segments else None
+                if active is None or active.get('bytes', 0) >= self.segment_max_bytes:
+                    active = {'file': segment_name(first_index + pos), 'first_index': first_index + pos,
+                              'last_index': first_index + pos - 1, 'bytes': 0}
+                    segments.append(active)
+                path = os.path.join(self.directory, active['file'])
+                # Manifest adalah commit point: buang sisa tulisan yang belum tercatat
+                # (mis. crash di tengah append) sebelum menulis block berikutnya.
+                if os.path.exists(path) and os.path.getsize(path) > active['bytes']:
+                    os.truncate(path, active['bytes'])
+                with open(path, 'ab') as f:
+                    while pos < len(pending):
+                        line = pending[pos]
+                        f.write(line)
+                        active['bytes'] += len(line)
+                        active['last_index'] = first_index + pos
+                        pos += 1
+                        if active['bytes'] >= self.segment_max_bytes:
+                            break
+                    f.flush()
+                    self._maybe_fsync(f)
+
+            manifest.update({
+                'format': STORE_FORMAT,
+                'height': height,
+                'tip_signature': blocks[-1].get('signature'),
+                'digest': digest,
+                'segments': segments,
+            })
+            self._write_manifest(manifest)
+
+    def rewrite(self, chain):
+        """Ganti seluruh isi store dengan chain baru (restore/import/migrasi legacy).
+
+        Ditulis dulu ke store staging di samping folder ini lalu dipasang lewat replace_with,
+        sehingga crash di tengah rewrite tidak pernah meninggalkan store kosong/terpotong.
+        """
+        with self._lock:
+            parent = os.path.dirname(os.path.abspath(self.directory))
+            os.makedirs(parent, exist_ok=True)
+            staging = SegmentedChainStore(
+                tempfile.mkdtemp(prefix=os.path.basename(self.directory) + '.rewrite-', dir=parent),
+                segment_max_bytes=self.segment_max_bytes, fsync_policy=self.fsync_policy,
+                fsync_interval=self.fsync_interval)
+            try:
+                staging.append_many(list(chain))
+                self.replace_with(staging)
+            finally:
+                shutil.rmtree(staging.directory, ignore_errors=True)
+
+    def replace_with(self, other):
+        """Ambil alih isi store `other` (staging di filesystem yang sama) lewat rename, tanpa menyalin.
+
+        Segment staging dipindah dengan nama baru (tidak menimpa segment live), lalu manifest
+        baru dipasang dengan satu os.replace (commit point). Crash sebelum itu -> store lama
+        utuh; segment lama yang tidak dirujuk lagi baru dihapus setelah manifest diganti.
+        """
+        with self._lock, other._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            manifest = dict(other._read_manifest(), format=STORE_FORMAT)
+            generation = os.urandom(4).hex()
+            segments = []
+            for seg in manifest.get('segments', []):
+                name = segment_name(seg['first_index'], generation)
+                os.replace(os.path.join(other.directory, seg['file']), os.path.join(self.directory, name))
+                segments.append(dict(seg, file=name))
+            manifest['segments'] = segments
+            self._write_manifest(manifest)
+            self._remove_unreferenced()
+            other.reset()
+
+    def _remove_unreferenced(self):
+        """Hapus segment yang tidak dirujuk manifest (generasi lama / sisa replace yang crash)."""
+        live = {s['file'] for s in self._read_manifest().get('segments', [])}
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX) and name not in live:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except PermissionError:
+                    # Windows: masih dibuka pembaca (export) -> dihapus pada replace berikutnya
+                    pass
+
+    def reset(self):
+        """Hapus semua segment dan manifest."""
+        with self._lock:
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name == MANIFEST_NAME or name.endswith('.tmp') or (
+                            name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                        os.remove(os.path.join(self.directory, name))
+            self._manifest = self._empty_manifest()
+            self._stamp = None
+
+    # ----------------------------
+    # Read path
+    # ----------------------------
+    def _iter_records(self, start_index=1):
+        """Iterator (index, raw bytes) untuk setiap record mulai dari `start_index`.
+
+        Semua segment dari snapshot manifest langsung dibuka di bawah lock (bukan saat generator
+        berjalan): replace_with/rewrite yang menghapus segment generasi lama setelahnya tidak
+        memutus pembaca yang sedang streaming (file yang sudah terbuka tetap bisa dibaca).
+        """
+        with self._lock:
+            manifest = self._read_manifest()
+            height = int(manifest.get('height', 0))
+            opened = []
+            try:
+                for seg in manifest.get('segments', []):
+                    if seg['last_index'] >= start_index:
+                        opened.append((seg, open(os.path.join(self.directory, seg['file']), 'rb')))
+            except BaseException:
+                for _, f in opened:
+                    f.close()
+                raise
+        return self._read_segments(opened, start_index, height)
+
+    @staticmethod
+    def _read_segments(opened, start_index, height):
+        try:
+            for seg, f in opened:
+                index = seg['first_index']
+                for line in f:
+                    if index > min(seg['last_index'], height):
+                        break
+                    # Baris setelah last_index (torn write) tidak pernah dibaca karena
+                    # manifest hanya menunjuk block yang sudah lengkap ditulis.
+                    if index >= start_index:
+                        yield index, line
+                    index += 1
+        finally:
+            for _, f in opened:
+                f.close()
+
+    def iter_records(self, start_index=1):
+        """Iterator raw bytes NDJSON (tanpa decode) mulai dari `start_index` (untuk export).
+
+        Snapshot segment diambil saat dipanggil, bukan saat record pertama dibaca.
+        """
+        return (line for _, line in self._iter_records(start_index))
+
+    def iter_blocks(self, start_index=1):
+        """Iterator block satu per satu mulai dari `start_index` (tanpa memuat semua segment)."""
+        return (json.loads(line) for _, line in self._iter_records(start_index))
+
+    def load(self):
+        """Muat seluruh chain dari segment sebagai list of dict."""
+        return list(self.iter_blocks())
+
+    def segment_files(self):
+        with self._lock:
+            return [os.path.join(self.directory, s['file']) for s in self._read_manifest().get('segments', [])]
+
+    def segment_ranges(self):
+        """[(path, first_index, last_index), ...] dibatasi height yang sudah di-commit."""
+        with self._lock:
+            manifest = self._read_manifest()
+            height = int(manifest.get('height', 0))
+            return [(os.path.join(self.directory, s['file']), s['first_index'], min(s['last_index'], height))
+                    for s in manifest.get('segments', []) if s['first_index'] <= height]
@@ -0,0 +1,211 @@
+# chain_stream.py — Streaming chain import/export (bounded memory, single pass)
+# --------------------------------------------------------------------------
+# Import: block di-parse satu per satu dari upload (JSON array legacy, NDJSON,
+# atau versi .gz keduanya), diverifikasi (index, HMAC, previous_hash) saat itu
+# juga, lalu diteruskan per batch ke sink (mis. segment store staging).
+# Block rusak pertama langsung menghentikan import.
+#
+# Export: generator bytes dari record NDJSON yang sudah di-encode, sebagai
+# JSON array legacy atau NDJSON, opsional gzip (streaming, tanpa buffer penuh).
+# --------------------------------------------------------------------------
+import codecs
+import gzip
+import hmac
+import json
+import zlib
+
+from chain_store import encode_block
+from chain_validator import canonical_hash, hmac_signature
+from merkle import verify_block_merkle
+from pow_miner import verify_proof
+
+CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH = 256
+EXPORT_FORMATS = ('json', 'ndjson')
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class _Prefixed:
+    """File-like yang mengembalikan `head` dulu sebelum sisa `fp` (untuk sniffing format)."""
+
+    def __init__(self, head, fp):
+        self.head = head
+        self.fp = fp
+
+    def read(self, n=-1):
+        if self.head:
+            if n is None or n < 0:
+                data, self.head = self.head + self.fp.read(), b''
+                return data
+            data, self.head = self.head[:n], self.head[n:]
+            if len(data) < n:
+                data += self.fp.read(n - len(data))
+            return data
+        return self.fp.read(n)
+
+
+class _LineReader:
+    """Iterasi baris dari file-like yang hanya punya read()."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        rest = b''
+        while True:
+            chunk = self.fp.read(self.chunk_size)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            yield from lines
+        if rest:
+            yield rest
+
+
+def iter_json_array(fp, chunk_size=CHUNK_SIZE):
+    """Generator block dari JSON array `[{...}, {...}]` tanpa memuat seluruh file."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk or b'', final=eof)
+        pos = 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return ''
+            fill()
+
+    if next_char() != '[':
+        raise ValueError("Chain file harus berupa JSON array")
+    pos += 1
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                block, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+        pos = end
+        yield block
+        c = next_char()
+        if c == ']':
+            return
+        if c != ',':
+            raise ValueError("JSON array rusak (diharapkan ',' atau ']')")
+        pos += 1
+
+
+def iter_ndjson(fp):
+    """Generator block dari NDJSON (satu block per baris)."""
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_blocks(fp):
+    """Deteksi format (gzip? array / NDJSON?) lalu yield block satu per satu."""
+    head = fp.read(2)
+    fp = _Prefixed(head, fp)
+    if head == GZIP_MAGIC:
+        fp = gzip.GzipFile(fileobj=fp, mode='rb')
+    head = fp.read(CHUNK_SIZE)
+    first = head.lstrip()[:1]
+    fp = _Prefixed(head, fp)
+    if first == b'[':
+        return iter_json_array(fp)
+    if first == b'{':
+        return iter_ndjson(_LineReader(fp))
+    raise ValueError("Format chain tidak dikenal (harus JSON array atau NDJSON)")
+
+
+class ChainVerifier:
+    """Verifikasi inkremental: index berurutan, HMAC, proof-of-work, merkle root, dan previous_hash ke block sebelumnya."""
+
+    def __init__(self, key):
+        self.key = key
+        self.height = 0
+        self.tip_hash = None
+
+    def check(self, block):
+        n = self.height + 1
+        if not isinstance(block, dict) or block.get('index') != n:
+            raise ValueError(f"Block #{n}: struktur atau index tidak sesuai")
+        sig = block.get('signature')
+        if not sig or not hmac.compare_digest(hmac_signature(self.key, block), str(sig)):
+            raise ValueError(f"Block #{n}: HMAC signature mismatch")
+        if not verify_proof(block):
+            raise ValueError(f"Block #{n}: proof-of-work invalid")
+        if not verify_block_merkle(block):
+            raise ValueError(f"Block #{n}: merkle root mismatch")
+        expected_prev = '1' if n == 1 else self.tip_hash
+        if block.get('previous_hash') != expected_prev:
+            raise ValueError(f"Block #{n}: previous_hash mismatch")
+        self.tip_hash = canonical_hash(block)
+        self.height = n
+
+
+def import_blocks(blocks, key, sink, batch_size=IMPORT_BATCH):
+    """Verifikasi `blocks` (iterable) dan kirim per batch ke `sink(blocks, records)`.
+
+    Raise ValueError pada block rusak pertama (batch yang sudah dikirim tetap di sink).
+    Return ChainVerifier (height + tip_hash).
+    """
+    verifier = ChainVerifier(key)
+    batch = []
+    for block in blocks:
+        verifier.check(block)
+        batch.append(block)
+        if len(batch) >= batch_size:
+            sink(batch, [encode_block(b) for b in batch])
+            batch = []
+    if batch:
+        sink(batch, [encode_block(b) for b in batch])
+    if verifier.height == 0:
+        raise ValueError("Chain kosong")
+    return verifier
+
+
+def export_chunks(records, fmt='json', compress=False):
+    """Generator bytes export dari iterable record NDJSON (bytes, diakhiri '\\n')."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    def raw():
+        if fmt == 'ndjson':
+            yield from records
+            return
+        yield b'['
+        first = True
+        for record in records:
+            yield (b'' if first else b',') + record.rstrip(b'\n')
+            first = False
+        yield b']'
+
+    if not compress:
+        yield from raw()
+        return
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for chunk in raw():
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
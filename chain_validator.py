@@ -0,0 +1,180 @@
+# chain_validator.py — Parallel full-chain validator (process pool)
+# --------------------------------------------------------------------------
+# Chain dibagi menjadi beberapa range; setiap worker process memeriksa:
+#   1. index berurutan (index == posisi + 1)
+#   2. HMAC signature block (+ proof-of-work jika block punya `difficulty`,
+#      + merkle_root jika ada)
+#   3. previous_hash == sha256(block sebelumnya) di dalam range
+# Link di batas range digabung (join) oleh parent: previous_hash block pertama
+# range k+1 harus sama dengan hash block terakhir range k.
+#
+# Pool memakai start method forkserver/spawn (bukan fork): audit dijalankan
+# dari process web yang multi-thread, dan fork di sana bisa mewariskan lock
+# yang sedang dipegang thread lain. Range chain in-memory dikirim ke worker
+# secara lazy (imap), store dibaca sendiri oleh worker per segment.
+#
+# CLI:
+#   python chain_validator.py [--workers N] [--store chain_store] [--file blockchain.json]
+# --------------------------------------------------------------------------
+import argparse
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from chain_store import SegmentedChainStore
+from merkle import verify_block_merkle
+from pow_miner import verify_proof
+
+MIN_BLOCKS_PER_RANGE = 2048
+
+
+def canonical_hash(block):
+    """SHA-256 dari JSON canonical block (dipakai untuk previous_hash)."""
+    return hashlib.sha256(json.dumps(block, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def hmac_signature(key, block):
+    """HMAC block tanpa field `signature`."""
+    b = block.copy()
+    b.pop('signature', None)
+    payload = json.dumps(b, sort_keys=True, default=str).encode('utf-8')
+    return hmac.new(key, payload, hashlib.sha256).hexdigest()
+
+
+def check_range(blocks, key, start_pos):
+    """Periksa `blocks` (posisi chain mulai `start_pos`). Return ringkasan range."""
+    first_bad = None
+    prev_hash = None
+    last_hash = None
+    for offset, block in enumerate(blocks):
+        pos = start_pos + offset
+        if not isinstance(block, dict) or block.get('index') != pos + 1:
+            first_bad = (pos + 1, 'index mismatch')
+            break
+        sig = block.get('signature')
+        if not sig or not hmac.compare_digest(hmac_signature(key, block), sig):
+            first_bad = (pos + 1, 'HMAC signature mismatch')
+            break
+        if not verify_proof(block):
+            first_bad = (pos + 1, 'proof-of-work invalid')
+            break
+        if not verify_block_merkle(block):
+            first_bad = (pos + 1, 'merkle root mismatch')
+            break
+        if pos == 0:
+            if block.get('previous_hash') != '1':
+                first_bad = (1, 'genesis previous_hash mismatch')
+                break
+        elif prev_hash is not None and block.get('previous_hash') != prev_hash:
+            first_bad = (pos + 1, 'previous_hash mismatch')
+            break
+        prev_hash = canonical_hash(block)
+        last_hash = prev_hash
+    return {
+        'start': start_pos,
+        'count': len(blocks),
+        'first_prev_hash': blocks[0].get('previous_hash') if blocks and isinstance(blocks[0], dict) else None,
+        'last_hash': last_hash,
+        'first_bad': first_bad,
+    }
+
+
+def _check_pickled_range(args):
+    blocks, key, start = args
+    return check_range(blocks, key, start)
+
+
+def _check_segment(args):
+    path, first_index, last_index, key = args
+    blocks = []
+    with open(path, 'rb') as f:
+        for i, line in enumerate(f):
+            if first_index + i > last_index:
+                break
+            blocks.append(json.loads(line))
+    return check_range(blocks, key, first_index - 1)
+
+
+def split_ranges(n, workers, chunk_size=None):
+    size = chunk_size or max(MIN_BLOCKS_PER_RANGE, -(-n // max(1, workers * 4)))
+    return [(s, min(s + size, n)) for s in range(0, n, size)]
+
+
+def join_results(results, height, started):
+    """Gabungkan hasil per range: cek link di batas range dan cari block rusak pertama."""
+    results = sorted(results, key=lambda r: r['start'])
+    bad = [r['first_bad'] for r in results if r['first_bad']]
+    for prev, curr in zip(results, results[1:]):
+        if prev['first_bad'] is None and curr['count'] and curr['first_prev_hash'] != prev['last_hash']:
+            bad.append((curr['start'] + 1, 'previous_hash mismatch'))
+    first_bad = min(bad) if bad else None
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    return {
+        'valid': first_bad is None,
+        'height': height,
+        'first_bad_index': first_bad[0] if first_bad else None,
+        'error': first_bad[1] if first_bad else None,
+        'ranges': len(results),
+        'seconds': round(elapsed, 4),
+        'blocks_per_second': round(height / elapsed, 1),
+    }
+
+
+def _pool(workers):
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn').Pool(workers)
+
+
+def validate_chain(chain, key, workers=None, chunk_size=None, height=None):
+    """Validasi chain in-memory secara paralel (hanya `height` block pertama jika diisi). Return report dict."""
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    height = len(chain) if height is None else height
+    ranges = split_ranges(height, workers, chunk_size)
+    if workers <= 1 or len(ranges) <= 1:
+        results = [check_range(chain[s:e], key, s) for s, e in ranges]
+    else:
+        with _pool(workers) as pool:
+            results = list(pool.imap_unordered(_check_pickled_range, ((chain[s:e], key, s) for s, e in ranges)))
+    return join_results(results, height, started)
+
+
+def validate_store(store, key, workers=None):
+    """Validasi segment store: setiap worker membaca + memeriksa segmentnya sendiri."""
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    segments = store.segment_ranges()
+    if workers <= 1 or len(segments) <= 1:
+        return validate_chain(store.load(), key, workers)
+    with _pool(workers) as pool:
+        results = pool.map(_check_segment, [(p, first, last, key) for p, first, last in segments])
+    return join_results(results, store.height, started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel full-chain validator")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah worker process (default: semua core)")
+    parser.add_argument('--store', default='chain_store', help="folder segment store")
+    parser.add_argument('--file', default='blockchain.json', help="file chain legacy (jika store tidak ada)")
+    args = parser.parse_args(argv)
+
+    key = os.environ.get('SECRET_CHAIN_KEY', 'devchainsecret-changeinprod-887766').encode()
+    store = SegmentedChainStore(args.store)
+    if store.exists():
+        source = args.store
+        report = validate_store(store, key, args.workers)
+    else:
+        source = args.file
+        with open(args.file, 'r', encoding='utf-8') as f:
+            report = validate_chain(json.load(f), key, args.workers)
+
+    print(json.dumps(dict(report, source=source), indent=2))
+    return 0 if report['valid'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
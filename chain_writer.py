@@ -0,0 +1,126 @@
+# chain_writer.py — Write-behind persistence queue for the blockchain
+# --------------------------------------------------------------------------
+# Request thread hanya memasukkan state chain ke antrean (bounded). Satu worker
+# thread menulis state TERBARU saja; beberapa state yang menunggu digabung
+# (coalesce) menjadi satu kali tulis.
+#
+# Durability mode:
+#   - 'sync'  : tulis langsung di request thread (perilaku lama)
+#   - 'group' : group commit, worker mengumpulkan state selama N ms lalu menulis sekali
+#   - 'async' : worker menulis secepatnya, tanpa menunggu jendela waktu
+# --------------------------------------------------------------------------
+import queue
+import threading
+import time
+
+DURABILITY_MODES = ('sync', 'group', 'async')
+
+_STOP = object()
+
+
+class WriteBehindPersister:
+    def __init__(self, persist_fn, mode='group', group_commit_ms=50, max_pending=64, logger=None):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {mode}")
+        self.persist_fn = persist_fn
+        self.mode = mode
+        self.group_commit_ms = float(group_commit_ms)
+        self.logger = logger
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.stats = {'submitted': 0, 'writes': 0, 'coalesced': 0}
+
+    # ----------------------------
+    # Producer side
+    # ----------------------------
+    def submit(self, data, wait=False):
+        """Jadwalkan penyimpanan `data`. wait=True menunggu sampai tersimpan di disk."""
+        self.stats['submitted'] += 1
+        if self.mode == 'sync':
+            with self._sync_lock:
+                self._write(data)
+            return
+        self._ensure_worker()
+        # Queue penuh -> put() memblok (backpressure) daripada menumpuk state di memori
+        self._queue.put(data)
+        if wait:
+            self.flush()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Tunggu semua state yang antre selesai ditulis. Return False jika timeout."""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Flush lalu hentikan worker (dipanggil saat shutdown)."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # ----------------------------
+    # Worker side
+    # ----------------------------
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chain-writer', daemon=True)
+                self._thread.start()
+
+    def _drain(self, batch):
+        if self.mode == 'group':
+            deadline = time.monotonic() + self.group_commit_ms / 1000.0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain([self._queue.get()])
+            states = [item for item in batch if item is not _STOP]
+            try:
+                if states:
+                    # Hanya state terbaru yang ditulis; sisanya sudah tercakup olehnya
+                    self._write(states[-1])
+                    self.stats['coalesced'] += len(states) - 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(states) != len(batch):
+                return
+
+    def _write(self, data):
+        try:
+            self.persist_fn(data)
+            self.stats['writes'] += 1
+        except Exception as e:
+            if self.logger:
+                self.logger.error("Write-behind persistence failed: %s", e)
@@ -0,0 +1,308 @@
+# compact_chain.py — Compact columnar in-memory chain representation
+# --------------------------------------------------------------------------
+# Alternatif untuk `list of dict` di Blockchain.chain (CHAIN_MEMORY_LAYOUT=compact).
+# Block disimpan sebagai objek __slots__; transaksi disimpan kolumnar:
+#   - sender / nama produk / string items legacy -> tabel string ter-intern (id uint32)
+#   - total, timestamp, version, harga, qty      -> array('q') / array('d')
+#   - tx_id uuid hex                             -> 16 byte di satu bytearray
+# Urutan key setiap dict dicatat sebagai "layout" (tuple key ter-intern), karena
+# record NDJSON (encode_block) tidak memakai sort_keys: block yang dimaterialisasi
+# harus byte-identik dengan aslinya.
+#
+# Read API sama dengan list: len(), chain[i] / chain[a:b] (dict baru hasil
+# materialisasi), iterasi, append(dict). Transaksi yang tidak cocok skema
+# (key asing, tipe lain) disimpan apa adanya di `overflow`, jadi round-trip
+# selalu eksak.
+#
+# CLI benchmark memori:
+#   python compact_chain.py --bench [--txs 200000] [--block-size 500]
+# --------------------------------------------------------------------------
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from array import array
+
+BLOCK_SLOTS = ('index', 'timestamp', 'proof', 'previous_hash', 'merkle_root',
+               'difficulty', 'header_signature', 'signature')
+TX_FIELDS = ('tx_id', 'version', 'sender', 'items', 'total', 'timestamp')
+LINE_FIELDS = ('product_id', 'name', 'unit_price', 'qty', 'subtotal')
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1
+_HEX = frozenset('0123456789abcdef')
+
+
+def _is_int(value, lo=INT64_MIN, hi=INT64_MAX):
+    return type(value) is int and lo <= value <= hi
+
+
+def _is_tx_id(value):
+    return type(value) is str and len(value) == 32 and _HEX.issuperset(value)
+
+
+def _line_fits(line):
+    return (type(line) is dict and tuple(line) == LINE_FIELDS and _is_int(line['product_id'])
+            and type(line['name']) is str and _is_int(line['unit_price'])
+            and _is_int(line['qty']) and _is_int(line['subtotal']))
+
+
+def _tx_fits(tx):
+    """True jika transaksi bisa disimpan kolumnar tanpa kehilangan informasi."""
+    if type(tx) is not dict or not set(tx) <= set(TX_FIELDS):
+        return False
+    if 'tx_id' in tx and not _is_tx_id(tx['tx_id']):
+        return False
+    if 'version' in tx and not _is_int(tx['version'], INT32_MIN, INT32_MAX):
+        return False
+    if 'sender' in tx and type(tx['sender']) is not str:
+        return False
+    if 'total' in tx and not _is_int(tx['total']):
+        return False
+    if 'timestamp' in tx and type(tx['timestamp']) is not float:
+        return False
+    items = tx.get('items', '')
+    if type(items) is list:
+        return all(_line_fits(line) for line in items)
+    return type(items) is str
+
+
+class _Block:
+    __slots__ = BLOCK_SLOTS + ('layout', 'extra', 'tx_start', 'tx_count')
+
+
+class CompactChain:
+    def __init__(self, blocks=()):
+        self._blocks = []
+        # Tabel intern: string & layout key
+        self._strings, self._string_ids = [], {}
+        self._layouts, self._layout_ids = [], {}
+        # Kolom per transaksi (ordinal global)
+        self._tx_layout = array('I')
+        self._tx_ids = bytearray()
+        self._sender = array('I')
+        self._total = array('q')
+        self._timestamp = array('d')
+        self._version = array('i')
+        self._items = array('q')       # >= 0: offset line pertama; < 0: -(string id + 1) items legacy
+        self._items_len = array('I')
+        # Kolom per line item
+        self._line_product = array('q')
+        self._line_name = array('I')
+        self._line_price = array('q')
+        self._line_qty = array('q')
+        self._line_subtotal = array('q')
+        self.overflow = {}
+        for block in blocks:
+            self.append(block)
+
+    # ----------------------------
+    # Intern tables
+    # ----------------------------
+    def _string_id(self, s):
+        sid = self._string_ids.get(s)
+        if sid is None:
+            sid = self._string_ids[s] = len(self._strings)
+            self._strings.append(sys.intern(s))
+        return sid
+
+    def _layout_id(self, keys):
+        lid = self._layout_ids.get(keys)
+        if lid is None:
+            lid = self._layout_ids[keys] = len(self._layouts)
+            self._layouts.append(keys)
+        return lid
+
+    # ----------------------------
+    # Write path
+    # ----------------------------
+    def _append_tx(self, tx):
+        ordinal = len(self._total)
+        fits = _tx_fits(tx)
+        self._tx_layout.append(self._layout_id(tuple(tx)) if fits else 0)
+        self._tx_ids.extend(bytes.fromhex(tx['tx_id']) if fits and 'tx_id' in tx else bytes(16))
+        self._sender.append(self._string_id(tx['sender']) if fits and 'sender' in tx else 0)
+        self._total.append(tx.get('total', 0) if fits else 0)
+        self._timestamp.append(tx.get('timestamp', 0.0) if fits else 0.0)
+        self._version.append(tx.get('version', 0) if fits else 0)
+        items = tx.get('items', '') if fits else ''
+        if type(items) is list:
+            self._items.append(len(self._line_product))
+            self._items_len.append(len(items))
+            for line in items:
+                self._line_product.append(line['product_id'])
+                self._line_name.append(self._string_id(line['name']))
+                self._line_price.append(line['unit_price'])
+                self._line_qty.append(line['qty'])
+                self._line_subtotal.append(line['subtotal'])
+        else:
+            self._items.append(-(self._string_id(items) + 1))
+            self._items_len.append(0)
+        if not fits:
+            self.overflow[ordinal] = copy.deepcopy(tx)
+
+    def append(self, block):
+        b = _Block()
+        extra = {}
+        for key in BLOCK_SLOTS:
+            setattr(b, key, None)
+        for key, value in block.items():
+            if key in BLOCK_SLOTS:
+                setattr(b, key, value)
+            elif key != 'transactions':
+                extra[key] = copy.deepcopy(value)
+        transactions = block.get('transactions', [])
+        b.layout = self._layout_id(tuple(block))
+        b.extra = extra or None
+        b.tx_start = len(self._total)
+        b.tx_count = len(transactions)
+        for tx in transactions:
+            self._append_tx(tx)
+        # Block baru terlihat oleh pembaca setelah semua kolomnya lengkap
+        self._blocks.append(b)
+
+    # ----------------------------
+    # Read path
+    # ----------------------------
+    def transaction_at(self, ordinal):
+        """Materialisasi satu transaksi (dict baru) dari ordinal global."""
+        if ordinal in self.overflow:
+            return copy.deepcopy(self.overflow[ordinal])
+        tx = {}
+        for key in self._layouts[self._tx_layout[ordinal]]:
+            if key == 'tx_id':
+                tx[key] = self._tx_ids[ordinal * 16:ordinal * 16 + 16].hex()
+            elif key == 'version':
+                tx[key] = self._version[ordinal]
+            elif key == 'sender':
+                tx[key] = self._strings[self._sender[ordinal]]
+            elif key == 'total':
+                tx[key] = self._total[ordinal]
+            elif key == 'timestamp':
+                tx[key] = self._timestamp[ordinal]
+            else:
+                ref = self._items[ordinal]
+                if ref < 0:
+                    tx[key] = self._strings[-ref - 1]
+                else:
+                    tx[key] = [{'product_id': self._line_product[i],
+                                'name': self._strings[self._line_name[i]],
+                                'unit_price': self._line_price[i],
+                                'qty': self._line_qty[i],
+                                'subtotal': self._line_subtotal[i]}
+                               for i in range(ref, ref + self._items_len[ordinal])]
+        return tx
+
+    def transaction(self, pos, tx_pos):
+        b = self._blocks[pos]
+        if not 0 <= tx_pos < b.tx_count:
+            raise IndexError(tx_pos)
+        return self.transaction_at(b.tx_start + tx_pos)
+
+    def block_index(self, pos):
+        return self._blocks[pos].index
+
+    def tx_count(self, pos):
+        return self._blocks[pos].tx_count
+
+    def block_timestamp(self, pos):
+        return self._blocks[pos].timestamp
+
+    def _materialize(self, b):
+        block = {}
+        for key in self._layouts[b.layout]:
+            if key == 'transactions':
+                block[key] = [self.transaction_at(i) for i in range(b.tx_start, b.tx_start + b.tx_count)]
+            elif key in BLOCK_SLOTS:
+                block[key] = getattr(b, key)
+            else:
+                block[key] = copy.deepcopy(b.extra[key])
+        return block
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self._materialize(b) for b in self._blocks[pos]]
+        return self._materialize(self._blocks[pos])
+
+    def __iter__(self):
+        for i in range(len(self._blocks)):
+            yield self._materialize(self._blocks[i])
+
+    def copy(self):
+        return CompactChain(self)
+
+
+# ----------------------------
+# Memory benchmark
+# ----------------------------
+def synthetic_chain(n_txs, block_size=500, seed=1):
+    """Chain v2 sintetis (tanpa signature asli) untuk benchmark memori."""
+    rnd = random.Random(seed)
+    senders = [f'buyer{i}' for i in range(max(1, n_txs // 20))]
+    products = [(i, f'Produk {i}', 1000 * rnd.randint(5, 500)) for i in range(1, 40)]
+    chain, ts = [{'index': 1, 'timestamp': 1700000000.0, 'transactions': [], 'proof': 100, 'previous_hash': '1'}], 1700000000.0
+    made = 0
+    while made < n_txs:
+        txs = []
+        for _ in range(min(block_size, n_txs - made)):
+            ts += rnd.random()
+            lines = []
+            for pid, name, price in rnd.sample(products, rnd.randint(1, 3)):
+                qty = rnd.randint(1, 4)
+                lines.append({'product_id': pid, 'name': name, 'unit_price': price, 'qty': qty, 'subtotal': price * qty})
+            txs.append({'tx_id': uuid.UUID(int=rnd.getrandbits(128)).hex, 'version': 2,
+                        'sender': rnd.choice(senders), 'items': lines,
+                        'total': sum(line['subtotal'] for line in lines), 'timestamp': ts})
+            made += 1
+        chain.append({'index': len(chain) + 1, 'timestamp': ts, 'transactions': txs, 'proof': 12345,
+                      'previous_hash': '%064x' % rnd.getrandbits(256), 'merkle_root': '%064x' % rnd.getrandbits(256),
+                      'header_signature': '%064x' % rnd.getrandbits(256), 'signature': '%064x' % rnd.getrandbits(256)})
+    return chain
+
+
+def measure(build):
+    """(hasil, byte teralokasi yang masih hidup) dari `build()` menurut tracemalloc."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark memori: list of dict vs CompactChain")
+    parser.add_argument('--bench', action='store_true', help="jalankan benchmark memori")
+    parser.add_argument('--txs', type=int, default=200000, help="jumlah transaksi sintetis")
+    parser.add_argument('--block-size', type=int, default=500, help="transaksi per block")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+
+    # Dict chain dibangun dari JSON (seperti saat load dari store): tidak ada string yang dibagi antar block
+    raw = json.dumps(synthetic_chain(args.txs, args.block_size))
+    dict_chain, dict_bytes = measure(lambda: json.loads(raw))
+    started = time.perf_counter()
+    compact, compact_bytes = measure(lambda: CompactChain(dict_chain))
+    build_seconds = time.perf_counter() - started
+    assert compact[len(compact) - 1] == dict_chain[-1]
+
+    per_tx = lambda n: n / max(1, args.txs)
+    print(f"{'layout':>8} {'bytes':>14} {'bytes/tx':>10}")
+    print(f"{'dict':>8} {dict_bytes:>14,} {per_tx(dict_bytes):>10.0f}")
+    print(f"{'compact':>8} {compact_bytes:>14,} {per_tx(compact_bytes):>10.0f}")
+    print(f"ratio {compact_bytes / max(1, dict_bytes):.2%} (build {build_seconds:.2f}s, overflow {len(compact.overflow)} tx)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,10 +2,14 @@ import json
 import os
 import hashlib
 import shutil
+import sys
 from datetime import datetime
 
+from chain_store import SegmentedChainStore
+
 BLOCKCHAIN_FILE = "blockchain.json"
 BACKUP_DIR = "chain_backup"
+CHAIN_STORE_DIR = "chain_store"
 
 
 def sha256(data):
@@ -30,6 +34,12 @@ def backup_chain():
 
 
 def load_chain():
+    # Segment store (append-only log) lebih baru daripada blockchain.json legacy
+    store = SegmentedChainStore(CHAIN_STORE_DIR)
+    if store.exists():
+        print(f"[INFO] Memuat chain dari segment store: {CHAIN_STORE_DIR}/")
+        return store.load()
+
     if not os.path.exists(BLOCKCHAIN_FILE):
         print("[ERROR] blockchain.json tidak ditemukan.")
         return None
@@ -41,6 +51,10 @@ def load_chain():
 def clean_transaction(tx):
     items = tx.get("items")
 
+    # Transaksi v2: items berupa list line item terstruktur -> pertahankan
+    if isinstance(items, list) and all(isinstance(x, dict) for x in items):
+        return tx
+
     # Jika items bukan string → ubah ke string JSON
     if not isinstance(items, str):
         try:
@@ -97,6 +111,23 @@ def save_chain(chain):
         json.dump(chain, f, ensure_ascii=False, indent=2)
     print("[OK] blockchain.json berhasil ditulis ulang.")
 
+    store = SegmentedChainStore(CHAIN_STORE_DIR)
+    if store.exists():
+        store.rewrite(chain)
+        print(f"[OK] Segment store {CHAIN_STORE_DIR}/ berhasil ditulis ulang.")
+
+
+def export_legacy():
+    """Tulis isi segment store ke blockchain.json (format legacy) tanpa membersihkan."""
+    store = SegmentedChainStore(CHAIN_STORE_DIR)
+    if not store.exists():
+        print("[ERROR] Segment store tidak ditemukan.")
+        return
+    chain = store.load()
+    with open(BLOCKCHAIN_FILE, "w", encoding="utf-8") as f:
+        json.dump(chain, f, ensure_ascii=False, indent=2)
+    print(f"[OK] {len(chain)} block diekspor ke {BLOCKCHAIN_FILE}.")
+
 
 def main():
     print("\n===== 🚀 BLOCKCHAIN CLEANER STARTED =====\n")
@@ -114,4 +145,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--export-legacy":
+        export_legacy()
+    else:
+        main()
@@ -0,0 +1,228 @@
+# log_pipeline.py — Non-blocking logging pipeline (queue + batched writer)
+# --------------------------------------------------------------------------
+# Request thread hanya menjalankan filter sampling lalu memasukkan record ke
+# queue bounded (tanpa format JSON, tanpa I/O). Satu listener thread mengambil
+# record per batch, memformat, dan menulis batch ke file/stream sekaligus.
+#
+# Overflow policy saat queue penuh (sink lambat/macet):
+#   - 'drop'  : record dibuang dan dihitung di stats['dropped'] (default; checkout tidak pernah menunggu)
+#   - 'block' : caller menunggu maksimal block_timeout detik, lalu dibuang
+#
+# Sampling per pesan (mis. {"Transaction mined.": 0.1} = simpan 1 dari 10).
+# Deterministik (berbasis counter), dan WARNING ke atas tidak pernah di-sampling.
+#
+# Fork (mis. gunicorn --preload): thread listener tidak ikut ke child. Setelah
+# fork, child membuat queue + lock baru dan listener di-start ulang secara
+# lazy pada record pertama (hanya jika pipeline sudah di-start di parent).
+# --------------------------------------------------------------------------
+import copy
+import functools
+import logging
+import math
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+from logging.handlers import QueueHandler
+
+OVERFLOW_POLICIES = ('drop', 'block')
+
+_STOP = object()
+_EXC_FORMATTER = logging.Formatter()
+
+
+def parse_sample_rates(spec):
+    """'Transaction mined.=0.1;Processing new order.=0.25' -> dict pesan -> rate (0..1)."""
+    rates = {}
+    for part in (spec or '').split(';'):
+        if not part.strip():
+            continue
+        message, sep, rate = part.rpartition('=')
+        if not sep or not message.strip():
+            raise ValueError(f"Invalid sample rate entry: {part!r}")
+        rates[message.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+
+    def filter(self, record):
+        rate = self.rates.get(record.msg)
+        if rate is None or rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            n = self._counts.get(record.msg, 0) + 1
+            self._counts[record.msg] = n
+            # Simpan record ke-n jika floor(n*rate) naik: tepat `rate` bagian, tersebar merata
+            keep = math.floor(n * rate) > math.floor((n - 1) * rate)
+            if not keep:
+                self.sampled_out += 1
+        return keep
+
+
+def _reset_after_fork(ref):
+    pipeline = ref()
+    if pipeline is not None:
+        pipeline._after_fork()
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, log_queue, policy='drop', block_timeout=0.05, before_enqueue=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = float(block_timeout)
+        self.before_enqueue = before_enqueue
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Hanya merge args + traceback ke teks; format JSON dikerjakan listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.before_enqueue:
+            self.before_enqueue()
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    def __init__(self, formatter, stream=None, path=None, max_queue=10000, policy='drop',
+                 block_timeout=0.05, batch_size=256, flush_interval=0.2, sample_rates=None):
+        """Tulis ke `path` (append) jika diisi, selain itu ke `stream` (default stderr)."""
+        self.formatter = formatter
+        self.stream = stream
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self.sampler = SamplingFilter(sample_rates)
+        self.handler = BoundedQueueHandler(self.queue, policy=policy, block_timeout=block_timeout,
+                                           before_enqueue=self._ensure_started)
+        self.handler.addFilter(self.sampler)
+        self._file = None
+        self._thread = None
+        self._running = False
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=functools.partial(_reset_after_fork, weakref.ref(self)))
+
+    @property
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'dropped': self.handler.dropped,
+                'sampled_out': self.sampler.sampled_out, 'written': self.written,
+                'batches': self.batches, 'errors': self.errors}
+
+    def start(self):
+        with self._start_lock:
+            self._running = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def _ensure_started(self):
+        # Listener hilang setelah fork -> start ulang di process ini
+        if self._running and self._thread is None:
+            self.start()
+
+    def _after_fork(self):
+        """Child process: thread listener tidak ikut ter-fork, lock/queue bisa sedang dipegang."""
+        self.queue = self.handler.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._start_lock = threading.Lock()
+        self.sampler._lock = threading.Lock()
+        self._thread = None
+        # File parent tidak ditutup di sini (buffer-nya milik parent); child membuka sendiri
+        self._file = None
+
+    def _sink(self):
+        if self.path:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            return self._file
+        return self.stream or sys.stderr
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record) + '\n')
+            except Exception:
+                self.errors += 1
+        try:
+            sink = self._sink()
+            sink.write(''.join(lines))
+            sink.flush()
+            self.written += len(lines)
+            self.batches += 1
+        except (OSError, ValueError):
+            self.errors += 1
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            stop = record is _STOP
+            batch = [] if stop else [record]
+            deadline = time.monotonic() + self.flush_interval
+            # Kumpulkan sampai batch_size atau flush_interval habis (stop: kuras sisa queue)
+            while not stop and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    record = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                batch.append(record)
+            if stop:
+                while True:
+                    try:
+                        record = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is not _STOP:
+                        batch.append(record)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def stop(self, timeout=5.0):
+        """Tulis semua record yang masih antre lalu hentikan listener."""
+        self._running = False
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,90 @@
+# merkle.py — Merkle root per block + transaction inclusion proofs
+# --------------------------------------------------------------------------
+# Leaf  = sha256(0x00 || JSON canonical transaksi)
+# Node  = sha256(0x01 || left || right)   (prefix beda -> leaf tidak bisa menyamar jadi node)
+# Level ganjil: node terakhir dinaikkan apa adanya (tidak diduplikasi).
+#
+# Header block = semua field KECUALI transactions/signature/header_signature,
+# sehingga memuat merkle_root. header_signature = HMAC(HEADER_MAC_TAG || header);
+# satu transaksi dapat dibuktikan dengan header + branch O(log n) tanpa transaksi
+# lainnya. Tag domain wajib: key-nya sama dengan signature block, tanpa tag
+# header_signature = signature yang valid untuk block yang sama tanpa transactions.
+# --------------------------------------------------------------------------
+import hashlib
+import hmac
+import json
+
+HEADER_EXCLUDE = ('transactions', 'signature', 'header_signature')
+HEADER_MAC_TAG = b'block-header\x00'
+
+
+def leaf_hash(tx):
+    return hashlib.sha256(b'\x00' + json.dumps(tx, sort_keys=True, default=str).encode('utf-8')).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def merkle_levels(transactions):
+    """Semua level tree, dari leaf sampai root (list of list of bytes)."""
+    level = [leaf_hash(tx) for tx in transactions]
+    if not level:
+        return [[hashlib.sha256(b'').digest()]]
+    levels = [level]
+    while len(level) > 1:
+        level = [node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(transactions):
+    return merkle_levels(transactions)[-1][0].hex()
+
+
+def merkle_branch(levels, index):
+    """Branch untuk leaf `index`: [{'hash': hex, 'side': 'left'|'right'}, ...] dari bawah ke atas."""
+    if not 0 <= index < len(levels[0]):
+        raise IndexError(index)
+    branch = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            branch.append({'hash': level[sibling].hex(), 'side': 'left' if sibling < index else 'right'})
+        index //= 2
+    return branch
+
+
+def root_from_branch(tx, branch):
+    h = leaf_hash(tx)
+    for step in branch:
+        sibling = bytes.fromhex(step['hash'])
+        h = node_hash(sibling, h) if step['side'] == 'left' else node_hash(h, sibling)
+    return h.hex()
+
+
+def block_header(block):
+    return {k: v for k, v in block.items() if k not in HEADER_EXCLUDE}
+
+
+def sign_header(key, block):
+    """HMAC header: JSON canonical seperti signature block, diberi prefix HEADER_MAC_TAG."""
+    payload = json.dumps(block_header(block), sort_keys=True, default=str).encode('utf-8')
+    return hmac.new(key, HEADER_MAC_TAG + payload, hashlib.sha256).hexdigest()
+
+
+def verify_block_merkle(block):
+    """True jika merkle_root cocok dengan transaksi (block lama tanpa merkle_root selalu valid)."""
+    root = block.get('merkle_root')
+    return root is None or root == merkle_root(block.get('transactions', []))
+
+
+def verify_inclusion(tx, branch, header, header_signature, key):
+    """Verifikasi satu transaksi terhadap header yang ditandatangani, tanpa transaksi lain di block."""
+    try:
+        if not hmac.compare_digest(sign_header(key, header), str(header_signature)):
+            return False
+        return header.get('merkle_root') == root_from_branch(tx, branch)
+    except (KeyError, TypeError, ValueError):
+        return False
@@ -0,0 +1,439 @@
+# metrics.py — Lightweight Prometheus-style instrumentation
+# --------------------------------------------------------------------------
+# Counter, Gauge (callback, dihitung saat scrape) dan Histogram (bucket tetap)
+# dengan label. Update hanya menyentuh dict in-memory di bawah lock pendek;
+# tidak ada I/O di hot path.
+#
+# Multi-process (mis. gunicorn -w N): set `directory` -> setiap process
+# menulis snapshot miliknya sendiri (metrics_<pid>_<start>.json, atomic)
+# secara periodik dan HANYA jika ada perubahan. <start> = waktu start process
+# sehingga PID yang dipakai ulang tidak tertukar dengan process lama.
+# /metrics di worker mana pun menjumlahkan counter/histogram semua snapshot
+# + state live process itu sendiri; gauge diberi label pid. Snapshot process
+# yang sudah mati dilipat ke metrics_aggregate.json (di bawah file lock) lalu
+# dihapus, sehingga jumlah file tidak bertambah terus setiap worker restart.
+#
+# Fork (gunicorn --preload): child mulai dari nilai kosong (nilai parent
+# sudah dilaporkan parent), lock dibuat ulang, dan thread flusher di-start
+# ulang pada update metrik pertama.
+#
+# REGISTRY adalah registry bersama satu process: modul mana pun bisa
+# mendaftarkan metrik saat import (tanpa I/O); create_app() memanggil
+# configure() + start() sekali.
+# --------------------------------------------------------------------------
+import functools
+import json
+import math
+import os
+import threading
+import time
+import weakref
+
+from process_lock import ProcessLock
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SNAPSHOT_PREFIX = 'metrics_'
+AGGREGATE_FILE = 'metrics_aggregate.json'
+LOCK_FILE = 'metrics.lock'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid):
+    """Waktu start process (clock tick sejak boot, /proc Linux), None jika tidak tersedia."""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+        return int(stat[stat.rindex(b')') + 2:].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _process_alive(pid, start):
+    if not _pid_alive(pid):
+        return False
+    current = _process_start(pid)
+    # Tanpa /proc PID yang dipakai ulang tidak bisa dibedakan -> anggap masih hidup
+    return current is None or current == start
+
+
+def _parse_snapshot_name(fname):
+    """'metrics_<pid>_<start>.json' -> (pid, start), None untuk nama lain."""
+    if not (fname.startswith(SNAPSHOT_PREFIX) and fname.endswith('.json')):
+        return None
+    try:
+        pid, start = fname[len(SNAPSHOT_PREFIX):-len('.json')].split('_')
+        return int(pid), int(start)
+    except ValueError:
+        return None
+
+
+def _merge_into(merged, metrics, labels_suffix=None):
+    """Tambahkan snapshot `metrics` ke `merged` (counter/histogram dijumlah; gauge hanya jika
+    `labels_suffix` diberikan, diberi label tambahan tersebut)."""
+    for name, m in metrics.items():
+        entry = merged.setdefault(name, {'type': m['type'], 'help': m['help'],
+                                         'labelnames': m['labelnames'], 'buckets': m['buckets'],
+                                         'samples': {}})
+        if m['type'] == 'gauge':
+            if labels_suffix is None:
+                continue
+            for labels, value in m['samples']:
+                entry['samples'][tuple(labels) + labels_suffix] = value
+            continue
+        for labels, value in m['samples']:
+            key = tuple(labels)
+            if m['type'] == 'counter':
+                entry['samples'][key] = entry['samples'].get(key, 0) + value
+            else:
+                row = entry['samples'].get(key)
+                entry['samples'][key] = list(value) if row is None else [a + b for a, b in zip(row, value)]
+    return merged
+
+
+def _reset_after_fork(ref):
+    registry = ref()
+    if registry is not None:
+        registry._after_fork()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v if not isinstance(v, list) else list(v)] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        # Layout nilai: [count per bucket (non-kumulatif)..., count +Inf, sum]
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+        self.registry.changed()
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, registry, name, help_text, fn, labelnames=()):
+        """`fn()` mengembalikan angka, atau dict {tuple label: angka} jika ada labelnames."""
+        super().__init__(registry, name, help_text, labelnames)
+        self.fn = fn
+
+    def snapshot(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            return [[[str(v) for v in k], float(n)] for k, n in value.items()]
+        return [[[], float(value)]]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None, flush_interval=10.0):
+        self.directory = directory
+        self.flush_interval = float(flush_interval)
+        self.metrics = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._running = False
+        self._stopping = threading.Event()
+        self._file_lock = None
+        self.start_time = _process_start(os.getpid()) or int(time.time() * 1000)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=functools.partial(_reset_after_fork, weakref.ref(self)))
+
+    def configure(self, directory=None, flush_interval=None):
+        """Set directory snapshot / interval flush sebelum start() (metrik yang sudah terdaftar tetap)."""
+        self.directory = directory
+        self._file_lock = None
+        if flush_interval is not None:
+            self.flush_interval = float(flush_interval)
+        return self
+
+    def changed(self):
+        """Dipanggil setiap update metrik: tandai dirty, start ulang flusher yang hilang setelah fork."""
+        self.dirty = True
+        if self._running and self._flusher is None:
+            self.start()
+
+    def _after_fork(self):
+        """Child process: nilai parent sudah dilaporkan parent, thread flusher tidak ikut ter-fork."""
+        self._lock = threading.Lock()
+        for m in self.metrics.values():
+            m._lock = threading.Lock()
+            m._values = {}
+        self.dirty = False
+        self._flusher = None
+        self._stopping = threading.Event()
+        self._file_lock = None
+        self.start_time = _process_start(os.getpid()) or int(time.time() * 1000)
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn, labelnames=()):
+        return self._register(Gauge(self, name, help_text, fn, labelnames))
+
+    def timed(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Decorator: durasi setiap panggilan masuk ke histogram `name` (dibuat sekali)."""
+        histogram = self.metrics.get(name) or self.histogram(name, help_text, buckets=buckets)
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    # ----------------------------
+    # Multi-process snapshots
+    # ----------------------------
+    def _snapshot_path(self):
+        return os.path.join(self.directory, f'{SNAPSHOT_PREFIX}{os.getpid()}_{self.start_time}.json')
+
+    def _lock_dir(self):
+        if self._file_lock is None:
+            self._file_lock = ProcessLock(os.path.join(self.directory, LOCK_FILE))
+        return self._file_lock
+
+    def snapshot(self, include_gauges=True):
+        out = {}
+        for m in list(self.metrics.values()):
+            if m.kind == 'gauge' and not include_gauges:
+                continue
+            out[m.name] = {'type': m.kind, 'help': m.help, 'labelnames': list(m.labelnames),
+                           'buckets': list(getattr(m, 'buckets', ())), 'samples': m.snapshot()}
+        return out
+
+    def flush(self):
+        """Tulis snapshot process ini (atomic). No-op tanpa directory atau tanpa perubahan."""
+        if not self.directory or not self.dirty:
+            return False
+        self.dirty = False
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._snapshot_path()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'start': self.start_time, 'written': time.time(),
+                       'metrics': self.snapshot(include_gauges=True)}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+        return True
+
+    def start(self):
+        with self._lock:
+            if self.directory and self._flusher is None and self.flush_interval > 0:
+                self._running = True
+                self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+                self._flusher.start()
+        return self
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                self.dirty = True
+
+    def stop(self):
+        self._running = False
+        self._stopping.set()
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def _read_json(self, fname):
+        try:
+            with open(os.path.join(self.directory, fname), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fold_dead(self):
+        """Lipat snapshot process yang sudah mati ke metrics_aggregate.json lalu hapus filenya.
+
+        Nama file yang sudah dilipat dicatat di aggregate (ditulis atomic sebelum file dihapus),
+        jadi crash di antara keduanya tidak membuat snapshot terhitung dua kali.
+        """
+        own = (os.getpid(), self.start_time)
+        with self._lock_dir():
+            names = os.listdir(self.directory)
+            dead = []
+            for fname in names:
+                parsed = _parse_snapshot_name(fname)
+                if parsed is not None and parsed != own and not _process_alive(*parsed):
+                    dead.append(fname)
+            if not dead:
+                return 0
+            aggregate = self._read_json(AGGREGATE_FILE) or {}
+            folded = set(aggregate.get('folded', ())) & set(names)
+            merged = _merge_into({}, aggregate.get('metrics', {}))
+            fresh = [f for f in dead if f not in folded]
+            for fname in fresh:
+                snapshot = self._read_json(fname)
+                if snapshot and isinstance(snapshot.get('metrics'), dict):
+                    _merge_into(merged, snapshot['metrics'])
+            if fresh:
+                metrics = {name: dict(m, samples=[[list(k), v] for k, v in m['samples'].items()])
+                           for name, m in merged.items()}
+                path = os.path.join(self.directory, AGGREGATE_FILE)
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump({'folded': sorted(folded | set(fresh)), 'metrics': metrics}, f, separators=(',', ':'))
+                os.replace(path + '.tmp', path)
+            for fname in dead:
+                try:
+                    os.unlink(os.path.join(self.directory, fname))
+                except FileNotFoundError:
+                    pass
+            return len(fresh)
+
+    def _collect(self):
+        """Gabungkan snapshot semua process (file) + aggregate process mati + state live process ini."""
+        own = os.getpid()
+        sources = [(own, self.snapshot())]
+        if self.directory and os.path.isdir(self.directory):
+            self.fold_dead()
+            for fname in os.listdir(self.directory):
+                parsed = _parse_snapshot_name(fname)
+                if parsed is None or parsed == (own, self.start_time):
+                    continue
+                snapshot = self._read_json(fname)
+                if snapshot and isinstance(snapshot.get('metrics'), dict):
+                    sources.append((parsed[0], snapshot['metrics']))
+            aggregate = self._read_json(AGGREGATE_FILE)
+            if aggregate and isinstance(aggregate.get('metrics'), dict):
+                sources.append((None, aggregate['metrics']))
+
+        merged = {}
+        multi = len(sources) > 1
+        for pid, metrics in sources:
+            # Aggregate (pid None) tidak punya gauge: gauge process mati tidak relevan lagi
+            _merge_into(merged, metrics, None if pid is None else ((str(pid),) if multi else ()))
+        return merged, multi
+
+    def render(self):
+        """Seluruh metrik dalam Prometheus text exposition format 0.0.4."""
+        merged, multi = self._collect()
+        lines = []
+        for name in sorted(merged):
+            m = merged[name]
+            lines.append(f'# HELP {name} {m["help"]}')
+            lines.append(f'# TYPE {name} {m["type"]}')
+            names = m['labelnames'] + (['pid'] if m['type'] == 'gauge' and multi else [])
+            for key in sorted(m['samples']):
+                value = m['samples'][key]
+                if m['type'] != 'histogram':
+                    lines.append(f'{name}{_labels(names, key)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(m['buckets']) + [math.inf], value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(names, key, [("le", _number(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(names, key)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(names, key)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
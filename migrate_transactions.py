@@ -0,0 +1,103 @@
+# migrate_transactions.py — One-time migration: legacy item strings -> v2 line items
+# --------------------------------------------------------------------------
+# Transaksi lama menyimpan items sebagai string "Nama (xQty), ...". Tool ini
+# mengubahnya menjadi list line item terstruktur (product_id, name,
+# unit_price, qty, subtotal) lalu menandatangani ulang SEMUA block dan
+# menyambung ulang previous_hash (merkle root, header signature dan
+# proof-of-work ikut dihitung ulang), karena isi block berubah.
+#
+# Total transaksi yang tercatat TIDAK diubah (harga produk bisa sudah berubah).
+# Backup snapshot diambil sebelum chain baru disimpan.
+#
+# CLI:
+#   python migrate_transactions.py [--dry-run]
+# --------------------------------------------------------------------------
+import argparse
+import copy
+import sys
+
+from chain_core import TX_SCHEMA_VERSION, clean_line_item, parse_legacy_items
+from merkle import merkle_root
+from pow_miner import ProofOfWorkMiner
+
+
+def migrate_chain(chain, resolve_product, sign_fn, hash_fn, header_sign_fn=None):
+    """Return (chain_baru, jumlah_tx_dimigrasi). `chain` input tidak diubah.
+
+    resolve_product(name) -> (product_id, unit_price) atau None jika tidak dikenal.
+    header_sign_fn(block) -> header_signature baru (tanpa ini header_signature lama dibuang).
+    """
+    migrated = 0
+    new_chain = []
+    for pos, block in enumerate(chain):
+        block = copy.deepcopy(block)
+        for tx in block.get('transactions', []):
+            if not isinstance(tx.get('items'), str):
+                continue
+            items = []
+            for item in parse_legacy_items(tx['items']):
+                resolved = resolve_product(item['name'])
+                if resolved:
+                    item['product_id'], item['unit_price'] = resolved
+                    item['subtotal'] = item['unit_price'] * item['qty']
+                items.append(clean_line_item(item))
+            tx['items'] = items
+            tx['version'] = TX_SCHEMA_VERSION
+            migrated += 1
+
+        block['previous_hash'] = '1' if pos == 0 else hash_fn(new_chain[-1])
+        block.pop('signature', None)
+        if 'merkle_root' in block:
+            block['merkle_root'] = merkle_root(block.get('transactions', []))
+        if block.get('difficulty'):
+            # Isi block berubah -> proof-of-work lama tidak berlaku, mining ulang dengan difficulty yang sama
+            ProofOfWorkMiner(block['difficulty']).seal(block)
+        block.pop('header_signature', None)
+        if header_sign_fn and 'merkle_root' in block:
+            block['header_signature'] = header_sign_fn(block)
+        block['signature'] = sign_fn(block)
+        new_chain.append(block)
+    return new_chain, migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrasi transaksi legacy ke line item v2")
+    parser.add_argument('--dry-run', action='store_true', help="hitung saja, jangan simpan")
+    args = parser.parse_args(argv)
+
+    import chain_storage as store
+    from app import create_app, product_resolver
+    from chain_core import SECRET_CHAIN_KEY, Blockchain, sign_block, verify_chain_data
+    from merkle import sign_header
+
+    def resolve_product(name):
+        product = product_resolver.by_name(name)
+        return (product.id, product.price) if product else None
+
+    # Segel sisa mempool dulu agar tidak ada block baru di tengah migrasi
+    app = create_app({'CHAIN_WARMUP': 'lazy'})
+    store.block_producer.stop()
+    store.get_chain()
+    store.chain_persister.flush()
+    # Store lock: worker lain (CHAIN_SHARED_STORE) tidak bisa append selama migrasi
+    with app.app_context(), store.store_lock:
+        chain_obj = store.refresh_chain()
+        with chain_obj.lock:
+            old_chain = chain_obj.chain
+            new_chain, migrated = migrate_chain(old_chain, resolve_product, sign_block, Blockchain.hash,
+                                                lambda b: sign_header(SECRET_CHAIN_KEY, b))
+            print(f"[INFO] {migrated} transaksi legacy akan dimigrasi ({len(new_chain)} block).")
+            if args.dry_run or migrated == 0:
+                print("[OK] Tidak ada yang disimpan.")
+                return 0
+
+            verify_chain_data(new_chain)
+            store.backup_blockchain(old_chain)
+            store.set_chain(Blockchain(chain=new_chain))
+            store.save_chain_to_file(store.get_chain())
+    print("[OK] Migrasi selesai; backup sebelum migrasi tersimpan di daftar snapshot.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# pow_miner.py — Configurable proof-of-work miner (multiprocessing)
+# --------------------------------------------------------------------------
+# Proof block = nonce sehingga sha256(header || nonce[8 byte big-endian])
+# memiliki minimal `difficulty` bit nol di depan. Header = sha256 dari JSON
+# canonical block TANPA field `proof`, `signature` dan `header_signature` (difficulty ikut
+# ter-hash sehingga tidak bisa diturunkan setelah mining).
+#
+# Ruang nonce dibagi berselang-seling (strided) ke N worker process; worker
+# pertama yang menemukan solusi men-set Event bersama dan worker lain berhenti
+# di akhir chunk berikutnya.
+#
+# Worker adalah pool persisten (dibuat sekali per jumlah worker, dipakai
+# bersama semua miner) dengan start method forkserver/spawn: tidak pernah
+# fork dari process web yang multi-thread (thread lain bisa sedang memegang lock).
+#
+# difficulty 0 = perilaku lama: tidak ada mining, proof konstanta, block
+# tidak mendapat field `difficulty`.
+#
+# CLI benchmark:
+#   python pow_miner.py --bench [--seconds 3] [--workers 1,2,4]
+# --------------------------------------------------------------------------
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+CHUNK = 1 << 14
+MAX_NONCE = (1 << 64) - 1
+
+
+def pow_header(block):
+    """Digest 32 byte dari isi block yang diikat oleh proof (tanpa proof & kedua signature)."""
+    body = {k: v for k, v in block.items() if k not in ('proof', 'signature', 'header_signature')}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).digest()
+
+
+def meets_target(digest, difficulty):
+    return int.from_bytes(digest, 'big') >> (256 - difficulty) == 0
+
+
+def verify_proof(block):
+    """True jika proof block memenuhi difficulty yang dideklarasikan block (0 / tanpa field = selalu valid)."""
+    difficulty = block.get('difficulty', 0)
+    if not difficulty:
+        return True
+    nonce = block.get('proof')
+    if not isinstance(difficulty, int) or not 0 < difficulty <= 256:
+        return False
+    if not isinstance(nonce, int) or not 0 <= nonce <= MAX_NONCE:
+        return False
+    digest = hashlib.sha256(pow_header(block) + nonce.to_bytes(8, 'big')).digest()
+    return meets_target(digest, difficulty)
+
+
+def _scan(prefix, shift, start, count):
+    """Cari nonce di [start, start+count). Return nonce atau None."""
+    for nonce in range(start, min(start + count, MAX_NONCE + 1)):
+        h = prefix.copy()
+        h.update(nonce.to_bytes(8, 'big'))
+        if int.from_bytes(h.digest(), 'big') >> shift == 0:
+            return nonce
+    return None
+
+
+def _search(header, difficulty, start, step, chunk, found, deadline, results):
+    prefix = hashlib.sha256(header)
+    shift = 256 - difficulty
+    hashes = 0
+    base = start
+    while not found.is_set() and base <= MAX_NONCE:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        nonce = _scan(prefix, shift, base, chunk)
+        if nonce is not None:
+            found.set()
+            results.put((nonce, hashes + nonce - base + 1))
+            return
+        hashes += chunk
+        base += step
+    results.put((None, hashes))
+
+
+class _LocalQueue(list):
+    put = list.append
+
+
+_found = None  # Event milik pool, diset di process worker oleh _init_worker
+
+
+def _init_worker(found):
+    global _found
+    _found = found
+
+
+def _pool_search(header, difficulty, start, step, chunk, deadline):
+    results = _LocalQueue()
+    _search(header, difficulty, start, step, chunk, _found, deadline, results)
+    return results[0]
+
+
+class _MinerPool:
+    def __init__(self, workers):
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.found = ctx.Event()
+        self.pool = ctx.Pool(workers, initializer=_init_worker, initargs=(self.found,))
+        self.lock = threading.Lock()  # satu mining per pool (Event dipakai bersama)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = _MinerPool(workers)
+        return pool
+
+
+def close_pools():
+    """Hentikan semua pool worker mining (shutdown aplikasi)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.pool.terminate()
+        pool.pool.join()
+
+
+class ProofOfWorkMiner:
+    def __init__(self, difficulty=0, workers=None, chunk=CHUNK, logger=None):
+        self.difficulty = int(difficulty)
+        if not 0 <= self.difficulty <= 256:
+            raise ValueError(f"Invalid difficulty: {difficulty}")
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.chunk = int(chunk)
+        self.logger = logger
+        self.last_stats = None
+
+    def mine(self, block, max_seconds=None):
+        """Cari proof untuk `block` (dict tanpa proof/signature). Return nonce, atau None jika timeout.
+
+        Statistik (hashes, seconds, hashrate) tersimpan di `last_stats`.
+        """
+        header = pow_header(block)
+        started = time.perf_counter()
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        if self.workers == 1:
+            results = _LocalQueue()
+            _search(header, self.difficulty, 0, self.chunk, self.chunk, threading.Event(), deadline, results)
+        else:
+            results = self._search_parallel(header, deadline)
+        nonces = [n for n, _ in results if n is not None]
+        hashes = sum(h for _, h in results)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.last_stats = {
+            'difficulty': self.difficulty,
+            'workers': self.workers,
+            'hashes': hashes,
+            'seconds': round(elapsed, 4),
+            'hashrate': round(hashes / elapsed, 1),
+        }
+        return min(nonces) if nonces else None
+
+    def _search_parallel(self, header, deadline):
+        pool = _get_pool(self.workers)
+        step = self.chunk * self.workers
+        with pool.lock:
+            pool.found.clear()
+            tasks = [pool.pool.apply_async(_pool_search,
+                                           (header, self.difficulty, i * self.chunk, step, self.chunk, deadline))
+                     for i in range(self.workers)]
+            # Setiap task mengembalikan tepat satu hasil (nonce atau None + jumlah hash)
+            return [t.get() for t in tasks]
+
+    def seal(self, block):
+        """Isi `difficulty` + `proof` pada block in-place (no-op jika difficulty 0). Return block."""
+        if not self.difficulty:
+            return block
+        block['difficulty'] = self.difficulty
+        block.pop('proof', None)
+        nonce = self.mine(block)
+        block['proof'] = nonce
+        if self.logger:
+            self.logger.info("Block mined.", extra={'block_index': block.get('index'), 'pow': self.last_stats})
+        return block
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proof-of-work miner benchmark")
+    parser.add_argument('--bench', action='store_true', help="ukur hashrate per jumlah worker")
+    parser.add_argument('--seconds', type=float, default=3.0, help="durasi per pengukuran")
+    parser.add_argument('--workers', default=None, help="daftar jumlah worker, mis. 1,2,4 (default: 1..cpu)")
+    parser.add_argument('--difficulty', type=int, default=20, help="difficulty untuk mining sekali (tanpa --bench)")
+    args = parser.parse_args(argv)
+
+    block = {'index': 1, 'timestamp': time.time(), 'transactions': [], 'previous_hash': '1'}
+    if not args.bench:
+        miner = ProofOfWorkMiner(args.difficulty)
+        block['difficulty'] = args.difficulty
+        block['proof'] = miner.mine(block)
+        print(json.dumps(dict(miner.last_stats, proof=block['proof'], valid=verify_proof(block)), indent=2))
+        return 0
+
+    cpus = os.cpu_count() or 1
+    counts = [int(x) for x in args.workers.split(',')] if args.workers else sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    base = None
+    print(f"{'workers':>8} {'hashrate':>14} {'speedup':>8}")
+    for n in counts:
+        # Difficulty 256 praktis tidak mungkin ditemukan -> murni mengukur hashrate sampai timeout
+        miner = ProofOfWorkMiner(256, workers=n)
+        miner.mine(block, max_seconds=args.seconds)
+        rate = miner.last_stats['hashrate']
+        base = base or rate
+        print(f"{n:>8} {rate:>12.0f}/s {rate / base:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
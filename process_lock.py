@@ -0,0 +1,75 @@
+# process_lock.py — Reentrant lock shared by threads and (optionally) processes
+# --------------------------------------------------------------------------
+# Dipakai untuk menserialkan semua penulisan chain store ketika beberapa worker
+# WSGI (gunicorn -w N) berbagi folder chain yang sama:
+#   - antar thread : threading.RLock (reentrant, jadi fungsi yang sudah
+#                    memegang lock boleh memanggil fungsi lain yang juga lock)
+#   - antar process: flock(LOCK_EX) pada file lock, hanya saat depth 0 -> 1
+#
+# `on_acquire` dipanggil setiap kali lock antar-process baru didapat, untuk
+# membuang cache manifest yang mungkin sudah diubah process lain.
+# Tanpa fcntl (Windows) hanya lock antar thread yang berlaku.
+# --------------------------------------------------------------------------
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class ProcessLock:
+    def __init__(self, path, interprocess=True, on_acquire=None):
+        self.path = path
+        self.interprocess = bool(interprocess) and fcntl is not None
+        self.on_acquire = on_acquire
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        self._mutex.acquire()
+        if self._depth == 0 and self.interprocess:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+                if self.on_acquire:
+                    self.on_acquire()
+            except BaseException:
+                self._unlock_file()
+                self._mutex.release()
+                raise
+        if self._depth == 0:
+            self.acquisitions += 1
+            self.wait_seconds += time.perf_counter() - started
+        self._depth += 1
+        return self
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock_file()
+        self._mutex.release()
+
+    def _unlock_file(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
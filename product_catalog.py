@@ -0,0 +1,105 @@
+# product_catalog.py — In-memory product resolver
+# --------------------------------------------------------------------------
+# Katalog dimuat SEKALI dari database menjadi map by id dan by nama
+# (case-folded). Dashboard, cart dan checkout memakai resolver yang sama
+# sehingga tidak ada query per line item. Setiap perubahan Product memanggil
+# invalidate(); load berikutnya mengambil katalog terbaru.
+#
+# `version` = sha1 isi katalog (id, nama, harga, gambar, deskripsi, kategori),
+# bukan counter in-process: ETag tetap sama antar worker dan setelah restart,
+# dan berubah begitu isi katalog berubah (worker lain menyusul lewat max_age).
+# --------------------------------------------------------------------------
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+ProductInfo = namedtuple('ProductInfo', 'id name price image description category')
+
+
+def name_key(name):
+    return str(name or '').strip().casefold()
+
+
+class ProductResolver:
+    def __init__(self, loader, max_age=None):
+        """`loader()` mengembalikan iterable objek Product (atribut sama dengan ProductInfo).
+
+        `max_age` (detik): snapshot dimuat ulang setelah umur ini, supaya perubahan dari worker
+        lain ikut terlihat; None = hanya setelah invalidate().
+        """
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._state = None    # (by_id, by_name, digest) snapshot aktif
+        self._last = None     # snapshot terakhir, tetap disimpan setelah invalidate()
+        self._loaded_at = 0.0
+        self._generation = 0
+        self.changed_at = time.time()
+
+    @property
+    def version(self):
+        """Hash isi katalog: sama di semua worker dan setelah restart selama produk tidak berubah."""
+        return self._snapshot()[2]
+
+    def _fresh(self, state):
+        return state is not None and (self.max_age is None or time.monotonic() - self._loaded_at < self.max_age)
+
+    def _snapshot(self):
+        state = self._state
+        if self._fresh(state):
+            return state
+        with self._lock:
+            if self._fresh(self._state):
+                return self._state
+            generation = self._generation
+            by_id, by_name = {}, {}
+            digest = hashlib.sha1()
+            for p in self.loader():
+                info = ProductInfo(p.id, p.name, p.price, p.image, p.description, p.category)
+                by_id[info.id] = info
+                # Nama duplikat: produk pertama (id terkecil) yang dipakai, sama seperti .first()
+                by_name.setdefault(name_key(info.name), info)
+                digest.update(json.dumps(list(info), default=str).encode('utf-8') + b'\n')
+            state = (by_id, by_name, digest.hexdigest())
+            if generation != self._generation:
+                # Katalog berubah saat sedang dimuat -> jangan cache hasil lama
+                return state
+            if self._last is not None:
+                if self._last[2] == state[2]:
+                    state = self._last  # isi sama -> cache turunan (CatalogCache) tetap valid
+                else:
+                    self.changed_at = time.time()
+            self._state = self._last = state
+            self._loaded_at = time.monotonic()
+            return state
+
+    def invalidate(self):
+        self._generation += 1
+        self._state = None
+
+    def get(self, product_id):
+        try:
+            return self._snapshot()[0].get(int(product_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_many(self, product_ids):
+        """{id: ProductInfo} untuk semua id yang dikenal (satu snapshot katalog)."""
+        by_id = self._snapshot()[0]
+        found = {}
+        for pid in product_ids:
+            try:
+                pid = int(pid)
+            except (TypeError, ValueError):
+                continue
+            if pid in by_id:
+                found[pid] = by_id[pid]
+        return found
+
+    def by_name(self, name):
+        return self._snapshot()[1].get(name_key(name))
+
+    def all(self):
+        return list(self._snapshot()[0].values())
@@ -0,0 +1,242 @@
+# request_profiler.py — On-demand per-request profiling (cProfile / stack sampling)
+# --------------------------------------------------------------------------
+# Request diprofil jika:
+#   - membawa token bertanda tangan di header X-Profile-Token (HMAC + expiry,
+#     terikat ke id admin pembuatnya dan hanya berlaku selama user itu masih
+#     admin). Token tidak diterima dari query string supaya tidak tercatat di
+#     path profil, access log maupun header Referer, atau
+#   - admin yang login menambahkan ?_profile=cprofile|sampling, atau
+#   - terpilih sampling acak (sample_rate, default 0 = mati).
+#
+# Mode:
+#   - 'cprofile' : deterministik; hasil .prof (pstats/marshal) untuk snakeviz,
+#                  flameprof, gprof2dot
+#   - 'sampling' : thread sampler membaca stack thread request tiap N ms;
+#                  hasil "folded stacks" (a;b;c 12) untuk flamegraph.pl / speedscope
+# Jumlah + durasi statement SQL dicatat per request. Hasil masuk ring buffer
+# bounded (deque maxlen), tidak pernah ke disk.
+# --------------------------------------------------------------------------
+import cProfile
+import hashlib
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+PROFILE_MODES = ('cprofile', 'sampling')
+MAX_SQL_STATEMENTS = 200
+MAX_SQL_CHARS = 500
+
+
+def make_token(secret, user_id, ttl=3600, now=None):
+    """Token profiling '<user_id>.<expiry>.<hmac>' milik admin `user_id`, berlaku `ttl` detik."""
+    expires = int((now if now is not None else time.time()) + ttl)
+    sig = hmac.new(_key(secret), f'profile:{int(user_id)}:{expires}'.encode(), hashlib.sha256).hexdigest()
+    return f'{int(user_id)}.{expires}.{sig}'
+
+
+def verify_token(secret, token, now=None):
+    """Id user pembuat token jika signature valid dan belum kedaluwarsa, selain itu None."""
+    try:
+        user_id, expires, sig = str(token).split('.', 2)
+        user_id, expires = int(user_id), int(expires)
+    except ValueError:
+        return None
+    expected = hmac.new(_key(secret), f'profile:{user_id}:{expires}'.encode(), hashlib.sha256).hexdigest()
+    if hmac.compare_digest(sig, expected) and expires >= (now if now is not None else time.time()):
+        return user_id
+    return None
+
+
+def _key(secret):
+    return secret if isinstance(secret, bytes) else str(secret).encode('utf-8')
+
+
+def _frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class _StackSampler:
+    """Satu thread untuk semua request yang sedang diprofil; tidur jika tidak ada target."""
+
+    def __init__(self, interval):
+        self.interval = float(interval)
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, thread_id):
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return stacks
+
+    def remove(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = list(self._targets.items())
+            if not targets:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in targets:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    stacks[';'.join(reversed(stack))] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileSession:
+    """State profiling satu request (dibuat oleh RequestProfiler.start)."""
+
+    def __init__(self, profiler, mode, trigger):
+        self.profiler = profiler
+        self.mode = mode
+        self.trigger = trigger
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.sql = []
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self._profile = None
+        self._stacks = None
+        if mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stacks = profiler.sampler.add(self.thread_id)
+
+    def record_sql(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if len(self.sql) < MAX_SQL_STATEMENTS:
+            self.sql.append({'statement': ' '.join(str(statement).split())[:MAX_SQL_CHARS],
+                             'seconds': round(seconds, 6)})
+
+    def finish(self):
+        """Hentikan profiler. Return (payload bytes, format) — format 'prof' atau 'folded'."""
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.create_stats()
+            return marshal.dumps(self._profile.stats), 'prof'
+        stacks = self.profiler.sampler.remove(self.thread_id)
+        lines = [f'{stack} {count}' for stack, count in stacks.most_common()]
+        return ''.join(line + '\n' for line in lines).encode('utf-8'), 'folded'
+
+
+class RequestProfiler:
+    def __init__(self, secret, mode='cprofile', sample_rate=0.0, capacity=20, sample_interval_ms=5):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.secret = secret
+        self.mode = mode
+        self.sample_rate = float(sample_rate)
+        self.entries = deque(maxlen=max(1, int(capacity)))
+        self.sampler = _StackSampler(sample_interval_ms / 1000.0)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def decide(self, token=None, flag=None, is_admin=False, admin_check=None):
+        """(mode, trigger) jika request ini harus diprofil, selain itu None.
+
+        Token hanya diterima jika `admin_check(user_id)` membenarkan pembuatnya masih admin.
+        """
+        requested = flag if flag in PROFILE_MODES else self.mode
+        if token and admin_check:
+            owner = verify_token(self.secret, token)
+            if owner is not None and admin_check(owner):
+                return requested, 'token'
+        if flag and is_admin:
+            return requested, 'admin'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode, 'sampled'
+        return None
+
+    def start(self, mode, trigger):
+        try:
+            return ProfileSession(self, mode, trigger)
+        except ValueError:
+            # cProfile lain sudah aktif di thread ini (mis. profiler eksternal)
+            return None
+
+    def finish(self, session, method, path, endpoint, status):
+        payload, fmt = session.finish()
+        entry = {
+            'id': next(self._ids),
+            'created': time.time(),
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'mode': session.mode,
+            'trigger': session.trigger,
+            'seconds': round(time.perf_counter() - session.started, 6),
+            'sql_count': session.sql_count,
+            'sql_seconds': round(session.sql_seconds, 6),
+            'sql': session.sql,
+            'format': fmt,
+            'payload': payload,
+        }
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def get(self, entry_id):
+        with self._lock:
+            for entry in self.entries:
+                if entry['id'] == entry_id:
+                    return entry
+        return None
+
+
+def summarize(entry, limit=25):
+    """Ringkasan teks: top fungsi by cumulative (cprofile) atau top stack leaf (sampling)."""
+    if entry['format'] == 'prof':
+        stats = pstats.Stats(_MarshalStats(entry['payload']), stream=io.StringIO())
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stats.stream.getvalue()
+    leaves = Counter()
+    total = 0
+    for line in entry['payload'].decode('utf-8').splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            leaves[stack.rsplit(';', 1)[-1]] += int(count)
+            total += int(count)
+    rows = [f'{count:>6} {count * 100.0 / max(1, total):5.1f}%  {leaf}' for leaf, count in leaves.most_common(limit)]
+    return f'{total} samples (self time per frame)\n' + '\n'.join(rows)
+
+
+class _MarshalStats:
+    """Adaptor agar pstats.Stats bisa membaca stats hasil marshal tanpa file."""
+
+    def __init__(self, payload):
+        self.stats = marshal.loads(payload)
+
+    def create_stats(self):
+        pass
@@ -0,0 +1,200 @@
+# sales_rollup.py — Incrementally maintained sales aggregates over the chain
+# --------------------------------------------------------------------------
+# Agregat berjalan (revenue + jumlah order) per hari, produk, kategori dan
+# buyer. Setiap block baru cukup di-apply sekali (O(transaksi di block)),
+# sehingga dashboard membaca total dalam O(1) tanpa menyalin seluruh chain.
+#
+# State disimpan sebagai JSON di samping chain store beserta height dan
+# signature block tip. sync(chain) hanya meng-apply block setelah height
+# tersebut; jika tip tidak cocok (restore/import/reset) rollup dibangun ulang
+# dari chain.
+# --------------------------------------------------------------------------
+import json
+import os
+import threading
+from datetime import datetime
+
+ROLLUP_FILE = 'sales_rollup.json'
+ROLLUP_VERSION = 2  # v2: item legacy memakai pembagian total tercatat, bukan harga katalog saat ini
+DIMENSIONS = ('by_day', 'by_product', 'by_category', 'by_buyer')
+
+
+def _empty_state():
+    state = {'version': ROLLUP_VERSION, 'height': 0, 'tip_signature': None,
+             'totals': {'revenue': 0, 'orders': 0, 'items': 0}}
+    for dim in DIMENSIONS:
+        state[dim] = {}
+    return state
+
+
+def day_key(timestamp):
+    """Tanggal lokal (YYYY-MM-DD) dari unix timestamp; 'unknown' jika tidak bisa dibaca."""
+    try:
+        return datetime.fromtimestamp(float(timestamp)).strftime('%Y-%m-%d')
+    except (TypeError, ValueError, OverflowError, OSError):
+        return 'unknown'
+
+
+def split_total(total, weights):
+    """Bagi `total` (int) proporsional `weights`; sisa pembulatan masuk ke bagian terakhir.
+
+    Jumlah bagian selalu sama dengan `total`. Semua bobot 0 -> dibagi rata.
+    """
+    if not weights:
+        return []
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    shares = [total * w // weight_sum for w in weights]
+    shares[-1] += total - sum(shares)
+    return shares
+
+
+def _bump(bucket, key, revenue, orders, qty=None):
+    row = bucket.setdefault(key, {'revenue': 0, 'orders': 0} if qty is None else {'revenue': 0, 'orders': 0, 'qty': 0})
+    row['revenue'] += revenue
+    row['orders'] += orders
+    if qty is not None:
+        row['qty'] += qty
+
+
+class SalesRollup:
+    def __init__(self, directory, item_fn, filename=ROLLUP_FILE):
+        """`item_fn(tx)` mengembalikan list {'name', 'qty', 'subtotal', 'category'} untuk satu transaksi."""
+        self.directory = directory
+        self.item_fn = item_fn
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._state = None
+        self._dirty = False
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.filename)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def _load(self):
+        if self._state is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if not isinstance(state, dict) or state.get('version') != ROLLUP_VERSION:
+                    raise ValueError("unsupported rollup file")
+            except (FileNotFoundError, ValueError):
+                state = _empty_state()
+            self._state = state
+        return self._state
+
+    def save(self):
+        """Tulis state secara atomic (hanya jika berubah sejak save terakhir). Return True jika menulis."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._dirty = False
+            return True
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def _contribution(self, block):
+        """Hitung kontribusi satu block lebih dulu, supaya kegagalan item_fn tidak meninggalkan state setengah jadi."""
+        out = []
+        for tx in block.get('transactions', []):
+            items = self.item_fn(tx)
+            try:
+                total = int(tx.get('total', 0))
+            except (TypeError, ValueError):
+                total = 0
+            out.append((tx, total, items))
+        return out
+
+    def _merge(self, state, block, contribution):
+        totals = state['totals']
+        for tx, total, items in contribution:
+            totals['revenue'] += total
+            totals['orders'] += 1
+            _bump(state['by_day'], day_key(tx.get('timestamp', block.get('timestamp'))), total, 1)
+            _bump(state['by_buyer'], str(tx.get('sender')), total, 1)
+            products, categories = set(), set()
+            for item in items:
+                qty = int(item.get('qty', 0) or 0)
+                subtotal = int(item.get('subtotal', 0) or 0)
+                name = str(item.get('name'))
+                category = str(item.get('category') or 'Umum')
+                totals['items'] += qty
+                # Order dihitung sekali per transaksi walaupun produk/kategori muncul di beberapa line item
+                _bump(state['by_product'], name, subtotal, 0 if name in products else 1, qty)
+                _bump(state['by_category'], category, subtotal, 0 if category in categories else 1, qty)
+                products.add(name)
+                categories.add(category)
+        state['height'] = int(block.get('index', state['height'] + 1))
+        state['tip_signature'] = block.get('signature')
+
+    def apply_block(self, block):
+        """Apply satu block baru. Block harus tepat height+1; selain itu ValueError."""
+        with self._lock:
+            state = self._load()
+            if block.get('index') != state['height'] + 1:
+                raise ValueError(f"Rollup at height {state['height']} cannot apply block #{block.get('index')}")
+            self._merge(state, block, self._contribution(block))
+            self._dirty = True
+
+    def rebuild(self, chain):
+        """Bangun ulang seluruh rollup dari chain (iterable block, dibaca satu per satu)."""
+        with self._lock:
+            state = _empty_state()
+            count = 0
+            for block in chain:
+                self._merge(state, block, self._contribution(block))
+                count += 1
+            self._state = state
+            self._dirty = True
+            return count
+
+    def sync(self, chain):
+        """Kejar chain: apply block setelah height tersimpan, atau rebuild jika tip tidak cocok.
+
+        Return jumlah block yang di-apply (0 = sudah up to date).
+        """
+        with self._lock:
+            state = self._load()
+            height = state['height']
+            end = len(chain)
+            if height == end and (end == 0 or chain[end - 1].get('signature') == state['tip_signature']):
+                return 0
+            if height > end or (height and chain[height - 1].get('signature') != state['tip_signature']):
+                return self.rebuild(chain)
+            for pos in range(height, end):
+                self.apply_block(chain[pos])
+            return end - height
+
+    # ----------------------------
+    # Reads (O(1) / O(ukuran dimensi))
+    # ----------------------------
+    @property
+    def height(self):
+        with self._lock:
+            return self._load()['height']
+
+    def totals(self):
+        with self._lock:
+            return dict(self._load()['totals'])
+
+    def breakdown(self, dimension, limit=None, sort_by='revenue'):
+        """List (key, row) satu dimensi. by_day terurut tanggal terbaru; lainnya by `sort_by` menurun."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        with self._lock:
+            rows = [(k, dict(v)) for k, v in self._load()[dimension].items()]
+        if dimension == 'by_day':
+            rows.sort(key=lambda kv: kv[0], reverse=True)
+        else:
+            rows.sort(key=lambda kv: (-kv[1].get(sort_by, 0), kv[0]))
+        return rows[:limit] if limit else rows
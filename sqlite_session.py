@@ -0,0 +1,171 @@
+# sqlite_session.py — Server-side session backend on a single SQLite file (WAL)
+# --------------------------------------------------------------------------
+# Pengganti Flask-Session 'filesystem' (satu file per visitor, tanpa cleanup):
+#   - semua session di satu tabel, lookup = satu query by primary key
+#   - journal WAL: pembaca tidak memblok penulis
+#   - session kosong tidak pernah ditulis (visitor anonim tanpa cart = 0 row)
+#   - session yang tidak berubah tidak ditulis ulang; expiry hanya diperpanjang
+#     jika sisa umurnya < setengah PERMANENT_SESSION_LIFETIME
+#   - sweeper thread menghapus session kedaluwarsa secara batch
+# --------------------------------------------------------------------------
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SWEEP_BATCH = 500
+
+
+class SQLiteSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expiry=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.expiry = expiry
+        self.modified = False
+
+
+class SQLiteSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, path, sweep_interval=60.0, use_signer=True, logger=None):
+        self.path = path
+        self.sweep_interval = float(sweep_interval)
+        self.use_signer = use_signer
+        self.logger = logger
+        self._local = threading.local()
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.stats = {'reads': 0, 'writes': 0, 'skipped': 0, 'swept': 0}
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                         "id TEXT PRIMARY KEY, data TEXT NOT NULL, expiry REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expiry)")
+
+    # ----------------------------
+    # Storage
+    # ----------------------------
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='sqlite-session', key_derivation='hmac')
+
+    def _load(self, sid):
+        self.stats['reads'] += 1
+        row = self._connect().execute(
+            "SELECT data, expiry FROM sessions WHERE id = ? AND expiry > ?", (sid, time.time())).fetchone()
+        if row is None:
+            return None, None
+        try:
+            return self.serializer.loads(row[0]), row[1]
+        except ValueError:
+            return None, None
+
+    def _store(self, sid, data, expiry):
+        self.stats['writes'] += 1
+        self._connect().execute("INSERT OR REPLACE INTO sessions (id, data, expiry) VALUES (?, ?, ?)",
+                                (sid, self.serializer.dumps(data), expiry))
+
+    def _delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    # ----------------------------
+    # SessionInterface
+    # ----------------------------
+    def open_session(self, app, request):
+        self._ensure_sweeper()
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            sid = cookie
+            if self.use_signer:
+                try:
+                    sid = self._signer(app).unsign(cookie).decode('ascii')
+                except BadSignature:
+                    sid = None
+            if sid:
+                data, expiry = self._load(sid)
+                if data is not None:
+                    return SQLiteSession(data, sid=sid, expiry=expiry)
+        return SQLiteSession(sid=secrets.token_urlsafe(32))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and session.expiry is not None:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        if not session.modified and session.expiry is not None and session.expiry - now > lifetime / 2:
+            # Tidak berubah & masih jauh dari expiry -> tidak ada I/O sama sekali
+            self.stats['skipped'] += 1
+            return
+
+        expiry = now + lifetime
+        self._store(session.sid, dict(session), expiry)
+        cookie = self._signer(app).sign(session.sid).decode('ascii') if self.use_signer else session.sid
+        # SESSION_PERMANENT (default True): cookie ikut kedaluwarsa bersama row di database
+        expires = datetime.fromtimestamp(expiry, timezone.utc) if app.config.get('SESSION_PERMANENT', True) else None
+        response.set_cookie(name, cookie,
+                            expires=expires,
+                            httponly=self.get_cookie_httponly(app),
+                            domain=domain, path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+        response.vary.add('Cookie')
+
+    # ----------------------------
+    # Expiry sweeper
+    # ----------------------------
+    def sweep(self, now=None):
+        """Hapus session kedaluwarsa per batch (transaksi pendek). Return jumlah row terhapus."""
+        now = time.time() if now is None else now
+        conn = self._connect()
+        removed = 0
+        while True:
+            cur = conn.execute("DELETE FROM sessions WHERE rowid IN "
+                               "(SELECT rowid FROM sessions WHERE expiry <= ? LIMIT ?)", (now, SWEEP_BATCH))
+            removed += cur.rowcount
+            if cur.rowcount < SWEEP_BATCH:
+                break
+        self.stats['swept'] += removed
+        return removed
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        with self._sweeper_lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='session-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stopping.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.error("Session sweep failed: %s", e)
+
+    def stop(self):
+        self._stopping.set()
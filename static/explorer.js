@@ -0,0 +1,98 @@
+// explorer.js — Muat block lama on-demand dari /api/blocks (file terpisah: CSP script-src 'self')
+document.addEventListener("DOMContentLoaded", () => {
+    const button = document.getElementById("loadOlderBlocks");
+    const accordion = document.getElementById("blocksAccordion");
+    if (!button || !accordion) return;
+
+    const pad = (n) => String(n).padStart(2, "0");
+    const formatTime = (ts) => {
+        const d = new Date(parseFloat(ts) * 1000);
+        if (isNaN(d)) return String(ts);
+        return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ` +
+               `${pad(d.getHours())}:${pad(d.getMinutes())}:${pad(d.getSeconds())}`;
+    };
+
+    const el = (tag, className, text) => {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    };
+
+    const renderTx = (tx) => {
+        const li = el("li", "list-group-item bg-secondary text-white border-bottom border-dark my-1 p-2 rounded-3");
+        const head = el("div", "d-flex justify-content-between align-items-start");
+        const who = el("div");
+        who.append(el("strong", "text-info", tx.sender),
+                   el("span", "badge bg-success ms-2", `Rp ${Number(tx.total || 0).toLocaleString("en-US")}`));
+        head.append(who, el("div", "text-muted small", formatTime(tx.timestamp)));
+
+        const items = el("div", "mt-1");
+        if (tx.line_items && tx.line_items.length) {
+            tx.line_items.forEach((it) => items.append(el("span", "badge bg-primary text-white me-1", `${it.name} (x${it.qty})`)));
+        } else {
+            items.append(el("span", "text-danger", "Data Item Corrupt/Gagal Parse!"));
+        }
+        li.append(head, items);
+        return li;
+    };
+
+    const renderBlock = (b) => {
+        const item = el("div", "accordion-item card shadow-lg mb-3");
+        const header = el("h2", "accordion-header bg-dark");
+        const toggle = el("button", "accordion-button collapsed bg-dark text-white fw-bold",
+                          `Block #${b.index} — ${formatTime(b.timestamp)} (${b.tx_count} tx)`);
+        toggle.type = "button";
+        toggle.dataset.bsToggle = "collapse";
+        toggle.dataset.bsTarget = `#collapse${b.index}`;
+        header.append(toggle);
+
+        const collapse = el("div", "accordion-collapse collapse");
+        collapse.id = `collapse${b.index}`;
+        collapse.dataset.bsParent = "#blocksAccordion";
+        const body = el("div", "accordion-body bg-dark text-white small");
+
+        const sig = el("div", "mb-3");
+        sig.append(el("p", "mb-1 fw-bold", "Signature (HMAC):"), el("code", "hash-text small", b.signature));
+        const proof = el("p", "mb-1", `Proof: ${b.proof}`);
+        const prev = el("p", "mb-3", "Prev Hash: ");
+        prev.append(el("code", "hash-text small", b.previous_hash));
+        body.append(sig, proof, prev, el("h6", "mt-3 border-bottom pb-1", `Transactions (${b.tx_count})`));
+
+        if (b.transactions.length) {
+            const list = el("ul", "list-group list-group-flush");
+            b.transactions.forEach((tx) => list.append(renderTx(tx)));
+            body.append(list);
+        } else {
+            body.append(el("div", "alert alert-info small", "Tidak ada transaksi di blok ini."));
+        }
+        collapse.append(body);
+        item.append(header, collapse);
+        return item;
+    };
+
+    button.addEventListener("click", async (event) => {
+        event.preventDefault();
+        const before = parseInt(button.dataset.before, 10);
+        const limit = parseInt(button.dataset.limit, 10);
+        const from = Math.max(1, before - limit);
+        button.classList.add("disabled");
+        try {
+            const resp = await fetch(`${button.dataset.api}?from=${from}&limit=${before - from}`,
+                                     { credentials: "same-origin", headers: { "Accept": "application/json" } });
+            if (!resp.ok) throw new Error(resp.status);
+            const page = await resp.json();
+            page.blocks.slice().reverse().forEach((b) => accordion.append(renderBlock(b)));
+            if (from <= 1) {
+                button.parentElement.remove();
+            } else {
+                button.dataset.before = String(from);
+                button.href = button.href.replace(/before=\d+/, `before=${from}`);
+                button.classList.remove("disabled");
+            }
+        } catch (err) {
+            // Fallback ke pagination biasa (link href)
+            window.location.href = button.href;
+        }
+    });
+});
@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from chain_core import Blockchain
+from block_producer import BlockProducer
+
+
+class TestBlockProducer(unittest.TestCase):
+
+    def setUp(self):
+        self.blockchain = Blockchain()
+
+    def make_producer(self, **kwargs):
+        return BlockProducer(lambda: self.blockchain, Blockchain.build_transaction, **kwargs)
+
+    def test_concurrent_checkouts_are_batched(self):
+        """Checkout paralel harus masuk ke sedikit block tanpa merusak link hash"""
+        producer = self.make_producer(max_txs=100, window_ms=50)
+        tx_ids = []
+        lock = threading.Lock()
+
+        def buyer(n):
+            for i in range(50):
+                tx_id = producer.submit(f"User{n}", f"Kopi (x{i + 1})", 25000)
+                with lock:
+                    tx_ids.append(tx_id)
+
+        threads = [threading.Thread(target=buyer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        producer.stop()
+
+        sealed = self.blockchain.chain[1:]
+        self.assertEqual(sum(len(b['transactions']) for b in sealed), 400)
+        self.assertLessEqual(max(len(b['transactions']) for b in sealed), 100)
+        self.assertLess(len(sealed), 400)
+        for prev, curr in zip(self.blockchain.chain, self.blockchain.chain[1:]):
+            self.assertEqual(curr['previous_hash'], Blockchain.hash(prev))
+
+        for tx_id in tx_ids:
+            info = producer.status(tx_id)
+            self.assertEqual(info['status'], 'confirmed')
+            block = self.blockchain.chain[info['block_index'] - 1]
+            self.assertIn(tx_id, [tx['tx_id'] for tx in block['transactions']])
+
+    def test_pending_until_window_elapses(self):
+        producer = self.make_producer(max_txs=500, window_ms=10000)
+        tx_id = producer.submit("User1", "Buku (x1)", 120000)
+        self.assertEqual(producer.status(tx_id)['status'], 'pending')
+        self.assertEqual(len(producer.pending("User1")), 1)
+        self.assertEqual(len(self.blockchain.chain), 1)
+
+        producer.stop()
+        self.assertEqual(producer.status(tx_id), {'status': 'confirmed', 'block_index': 2, 'sender': 'User1'})
+
+    def test_immediate_mode_seals_in_caller(self):
+        producer = self.make_producer(mode='immediate')
+        tx_id = producer.submit("User1", "Kopi (x1)", 25000)
+        self.assertEqual(producer.status(tx_id)['block_index'], 2)
+        self.assertIsNone(producer._thread)
+
+    def test_failed_seal_returns_batch_to_mempool(self):
+        calls = []
+
+        def flaky_seal(transactions, proof):
+            calls.append(len(transactions))
+            if len(calls) == 1:
+                raise OSError("store unavailable")
+            return self.blockchain.seal_transactions(transactions, proof=proof)
+
+        producer = self.make_producer(mode='immediate', seal_fn=flaky_seal)
+        tx_id = producer.submit("User1", "Kopi (x1)", 25000)
+        self.assertEqual(producer.status(tx_id)['status'], 'pending')
+        self.assertEqual(len(self.blockchain.chain), 1)
+
+        other = producer.submit("User2", "Teh (x1)", 15000)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(producer.status(tx_id)['block_index'], 2)
+        self.assertEqual(producer.status(other)['block_index'], 2)
+        self.assertEqual([tx['tx_id'] for tx in self.blockchain.chain[1]['transactions']], [tx_id, other])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,12 @@
+import json
 import unittest
-from app import Blockchain
+from unittest import mock
+import chain_core
+from chain_core import (SECRET_CHAIN_KEY, Blockchain, line_items, sign_block, verify_block_signature,
+                        verify_chain_data)
+from merkle import merkle_branch, merkle_levels, sign_header, verify_inclusion
+from migrate_transactions import migrate_chain
+from pow_miner import ProofOfWorkMiner, verify_proof
 
 class TestBlockchain(unittest.TestCase):
 
@@ -47,5 +54,172 @@ class TestBlockchain(unittest.TestCase):
         # Kita berharap is_valid menjadi FALSE karena data diubah
         self.assertFalse(is_valid, "Blockchain harus mendeteksi manipulasi data!")
 
+    def test_history_uses_sender_index(self):
+        """Riwayat per user harus sama dengan scan penuh, dan index ikut dibangun ulang saat load"""
+        for i in range(6):
+            self.blockchain.add_transaction("User1" if i % 2 == 0 else "User2", f"Kopi (x{i + 1})", 25000 * (i + 1))
+            self.blockchain.create_block(i + 1)
+
+        history = self.blockchain.get_transactions_by_user("User1")
+        self.assertEqual([tx['total'] for tx in history], [25000, 75000, 125000])
+        self.assertEqual([tx['block_index'] for tx in history], [2, 4, 6])
+
+        reloaded = Blockchain(chain=self.blockchain.chain)
+        self.assertEqual(reloaded.get_transactions_by_user("User1"), history)
+        self.assertEqual(reloaded.count_transactions_by_user("User2"), 3)
+        self.assertEqual(reloaded.get_transactions_by_user("Nobody"), [])
+
+    def test_find_transaction_by_id(self):
+        """Status transaksi dicari dari chain (tx_id index), juga setelah chain dimuat ulang"""
+        tx = Blockchain.build_transaction("User1", "Kopi (x1)", 25000)
+        self.blockchain.seal_transactions([tx], proof=12345)
+        for layout in ('dict', 'compact'):
+            reloaded = Blockchain(chain=list(self.blockchain.chain), layout=layout)
+            found = reloaded.find_transaction(tx['tx_id'])
+            self.assertEqual(found['block_index'], 2)
+            self.assertEqual(found['sender'], "User1")
+            self.assertIsNone(reloaded.find_transaction('missing'))
+
+    def test_recent_transactions_pages_back_by_block(self):
+        for i in range(5):
+            txs = [Blockchain.build_transaction(f"User{i}", f"Kopi (x{n + 1})", 1000) for n in range(i + 1)]
+            self.blockchain.seal_transactions(txs, proof=1)
+        for layout in ('dict', 'compact'):
+            chain_obj = Blockchain(chain=list(self.blockchain.chain), layout=layout)
+            page, cursor = chain_obj.recent_transactions(7)
+            # Block utuh dari tip: #6 (5 tx) + #5 (4 tx), urut kronologis
+            self.assertEqual([tx['block_index'] for tx in page], [5] * 4 + [6] * 5)
+            self.assertEqual(cursor, 5)
+            page, cursor = chain_obj.recent_transactions(7, before=cursor)
+            self.assertEqual([tx['block_index'] for tx in page], [2, 3, 3, 4, 4, 4])
+            self.assertIsNone(cursor)
+            self.assertEqual(chain_obj.recent_transactions(7, before=1), ([], None))
+
+    def test_history_pagination(self):
+        for i in range(5):
+            self.blockchain.add_transaction("User1", f"Buku (x{i + 1})", 1000 * (i + 1))
+            self.blockchain.create_block(i + 1)
+
+        latest = self.blockchain.get_transactions_by_user("User1", limit=2)
+        self.assertEqual([tx['total'] for tx in latest], [4000, 5000])
+        older = self.blockchain.get_transactions_by_user("User1", limit=2, before=3)
+        self.assertEqual([tx['total'] for tx in older], [2000, 3000])
+
+    def test_block_cache_matches_canonical_form(self):
+        """Hash & record yang di-cache harus identik dengan hasil serialisasi ulang"""
+        self.blockchain.add_transaction("User1", "Kopi (x1)", "25000")
+        block = self.blockchain.create_block(1)
+
+        self.assertEqual(self.blockchain.block_hash(1), Blockchain.hash(block))
+        self.assertEqual(json.loads(self.blockchain.block_record(1)), block)
+
+        reloaded = Blockchain(chain=self.blockchain.chain)
+        self.assertEqual(reloaded.block_meta, {})
+        reloaded.create_block(2)
+        self.assertEqual(reloaded.chain[2]['previous_hash'], Blockchain.hash(block))
+
+    def test_structured_line_items(self):
+        """Transaksi v2 menyimpan line item terstruktur; legacy string tetap bisa dibaca"""
+        self.blockchain.add_transaction("User1", [
+            {'product_id': 3, 'name': 'Kopi', 'unit_price': 25000, 'qty': 2},
+        ], 50000)
+        self.blockchain.add_transaction("User2", "Kopi (x2), Buku (x1)", 170000)
+        block = self.blockchain.create_block(1)
+
+        v2, legacy = block['transactions']
+        self.assertEqual(v2['version'], 2)
+        self.assertEqual(line_items(v2), [
+            {'product_id': 3, 'name': 'Kopi', 'unit_price': 25000, 'qty': 2, 'subtotal': 50000}])
+        self.assertEqual([(it['name'], it['qty']) for it in line_items(legacy)], [('Kopi', 2), ('Buku', 1)])
+
+    def test_migrate_legacy_transactions(self):
+        for i in range(3):
+            self.blockchain.add_transaction("User1", f"Kopi (x{i + 1}), Unknown", 25000 * (i + 1))
+            self.blockchain.create_block(i + 1)
+        for block in self.blockchain.chain:
+            block['signature'] = sign_block(block)
+        prices = {'Kopi': (3, 25000)}
+
+        migrated, count = migrate_chain(self.blockchain.chain, prices.get, sign_block, Blockchain.hash,
+                                        lambda b: sign_header(SECRET_CHAIN_KEY, b))
+
+        self.assertEqual(count, 3)
+        self.assertIsInstance(self.blockchain.chain[1]['transactions'][0]['items'], str)
+        verify_chain_data(migrated)
+        tx = migrated[3]['transactions'][0]
+        self.assertEqual(tx['total'], 75000)
+        self.assertEqual(tx['items'][0], {'product_id': 3, 'name': 'Kopi', 'unit_price': 25000, 'qty': 3, 'subtotal': 75000})
+        self.assertEqual(tx['items'][1]['product_id'], None)
+        self.assertEqual(migrate_chain(migrated, prices.get, sign_block, Blockchain.hash)[1], 0)
+
+    def test_get_blocks_window(self):
+        for i in range(4):
+            self.blockchain.add_transaction("User1", f"Kopi (x{i + 1})", 1000)
+            self.blockchain.create_block(i + 1)
+
+        self.assertEqual([b['index'] for _, b in self.blockchain.get_blocks(2, 2)], [2, 3])
+        self.assertEqual([pos for pos, _ in self.blockchain.get_blocks(4, 10)], [3, 4])
+        self.assertEqual(self.blockchain.get_blocks(9, 5), [])
+        self.assertEqual(self.blockchain.count_transactions(), 4)
+
+    def test_query_transactions_uses_indexes(self):
+        """Range query harus sama dengan filter penuh atas get_all_transactions, juga setelah load ulang"""
+        for i in range(6):
+            self.blockchain.add_transaction("User1" if i % 2 == 0 else "User2", f"Kopi (x{i + 1})", 25000 * (i + 1))
+            self.blockchain.create_block(i + 1)
+
+        txs, order, cursor = self.blockchain.query_transactions(min_total=100000, limit=2)
+        self.assertEqual(order, 'total')
+        self.assertEqual([tx['total'] for tx in txs], [100000, 125000])
+        rest, _, end = self.blockchain.query_transactions(min_total=100000, limit=2, cursor=cursor)
+        self.assertEqual([tx['total'] for tx in rest], [150000])
+        self.assertIsNone(end)
+
+        since = self.blockchain.chain[3]['transactions'][0]['timestamp']
+        expected = [tx['tx_id'] for tx in self.blockchain.get_all_transactions()
+                    if tx['sender'] == 'User1' and tx['timestamp'] >= since]
+        reloaded = Blockchain(chain=self.blockchain.chain)
+        found, _, _ = reloaded.query_transactions(since=since, sender='User1', limit=50)
+        self.assertEqual([tx['tx_id'] for tx in found], expected)
+        self.assertEqual(found[0]['block_index'], 4)
+
+    def test_sealed_block_carries_merkle_proofs(self):
+        for i in range(5):
+            self.blockchain.add_transaction(f"User{i}", f"Kopi (x{i + 1})", 1000 * (i + 1))
+        block = self.blockchain.create_block(1)
+
+        branch = self.blockchain.merkle_proof(1, 3)
+        self.assertEqual(branch, merkle_branch(merkle_levels(block['transactions']), 3))
+        header = {k: v for k, v in block.items() if k not in ('transactions', 'signature', 'header_signature')}
+        self.assertTrue(verify_inclusion(block['transactions'][3], branch, header,
+                                         block['header_signature'], SECRET_CHAIN_KEY))
+        # header_signature tidak boleh lolos sebagai signature block yang sama tanpa transactions
+        self.assertFalse(verify_block_signature(dict(header, signature=block['header_signature'])))
+        verify_chain_data(self.blockchain.chain)
+
+    def test_stale_mined_block_is_mined_again(self):
+        """Tip berubah selama mining (lock dilepas) -> block di-mining ulang di atas tip baru"""
+        miner = ProofOfWorkMiner(4, workers=1)
+        calls = []
+
+        def racing_seal(block):
+            calls.append(block['index'])
+            if len(calls) == 1:
+                # Checkout lain menyegel block selagi mining berjalan
+                other = self.blockchain.prepare_block([Blockchain.build_transaction('User2', 'Teh (x1)', 15000)], 1)
+                self.assertTrue(self.blockchain.commit_block(other))
+            return miner.seal(block)
+
+        with mock.patch.object(chain_core, 'pow_miner', mock.Mock(difficulty=4, seal=racing_seal)):
+            self.blockchain.add_transaction("User1", "Kopi (x1)", 25000)
+            block = self.blockchain.create_block(1)
+
+        self.assertEqual(calls, [2, 3])
+        self.assertEqual(block['index'], 3)
+        self.assertEqual(self.blockchain.chain[-1], block)
+        self.assertTrue(verify_proof(block))
+        self.assertFalse(self.blockchain.commit_block(self.blockchain.prepare_block([], 1, previous_hash='x' * 64)))
+        verify_chain_data(self.blockchain.chain)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,57 @@
+import unittest
+from types import SimpleNamespace
+
+from cart_service import CartError, apply_cart_ops, cart_json, normalize_cart, price_cart
+from product_catalog import ProductResolver
+
+
+def make_product(pid, price):
+    return SimpleNamespace(id=pid, name=f'P{pid}', price=price, image='', description='', category='Umum')
+
+
+class TestCartService(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+        self.resolver = ProductResolver(self.load)
+
+    def load(self):
+        self.loads += 1
+        return [make_product(1, 1000), make_product(2, 2500)]
+
+    def test_price_cart_single_catalog_load(self):
+        lines, total = price_cart({'1': 2, '2': '1', '99': 1, 'x': 3}, self.resolver)
+        self.assertEqual([(l['product'].id, l['quantity'], l['total']) for l in lines], [(1, 2, 2000), (2, 1, 2500)])
+        self.assertEqual(total, 4500)
+        self.assertEqual(self.loads, 1)
+
+    def test_bulk_ops_applied_in_order(self):
+        cart = apply_cart_ops({'1': 1}, [
+            {'op': 'add', 'product_id': 1, 'qty': 2},
+            {'op': 'add', 'product_id': 2},
+            {'op': 'set', 'product_id': 2, 'qty': 5},
+            {'op': 'remove', 'product_id': 1},
+        ], self.resolver)
+        self.assertEqual(cart, {'2': 5})
+        self.assertEqual(cart_json(cart, self.resolver)['total'], 12500)
+        self.assertEqual(apply_cart_ops(cart, [{'op': 'set', 'product_id': 2, 'qty': 0}], self.resolver), {})
+
+    def test_invalid_op_leaves_cart_untouched(self):
+        """Satu operasi invalid -> tidak ada operasi yang diterapkan (atomic)"""
+        cart = {'1': 1}
+        for ops in ([{'op': 'add', 'product_id': 2}, {'op': 'add', 'product_id': 99}],
+                    [{'op': 'set', 'product_id': 1, 'qty': -1}],
+                    [{'op': 'add', 'product_id': 1, 'qty': 5000}],
+                    [{'op': 'explode', 'product_id': 1}],
+                    []):
+            with self.assertRaises(CartError):
+                apply_cart_ops(cart, ops, self.resolver)
+        self.assertEqual(cart, {'1': 1})
+
+    def test_normalize_cart(self):
+        self.assertEqual(normalize_cart({'1': '2', 'a': 1, '3': 0, 4: 1}), {'1': 2, '4': 1})
+        self.assertEqual(normalize_cart(None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
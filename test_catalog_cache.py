@@ -0,0 +1,70 @@
+import unittest
+from types import SimpleNamespace
+
+from catalog_cache import CatalogCache
+from product_catalog import ProductResolver
+
+
+def make_product(pid, name, category):
+    return SimpleNamespace(id=pid, name=name, price=1000 * pid, image='', description='', category=category)
+
+
+class TestCatalogCache(unittest.TestCase):
+
+    def setUp(self):
+        self.products = [make_product(1, 'Kopi', 'Lifestyle'), make_product(2, 'Buku', 'Buku'),
+                         make_product(3, 'Tumbler', 'Lifestyle')]
+        self.resolver = ProductResolver(lambda: list(self.products))
+        self.cache = CatalogCache(self.resolver)
+        self.renders = 0
+
+    def render(self, products):
+        self.renders += 1
+        return ','.join(p.name for p in products)
+
+    def test_products_and_fragments_cached_per_category(self):
+        self.assertEqual([p.id for p in self.cache.products()], [1, 2, 3])
+        self.assertEqual(self.cache.fragment('Lifestyle', self.render), 'Kopi,Tumbler')
+        self.assertEqual(self.cache.fragment('Lifestyle', self.render), 'Kopi,Tumbler')
+        self.assertEqual(self.cache.fragment(None, self.render), 'Kopi,Buku,Tumbler')
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(self.cache.products('Mobil'), [])
+
+    def test_product_write_bumps_version(self):
+        """Perubahan katalog membuang cache lama dan mengganti ETag"""
+        etag = self.cache.etag('Buku', None, {})
+        self.cache.fragment('Buku', self.render)
+
+        self.products.append(make_product(4, 'Clean Code', 'Buku'))
+        self.resolver.invalidate()
+
+        self.assertNotEqual(self.cache.etag('Buku', None, {}), etag)
+        self.assertEqual(self.cache.fragment('Buku', self.render), 'Buku,Clean Code')
+        self.assertEqual(self.renders, 2)
+
+    def test_etag_varies_per_user_state(self):
+        base = self.cache.etag(None, None, {})
+        self.assertEqual(self.cache.etag(None, None, {}), base)
+        self.assertNotEqual(self.cache.etag(None, ('1', 'buyer'), {}), base)
+        self.assertNotEqual(self.cache.etag(None, None, {'1': 2}), base)
+        self.assertNotEqual(self.cache.etag('Buku', None, {}), base)
+
+
+    def test_etag_depends_on_catalog_contents(self):
+        """ETag sama untuk isi katalog yang sama (worker lain / setelah restart), beda jika isi berubah"""
+        other = CatalogCache(ProductResolver(lambda: list(self.products)))
+        etag = self.cache.etag(None, None, {})
+        self.assertEqual(other.etag(None, None, {}), etag)
+
+        self.resolver.invalidate()
+        self.assertEqual(self.cache.etag(None, None, {}), etag)
+
+        self.products[0] = make_product(1, 'Kopi', 'Lifestyle')
+        self.products[0].price = 1
+        self.resolver.invalidate()
+        self.assertNotEqual(self.cache.etag(None, None, {}), etag)
+        self.assertNotEqual(other.etag(None, None, {}), self.cache.etag(None, None, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
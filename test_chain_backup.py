@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from chain_backup import IncrementalBackupStore, OBJECTS_DIR
+
+
+def make_chain(n):
+    """Block dengan transaksi berukuran bervariasi, supaya segment backup berbeda isi dan panjang."""
+    return [{'index': i, 'timestamp': 1700000000.0 + i,
+             'transactions': [{'sender': f'User{i % 4}', 'items': f'Kopi (x{i})', 'total': 25000 * i}
+                              for _ in range(i % 3 + 1)],
+             'previous_hash': f'{i - 1:064x}', 'signature': f'{i:064x}'} for i in range(1, n + 1)]
+
+
+class TestIncrementalBackupStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = IncrementalBackupStore(self.tmp)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def objects(self):
+        return set(os.listdir(os.path.join(self.tmp, OBJECTS_DIR)))
+
+    def test_point_in_time_restore(self):
+        """Setiap snapshot harus bisa direstore ke chain pada saat itu"""
+        chain = make_chain(12)
+        names = [self.store.snapshot(chain[:n], name=f'blockchain_{n:02d}.json') for n in range(3, 13)]
+
+        reopened = IncrementalBackupStore(self.tmp)
+        self.assertEqual(reopened.list_snapshots()[0], names[-1])
+        for n, name in zip(range(3, 13), names):
+            self.assertEqual(reopened.restore(name), chain[:n])
+        self.assertEqual(reopened.latest(), chain)
+
+    def test_identical_content_is_deduplicated(self):
+        chain = make_chain(5)
+        self.store.snapshot(chain, name='blockchain_a.json')
+        before = self.objects()
+        # Isi sama -> tidak ada snapshot atau object baru
+        self.assertEqual(self.store.snapshot(chain, name='blockchain_b.json'), 'blockchain_a.json')
+        self.assertEqual(self.objects(), before)
+
+        # Restore ke chain yang sama persis lewat jalur "full" juga memakai object yang sama
+        fresh = IncrementalBackupStore(tempfile.mkdtemp(dir=self.tmp))
+        fresh.snapshot(chain, name='blockchain_c.json')
+        self.assertEqual(os.listdir(os.path.join(fresh.directory, OBJECTS_DIR)), sorted(before))
+
+    def test_prune_removes_unreferenced_objects(self):
+        chain = make_chain(40)
+        for n in range(1, 41):
+            self.store.snapshot(chain[:n], name=f'blockchain_{n:02d}.json')
+        self.store.prune(limit=3)
+        self.assertEqual(len(self.store.list_snapshots()), 3)
+        referenced = {seg['hash'] for s in self.store._read_manifest()['snapshots'] for seg in s['segments']}
+        self.assertEqual({o.split('.')[0] for o in self.objects()}, referenced)
+        self.assertEqual(self.store.latest(), chain)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import itertools
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import chain_storage
+from chain_checkpoint import CheckpointLog
+from chain_core import Blockchain, sign_block
+from chain_store import SegmentedChainStore, chain_digest
+from compact_chain import CompactChain
+
+
+def make_chain(n):
+    """Block ber-signature yang previous_hash-nya benar-benar menunjuk hash block sebelumnya."""
+    chain = []
+    for i in range(1, n + 1):
+        block = {'index': i, 'timestamp': 1700000000.0 + i, 'transactions': [], 'proof': 12345,
+                 'previous_hash': Blockchain.hash(chain[-1]) if chain else '1'}
+        block['signature'] = sign_block(block)
+        chain.append(block)
+    return chain
+
+
+def prefix_digest(store, height):
+    """Digest berantai record #1..#height, dihitung seperti startup/audit (raw record dari iter_records)."""
+    digest = None
+    for record in itertools.islice(store.iter_records(), height):
+        digest = chain_digest(digest, record)
+    return digest
+
+
+class TestCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = SegmentedChainStore(self.tmp, segment_max_bytes=256, fsync_policy='never')
+        self.log = CheckpointLog(self.tmp, b'test-key')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_store_digest_matches_reloaded_prefix(self):
+        """Digest saat append harus sama dengan digest yang dihitung ulang saat load"""
+        chain = make_chain(11)
+        self.store.append_many(chain[:7])
+        digest_at_7 = self.store.digest
+        self.store.append_many(chain[7:])
+
+        reopened = SegmentedChainStore(self.tmp)
+        self.assertEqual(reopened.height, 11)
+        self.assertEqual(prefix_digest(reopened, 7), digest_at_7)
+        self.assertEqual(prefix_digest(reopened, 11), self.store.digest)
+
+        # Startup: prefix yang cocok dengan checkpoint dipercaya tanpa verifikasi per block
+        # Startup: prefix cocok checkpoint dipercaya lewat digest, tail (#8..#11) diverifikasi per block
+        cp = {'height': 7, 'digest': digest_at_7, 'tip_hash': chain[7]['previous_hash']}
+        with mock.patch.object(chain_storage, 'chain_store', reopened):
+            loaded, trusted = chain_storage._read_store(cp)
+            self.assertEqual((loaded, trusted), (chain, 7))
+            # Tip hash checkpoint yang tidak menunjuk block #7 -> checkpoint ditolak
+            self.assertEqual(chain_storage._read_store(dict(cp, tip_hash=chain[8]['previous_hash'])), (None, 0))
+
+    def test_tampered_record_changes_digest(self):
+        chain = make_chain(3)
+        self.store.append_many(chain)
+        digest = self.store.digest
+        cp = {'height': 3, 'digest': digest, 'tip_hash': Blockchain.hash(chain[-1])}
+        path = self.store.segment_files()[0]
+        with open(path, 'rb') as f:
+            raw = f.read()
+        with open(path, 'wb') as f:
+            f.write(raw.replace(b'"proof":12345', b'"proof":99999', 1))
+        reopened = SegmentedChainStore(self.tmp)
+        self.assertNotEqual(prefix_digest(reopened, 3), digest)
+        with mock.patch.object(chain_storage, 'chain_store', reopened):
+            self.assertEqual(chain_storage._read_store(cp), (None, 0))
+
+    def test_checkpoint_signature(self):
+        self.log.add(10, 'tip10', 'd10')
+        self.log.add(20, 'tip20', 'd20')
+        reopened = CheckpointLog(self.tmp, b'test-key')
+        self.assertEqual(reopened.latest()['height'], 20)
+        self.assertEqual(reopened.latest(max_height=15)['height'], 10)
+
+        # Checkpoint yang diubah tanpa key harus diabaikan
+        with open(reopened.path, 'r', encoding='utf-8') as f:
+            cps = json.load(f)
+        cps[-1]['digest'] = 'forged'
+        with open(reopened.path, 'w', encoding='utf-8') as f:
+            json.dump(cps, f)
+        self.assertEqual(CheckpointLog(self.tmp, b'test-key').latest()['height'], 10)
+        self.assertIsNone(CheckpointLog(self.tmp, b'other-key').latest())
+
+
+    def test_startup_read_streams_into_compact_layout(self):
+        """Load dari store: prefix checkpoint cukup digest, tail diverifikasi, langsung ke CompactChain"""
+        blockchain = Blockchain()
+        for i in range(6):
+            blockchain.seal_transactions([Blockchain.build_transaction('User1', f'Kopi (x{i + 1})', 1000)], proof=1)
+        self.store.append_many(blockchain.chain[:4])
+        cp = {'height': 4, 'digest': self.store.digest, 'tip_hash': Blockchain.hash(blockchain.chain[3])}
+        self.store.append_many(blockchain.chain[4:])
+
+        with mock.patch.object(chain_storage, 'chain_store', self.store), \
+                mock.patch.object(chain_storage, 'CHAIN_MEMORY_LAYOUT', 'compact'):
+            chain, trusted = chain_storage._read_store(cp)
+            self.assertIsInstance(chain, CompactChain)
+            self.assertEqual(trusted, 4)
+            self.assertEqual(list(chain), blockchain.chain)
+            self.assertIs(Blockchain(chain=chain, layout='compact').chain, chain)
+
+            self.assertEqual(chain_storage._read_store(dict(cp, digest='other')), (None, 0))
+            self.assertEqual(chain_storage._read_store(dict(cp, height=99)), (None, 0))
+
+            # Block di tail (setelah checkpoint) tetap diverifikasi
+            tampered = dict(blockchain.chain[-1], transactions=[])
+            tampered['signature'] = 'forged'
+            self.store.rewrite(blockchain.chain[:-1] + [tampered])
+            with self.assertRaises(ValueError):
+                chain_storage._read_store(cp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from chain_store import SegmentedChainStore
+
+
+def make_block(index):
+    return {'index': index, 'timestamp': 1700000000.0 + index, 'transactions': [],
+            'proof': 12345, 'previous_hash': f'h{index - 1}', 'signature': f's{index}'}
+
+
+class TestSegmentedChainStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = SegmentedChainStore(self.tmp, segment_max_bytes=300, fsync_policy='never')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_append_and_reload(self):
+        """Block yang di-append harus terbaca ulang dari instance store baru"""
+        for i in range(1, 11):
+            self.store.append(make_block(i))
+
+        reopened = SegmentedChainStore(self.tmp)
+        self.assertEqual(reopened.height, 10)
+        self.assertEqual(reopened.tip_signature, 's10')
+        self.assertEqual(reopened.load(), [make_block(i) for i in range(1, 11)])
+        # segment_max_bytes kecil -> harus roll ke beberapa segment
+        self.assertGreater(len(reopened.segment_files()), 1)
+        self.assertEqual([b['index'] for b in reopened.iter_blocks(start_index=8)], [8, 9, 10])
+
+    def test_rejects_gap_in_index(self):
+        self.store.append(make_block(1))
+        with self.assertRaises(ValueError):
+            self.store.append(make_block(3))
+
+    def test_torn_write_is_discarded(self):
+        """Sisa tulisan yang tidak tercatat di manifest diabaikan dan ditimpa"""
+        self.store.append_many([make_block(1), make_block(2)])
+        with open(self.store.segment_files()[-1], 'ab') as f:
+            f.write(b'{"index": 3, "transac')
+
+        reopened = SegmentedChainStore(self.tmp, fsync_policy='never')
+        self.assertEqual(len(reopened.load()), 2)
+        reopened.append(make_block(3))
+        self.assertEqual([b['index'] for b in reopened.load()], [1, 2, 3])
+
+    def test_rewrite_replaces_content(self):
+        self.store.append_many([make_block(i) for i in range(1, 6)])
+        self.store.rewrite([make_block(1), make_block(2)])
+        self.assertEqual(self.store.height, 2)
+        self.assertEqual(len(SegmentedChainStore(self.tmp).load()), 2)
+        self.assertTrue(all(os.path.exists(p) for p in self.store.segment_files()))
+
+    def test_rewrite_crash_keeps_old_content(self):
+        """Crash saat menulis chain baru -> store lama tetap utuh, tanpa sisa staging"""
+        blocks = [make_block(i) for i in range(1, 6)]
+        self.store.append_many(blocks)
+        with self.assertRaises(ValueError):
+            self.store.rewrite([make_block(1), make_block(3)])  # gap -> gagal di tengah tulis
+        self.assertEqual(SegmentedChainStore(self.tmp).load(), blocks)
+        parent = os.path.dirname(self.tmp)
+        self.assertFalse([n for n in os.listdir(parent) if n.startswith(os.path.basename(self.tmp) + '.rewrite-')])
+
+    def test_changed_detects_append_by_other_instance(self):
+        """Instance lain (process lain) menambah block -> changed() True, refresh() membaca tip baru"""
+        self.store.append(make_block(1))
+        other = SegmentedChainStore(self.tmp, segment_max_bytes=300, fsync_policy='never')
+        self.assertEqual(other.height, 1)
+        self.assertFalse(self.store.changed())
+
+        other.append_many([make_block(2), make_block(3)])
+        self.assertTrue(self.store.changed())
+        self.assertEqual(self.store.height, 1)  # masih cache lama
+        self.assertTrue(self.store.refresh())
+        self.assertEqual(self.store.height, 3)
+        self.assertFalse(self.store.changed())
+        self.assertFalse(self.store.refresh())
+        self.assertEqual([b['index'] for b in self.store.iter_blocks(start_index=2)], [2, 3])
+
+
+    def test_reader_survives_replace_with(self):
+        """Export yang sedang streaming tetap membaca snapshot lama walaupun store diganti di tengah jalan"""
+        blocks = [make_block(i) for i in range(1, 11)]
+        self.store.append_many(blocks)
+        old_segments = self.store.segment_files()
+        self.assertGreater(len(old_segments), 2)
+
+        records = self.store.iter_records()
+        first = next(records)
+        staging = SegmentedChainStore(tempfile.mkdtemp(), fsync_policy='never')
+        try:
+            staging.append_many([make_block(1), make_block(2)])
+            self.store.replace_with(staging)
+        finally:
+            shutil.rmtree(staging.directory, ignore_errors=True)
+        self.assertFalse(any(os.path.exists(p) for p in old_segments))
+
+        self.assertEqual(len([first] + list(records)), 10)
+        self.assertEqual([b['index'] for b in self.store.iter_blocks()], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
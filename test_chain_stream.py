@@ -0,0 +1,120 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from chain_store import SegmentedChainStore, encode_block
+from chain_stream import export_chunks, import_blocks, iter_blocks
+from chain_validator import canonical_hash, hmac_signature
+
+KEY = b'test-key'
+
+
+def make_chain(n):
+    chain = []
+    for i in range(1, n + 1):
+        block = {'index': i, 'timestamp': 1700000000.0 + i, 'proof': 12345,
+                 'transactions': [{'sender': 'u', 'items': 'Kopi (x1)', 'total': i}],
+                 'previous_hash': '1' if i == 1 else canonical_hash(chain[-1])}
+        block['signature'] = hmac_signature(KEY, block)
+        chain.append(block)
+    return chain
+
+
+class TestChainStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.chain = make_chain(40)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def roundtrip(self, fmt, compress):
+        records = [encode_block(b) for b in self.chain]
+        payload = b''.join(export_chunks(iter(records), fmt, compress))
+        return list(iter_blocks(io.BytesIO(payload)))
+
+    def test_export_import_all_formats(self):
+        for fmt in ('json', 'ndjson'):
+            for compress in (False, True):
+                self.assertEqual(self.roundtrip(fmt, compress), self.chain, (fmt, compress))
+        legacy = json.dumps(self.chain, indent=2).encode()
+        self.assertEqual(list(iter_blocks(io.BytesIO(legacy))), self.chain)
+        self.assertEqual(json.loads(gzip.decompress(b''.join(
+            export_chunks((encode_block(b) for b in self.chain), 'json', True)))), self.chain)
+
+    def test_array_parser_small_chunks(self):
+        """Block yang terpotong di batas chunk tetap ter-parse benar"""
+        from chain_stream import iter_json_array
+        payload = json.dumps(self.chain, ensure_ascii=False).encode()
+        self.assertEqual(list(iter_json_array(io.BytesIO(payload), chunk_size=7)), self.chain)
+
+    def test_import_into_store_single_pass(self):
+        store = SegmentedChainStore(self.tmp, segment_max_bytes=1024, fsync_policy='never')
+        verifier = import_blocks(iter(self.chain), KEY, lambda blocks, records: store.append_many(blocks, records),
+                                 batch_size=8)
+        self.assertEqual(verifier.height, 40)
+        self.assertEqual(verifier.tip_hash, canonical_hash(self.chain[-1]))
+        self.assertEqual(store.load(), self.chain)
+
+    def test_import_aborts_on_first_bad_block(self):
+        self.chain[10]['transactions'][0]['total'] = 999999
+        seen = []
+
+        def blocks():
+            for b in self.chain:
+                seen.append(b['index'])
+                yield b
+
+        with self.assertRaisesRegex(ValueError, 'Block #11: HMAC'):
+            import_blocks(blocks(), KEY, lambda blocks, records: None)
+        self.assertEqual(seen[-1], 11)
+
+        relinked = make_chain(5)
+        relinked[3]['previous_hash'] = 'x' * 64
+        relinked[3]['signature'] = hmac_signature(KEY, relinked[3])
+        with self.assertRaisesRegex(ValueError, 'Block #4: previous_hash'):
+            import_blocks(iter(relinked), KEY, lambda blocks, records: None)
+
+    def test_store_replace_with_staging(self):
+        live = SegmentedChainStore(self.tmp + '/live', segment_max_bytes=512, fsync_policy='never')
+        live.append_many(make_chain(3))
+        staging = SegmentedChainStore(self.tmp + '/staging', segment_max_bytes=512, fsync_policy='never')
+        staging.append_many(self.chain)
+
+        live.replace_with(staging)
+        self.assertEqual(live.load(), self.chain)
+        self.assertEqual(live.height, 40)
+        self.assertFalse(staging.exists())
+        self.assertEqual(SegmentedChainStore(self.tmp + '/live').load(), self.chain)
+
+    def test_replace_with_keeps_live_store_until_manifest_swap(self):
+        """Crash sebelum manifest diganti -> store lama tetap utuh; segment lama dibuang setelah swap"""
+        live = SegmentedChainStore(self.tmp + '/live', segment_max_bytes=512, fsync_policy='never')
+        old = make_chain(3)
+        live.append_many(old)
+        old_files = live.segment_files()
+        staging = SegmentedChainStore(self.tmp + '/staging', segment_max_bytes=512, fsync_policy='never')
+        staging.append_many(self.chain)
+
+        with mock.patch.object(live, '_write_manifest', side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                live.replace_with(staging)
+        self.assertEqual(SegmentedChainStore(self.tmp + '/live').load(), old)
+
+        staging = SegmentedChainStore(self.tmp + '/staging2', segment_max_bytes=512, fsync_policy='never')
+        staging.append_many(self.chain)
+        live.replace_with(staging)
+        self.assertEqual(SegmentedChainStore(self.tmp + '/live').load(), self.chain)
+        self.assertFalse(any(os.path.exists(p) for p in old_files))
+        segments = sorted(n for n in os.listdir(self.tmp + '/live') if n.endswith('.ndjson'))
+        self.assertEqual(segments, sorted(os.path.basename(p) for p in live.segment_files()))
+
+
+if __name__ == '__main__':
+    unittest.main()
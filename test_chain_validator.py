@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+import unittest
+
+from chain_core import Blockchain, SECRET_CHAIN_KEY, sign_block
+from chain_store import SegmentedChainStore
+from chain_validator import validate_chain, validate_store
+
+
+class TestChainValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.blockchain = Blockchain()
+        for i in range(40):
+            self.blockchain.add_transaction(f"User{i % 3}", f"Kopi (x{i + 1})", 25000)
+            self.blockchain.create_block(i + 1)
+
+    def test_valid_chain_in_parallel(self):
+        report = validate_chain(self.blockchain.chain, SECRET_CHAIN_KEY, workers=2, chunk_size=7)
+        self.assertTrue(report['valid'])
+        self.assertEqual(report['height'], 41)
+        self.assertEqual(report['ranges'], 6)
+        self.assertTrue(self.blockchain.validate(workers=1)['valid'])
+
+    def test_reports_first_tampered_block(self):
+        """Manipulasi data di tengah chain harus terdeteksi di block yang tepat"""
+        self.blockchain.chain[30]['transactions'][0]['items'] = "Mobil Mewah (x1)"
+        self.blockchain.chain[12]['transactions'][0]['total'] = 1
+        report = validate_chain(self.blockchain.chain, SECRET_CHAIN_KEY, workers=2, chunk_size=5)
+        self.assertFalse(report['valid'])
+        self.assertEqual(report['first_bad_index'], 13)
+        self.assertEqual(report['error'], 'HMAC signature mismatch')
+
+    def test_broken_link_at_range_boundary(self):
+        # Re-sign block supaya HMAC valid, tapi previous_hash tidak lagi menunjuk block sebelumnya
+        block = self.blockchain.chain[10]
+        block['previous_hash'] = '0' * 64
+        block['signature'] = sign_block(block)
+        report = validate_chain(self.blockchain.chain, SECRET_CHAIN_KEY, workers=2, chunk_size=10)
+        self.assertEqual((report['first_bad_index'], report['error']), (11, 'previous_hash mismatch'))
+
+    def test_validate_store_segments(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            store = SegmentedChainStore(tmp, segment_max_bytes=2000, fsync_policy='never')
+            store.append_many(self.blockchain.chain)
+            self.assertGreater(len(store.segment_ranges()), 2)
+            report = validate_store(store, SECRET_CHAIN_KEY, workers=2)
+            self.assertTrue(report['valid'])
+            self.assertEqual(report['height'], 41)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
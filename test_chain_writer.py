@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+
+from chain_writer import WriteBehindPersister
+
+
+class TestWriteBehindPersister(unittest.TestCase):
+
+    def test_burst_is_coalesced(self):
+        """Banyak submit beruntun harus digabung menjadi sedikit penulisan"""
+        written = []
+        gate = threading.Event()
+
+        def slow_persist(data):
+            gate.wait(1)
+            written.append(list(data))
+
+        p = WriteBehindPersister(slow_persist, mode='async', max_pending=100)
+        for n in range(1, 51):
+            p.submit(list(range(n)))
+        gate.set()
+        self.assertTrue(p.flush(timeout=5))
+        p.stop()
+
+        self.assertLess(len(written), 50)
+        self.assertEqual(written[-1], list(range(50)))
+        self.assertEqual(p.stats['writes'] + p.stats['coalesced'], 50)
+
+    def test_group_commit_waits_for_window(self):
+        written = []
+        p = WriteBehindPersister(written.append, mode='group', group_commit_ms=100)
+        start = time.monotonic()
+        for n in range(5):
+            p.submit(n)
+        p.flush(timeout=5)
+        p.stop()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(written, [4])
+
+    def test_sync_mode_writes_inline(self):
+        written = []
+        p = WriteBehindPersister(written.append, mode='sync')
+        p.submit('a')
+        p.submit('b')
+        self.assertEqual(written, ['a', 'b'])
+        self.assertIsNone(p._thread)
+
+    def test_persist_errors_do_not_kill_worker(self):
+        calls = []
+
+        def flaky(data):
+            calls.append(data)
+            if data == 'bad':
+                raise IOError('disk full')
+
+        p = WriteBehindPersister(flaky, mode='async')
+        p.submit('bad', wait=True)
+        p.submit('good', wait=True)
+        p.stop()
+        self.assertEqual(calls, ['bad', 'good'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import unittest
+
+from chain_core import Blockchain, verify_chain_data
+from chain_store import encode_block
+from chain_validator import canonical_hash
+from compact_chain import CompactChain, measure, synthetic_chain
+
+
+def odd_blocks():
+    """Block dengan variasi yang harus tetap round-trip eksak."""
+    return [
+        {'index': 1, 'timestamp': 1700000000.0, 'transactions': [], 'proof': 100, 'previous_hash': '1',
+         'signature': 'a' * 64},
+        # Legacy string items + urutan key hasil pow_miner.seal (proof dipindah ke akhir)
+        {'index': 2, 'timestamp': 1700000001.5, 'transactions': [
+            {'tx_id': 'f' * 32, 'sender': 'budi', 'items': 'Kopi (x2), Buku (x1)', 'total': 170000,
+             'timestamp': 1700000001.25},
+        ], 'previous_hash': 'b' * 64, 'merkle_root': 'c' * 64, 'difficulty': 12, 'proof': 4021,
+         'header_signature': 'd' * 64, 'signature': 'e' * 64},
+        # Transaksi di luar skema -> overflow; key block tambahan -> extra
+        {'index': 3, 'timestamp': 1700000002.0, 'note': {'by': 'migrasi'}, 'transactions': [
+            {'tx_id': 'not-a-uuid', 'sender': 'ani', 'items': [], 'total': 1, 'timestamp': 1700000002},
+            {'sender': 'ani', 'total': True, 'items': {'raw': 1}},
+            {'tx_id': '0' * 32, 'version': 2, 'sender': 'ani', 'items': [
+                {'product_id': None, 'name': 'Hapus', 'unit_price': 0, 'qty': 1, 'subtotal': 0}],
+             'total': 0, 'timestamp': 1700000002.0},
+            {'tx_id': '1' * 32, 'version': 2, 'sender': 'ani', 'items': [
+                {'product_id': 3, 'name': 'Tumbler', 'unit_price': 80000, 'qty': 2, 'subtotal': 160000}],
+             'total': 160000, 'timestamp': 1700000002.5},
+        ], 'proof': 12345, 'previous_hash': 'f' * 64, 'signature': '0' * 64},
+    ]
+
+
+class TestCompactChain(unittest.TestCase):
+
+    def test_roundtrip_is_byte_identical(self):
+        blocks = odd_blocks() + synthetic_chain(300, block_size=50)[1:]
+        for i, b in enumerate(blocks):
+            b['index'] = i + 1
+        compact = CompactChain(blocks)
+        self.assertEqual(len(compact), len(blocks))
+        self.assertEqual(len(compact.overflow), 3)
+        for pos, block in enumerate(blocks):
+            restored = compact[pos]
+            self.assertEqual(encode_block(restored), encode_block(block))
+            self.assertEqual(canonical_hash(restored), canonical_hash(block))
+        self.assertEqual(compact[-1], blocks[-1])
+        self.assertEqual(compact[1:3], blocks[1:3])
+        self.assertEqual(list(compact), blocks)
+        self.assertEqual(compact.transaction(2, 3), blocks[2]['transactions'][3])
+
+    def test_materialized_blocks_are_independent_copies(self):
+        compact = CompactChain(odd_blocks())
+        block = compact[2]
+        block['transactions'][1]['items']['raw'] = 99
+        block['note']['by'] = 'hacker'
+        self.assertEqual(compact[2], odd_blocks()[2])
+
+    def test_uses_fraction_of_dict_memory(self):
+        raw = json.dumps(synthetic_chain(5000, block_size=100))
+        dict_chain, dict_bytes = measure(lambda: json.loads(raw))
+        _, compact_bytes = measure(lambda: CompactChain(dict_chain))
+        self.assertLess(compact_bytes, dict_bytes * 0.3)
+
+    def test_blockchain_read_api_matches_dict_layout(self):
+        plain = Blockchain(layout='dict')
+        for i in range(6):
+            plain.add_transaction("User1" if i % 2 == 0 else "User2", f"Kopi (x{i + 1})", 25000 * (i + 1))
+            plain.create_block(i + 1)
+        plain.add_transaction("User1", [{'product_id': 1, 'name': 'Kopi', 'unit_price': 25000, 'qty': 2}], 50000)
+        plain.create_block(7)
+
+        compact = Blockchain(chain=plain.chain, layout='compact')
+        self.assertIsInstance(compact.chain, CompactChain)
+        verify_chain_data(list(compact.chain))
+        self.assertEqual(compact.get_transactions_by_user("User1"), plain.get_transactions_by_user("User1"))
+        self.assertEqual(compact.get_all_transactions(), plain.get_all_transactions())
+        self.assertEqual(compact.query_transactions(min_total=50000, limit=3),
+                         plain.query_transactions(min_total=50000, limit=3))
+        self.assertEqual([compact.block_record(p) for p in range(len(compact.chain))],
+                         [plain.block_record(p) for p in range(len(plain.chain))])
+
+        compact.add_transaction("User3", "Buku (x1)", 120000)
+        block = compact.create_block(8)
+        self.assertEqual(compact.chain[-1], block)
+        self.assertEqual(compact.block_hash(len(compact.chain) - 2), plain.block_hash(len(plain.chain) - 1))
+        self.assertTrue(compact.validate(workers=1)['valid'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from pythonjsonlogger.json import JsonFormatter
+
+from log_pipeline import LogPipeline, SamplingFilter, parse_sample_rates
+
+
+class BlockingStream(io.StringIO):
+    """Sink yang macet sampai `release` di-set, dan menghitung jumlah write()."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = 0
+
+    def write(self, s):
+        self.release.wait()
+        self.writes += 1
+        return super().write(s)
+
+
+def make_logger(pipeline, name):
+    logger = logging.getLogger(name)
+    logger.handlers = [pipeline.handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+class TestLogPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.formatter = JsonFormatter(fmt='%(levelname)s %(message)s')
+
+    def test_blocked_sink_never_blocks_caller(self):
+        stream = BlockingStream()
+        pipeline = LogPipeline(self.formatter, stream=stream, max_queue=10, policy='drop').start()
+        logger = make_logger(pipeline, 'test.drop')
+        started = time.perf_counter()
+        for i in range(200):
+            logger.info("Processing new order.", extra={'n': i})
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreater(pipeline.stats['dropped'], 150)
+
+        stream.release.set()
+        pipeline.stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines) + pipeline.stats['dropped'], 200)
+        self.assertEqual(json.loads(lines[0])['message'], "Processing new order.")
+
+    def test_block_policy_waits_then_drops(self):
+        stream = BlockingStream()
+        pipeline = LogPipeline(self.formatter, stream=stream, max_queue=1, policy='block',
+                               block_timeout=0.05, batch_size=1).start()
+        logger = make_logger(pipeline, 'test.block')
+        started = time.perf_counter()
+        for _ in range(4):
+            logger.info("x")
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        self.assertGreaterEqual(pipeline.stats['dropped'], 1)
+        stream.release.set()
+        pipeline.stop()
+
+    def test_records_written_in_batches(self):
+        stream = BlockingStream()
+        stream.release.set()
+        pipeline = LogPipeline(self.formatter, stream=stream, batch_size=100, flush_interval=0.5)
+        logger = make_logger(pipeline, 'test.batch')
+        for i in range(250):
+            logger.info("Transaction mined. %d", i)
+        pipeline.start().stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([json.loads(l)['message'] for l in lines], [f"Transaction mined. {i}" for i in range(250)])
+        self.assertLessEqual(stream.writes, 3)
+
+    def test_exception_text_survives_queue(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'app.log')
+            pipeline = LogPipeline(self.formatter, path=path).start()
+            logger = make_logger(pipeline, 'test.exc')
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                logger.exception("Checkout failed.")
+            pipeline.stop()
+            with open(path, encoding='utf-8') as f:
+                entry = json.loads(f.readline())
+            self.assertIn('RuntimeError: boom', entry['exc_info'])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "butuh os.fork")
+    def test_listener_restarts_in_forked_child(self):
+        """Setelah fork (gunicorn --preload) child tetap menulis log lewat listener baru"""
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'app.log')
+            pipeline = LogPipeline(self.formatter, path=path, flush_interval=0.01).start()
+            logger = make_logger(pipeline, 'test.fork')
+            logger.info("parent")
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    logger.info("child")
+                    pipeline.stop()
+                    code = 0
+                finally:
+                    os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(status, 0)
+            pipeline.stop()
+            with open(path, encoding='utf-8') as f:
+                messages = sorted(json.loads(line)['message'] for line in f)
+            self.assertEqual(messages, ['child', 'parent'])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_sampling_keeps_rate_and_warnings(self):
+        sampler = SamplingFilter({"Transaction mined.": 0.25})
+        record = lambda msg, level=logging.INFO: logging.LogRecord('t', level, __file__, 1, msg, None, None)
+        kept = sum(sampler.filter(record("Transaction mined.")) for _ in range(100))
+        self.assertEqual(kept, 25)
+        self.assertEqual(sampler.sampled_out, 75)
+        self.assertTrue(all(sampler.filter(record("Transaction mined.", logging.WARNING)) for _ in range(5)))
+        self.assertTrue(all(sampler.filter(record("User logged in.")) for _ in range(5)))
+
+    def test_parse_sample_rates(self):
+        self.assertEqual(parse_sample_rates("Transaction mined.=0.1; Processing new order.=2"),
+                         {"Transaction mined.": 0.1, "Processing new order.": 1.0})
+        self.assertEqual(parse_sample_rates(""), {})
+        with self.assertRaises(ValueError):
+            parse_sample_rates("tanpa-rate")
+
+
+if __name__ == '__main__':
+    unittest.main()
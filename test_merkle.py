@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import json
+import unittest
+
+from merkle import (block_header, merkle_branch, merkle_levels, merkle_root, root_from_branch,
+                    sign_header, verify_block_merkle, verify_inclusion)
+
+KEY = b'test-key'
+
+
+def make_txs(n):
+    return [{'tx_id': f't{i}', 'sender': f'u{i % 3}', 'items': 'Kopi (x1)', 'total': 1000 * (i + 1)} for i in range(n)]
+
+
+class TestMerkle(unittest.TestCase):
+
+    def test_every_leaf_proves_against_root(self):
+        for n in (1, 2, 3, 5, 8, 13):
+            txs = make_txs(n)
+            levels = merkle_levels(txs)
+            root = merkle_root(txs)
+            for i, tx in enumerate(txs):
+                branch = merkle_branch(levels, i)
+                self.assertLessEqual(len(branch), max(1, (n - 1).bit_length()))
+                self.assertEqual(root_from_branch(tx, branch), root, (n, i))
+
+    def test_empty_block_root_is_stable(self):
+        self.assertEqual(merkle_root([]), merkle_root([]))
+        self.assertNotEqual(merkle_root([]), merkle_root(make_txs(1)))
+
+    def test_inclusion_against_signed_header(self):
+        """Satu transaksi diverifikasi hanya dengan header bertanda tangan + branch"""
+        txs = make_txs(6)
+        block = {'index': 3, 'timestamp': 1.0, 'proof': 12345, 'previous_hash': 'ab',
+                 'transactions': txs, 'merkle_root': merkle_root(txs)}
+        block['header_signature'] = sign_header(KEY, block)
+        header = block_header(block)
+        self.assertNotIn('transactions', header)
+
+        branch = merkle_branch(merkle_levels(txs), 4)
+        self.assertTrue(verify_inclusion(txs[4], branch, header, block['header_signature'], KEY))
+        self.assertFalse(verify_inclusion(dict(txs[4], total=1), branch, header, block['header_signature'], KEY))
+        self.assertFalse(verify_inclusion(txs[3], branch, header, block['header_signature'], KEY))
+        self.assertFalse(verify_inclusion(txs[4], branch, dict(header, timestamp=2.0), block['header_signature'], KEY))
+        self.assertFalse(verify_inclusion(txs[4], branch, header, block['header_signature'], b'other-key'))
+
+    def test_header_mac_is_domain_separated(self):
+        """Key sama dengan signature block -> HMAC header harus beda dari HMAC JSON header polos"""
+        txs = make_txs(2)
+        block = {'index': 1, 'timestamp': 1.0, 'proof': 1, 'previous_hash': '1', 'transactions': txs,
+                 'merkle_root': merkle_root(txs)}
+        plain = hmac.new(KEY, json.dumps(block_header(block), sort_keys=True, default=str).encode('utf-8'),
+                         hashlib.sha256).hexdigest()
+        self.assertNotEqual(sign_header(KEY, block), plain)
+        branch = merkle_branch(merkle_levels(txs), 0)
+        self.assertFalse(verify_inclusion(txs[0], branch, block_header(block), plain, KEY))
+
+    def test_verify_block_merkle(self):
+        txs = make_txs(4)
+        block = {'transactions': txs, 'merkle_root': merkle_root(txs)}
+        self.assertTrue(verify_block_merkle(block))
+        self.assertTrue(verify_block_merkle({'transactions': txs}))
+        txs[2]['total'] = 1
+        self.assertFalse(verify_block_merkle(block))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from metrics import MetricsRegistry, _process_start
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_render_counter_histogram_gauge(self):
+        reg = MetricsRegistry()
+        c = reg.counter('http_requests_total', 'Requests.', ('endpoint', 'status'))
+        h = reg.histogram('latency_seconds', 'Latency.', ('endpoint',), buckets=(0.1, 1.0))
+        reg.gauge('chain_height', 'Height.', lambda: 7)
+        c.inc('checkout', 302)
+        c.inc('checkout', 302)
+        for v in (0.05, 0.5, 3.0):
+            h.observe(v, 'checkout')
+
+        text = reg.render()
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{endpoint="checkout",status="302"} 2', text)
+        self.assertIn('latency_seconds_bucket{endpoint="checkout",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{endpoint="checkout",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{endpoint="checkout",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{endpoint="checkout"} 3.55', text)
+        self.assertIn('latency_seconds_count{endpoint="checkout"} 3', text)
+        self.assertIn('chain_height 7', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_timed_decorator_and_label_escaping(self):
+        reg = MetricsRegistry()
+
+        @reg.timed('save_seconds', 'Save.')
+        def save(x):
+            return x * 2
+
+        self.assertEqual(save(21), 42)
+        self.assertIn('save_seconds_count 1', reg.render())
+        c = reg.counter('weird_total', 'Weird.', ('v',))
+        c.inc('a"b\\c')
+        self.assertIn('weird_total{v="a\\"b\\\\c"} 1', reg.render())
+        with self.assertRaises(ValueError):
+            c.inc()
+
+    def test_flush_only_when_dirty(self):
+        reg = MetricsRegistry(self.tmp)
+        self.assertFalse(reg.flush())
+        reg.counter('x_total', 'X.').inc()
+        self.assertTrue(reg.flush())
+        self.assertFalse(reg.flush())
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, f'metrics_{os.getpid()}_{reg.start_time}.json')))
+
+    def test_multiprocess_aggregation(self):
+        # Snapshot worker lain (pid palsu yang sudah mati): counter/histogram dijumlah, gauge diabaikan
+        other = MetricsRegistry()
+        other.counter('orders_total', 'Orders.', ('status',)).inc('ok', amount=5)
+        other.histogram('lat_seconds', 'Lat.', buckets=(1.0,)).observe(0.5)
+        other.gauge('chain_height', 'Height.', lambda: 99)
+        dead_pid = 2 ** 22 + 12345
+        with open(os.path.join(self.tmp, f'metrics_{dead_pid}_1.json'), 'w') as f:
+            json.dump({'pid': dead_pid, 'start': 1, 'metrics': other.snapshot()}, f)
+
+        reg = MetricsRegistry(self.tmp)
+        reg.counter('orders_total', 'Orders.', ('status',)).inc('ok', amount=2)
+        reg.histogram('lat_seconds', 'Lat.', buckets=(1.0,)).observe(2.0)
+        reg.gauge('chain_height', 'Height.', lambda: 4)
+        text = reg.render()
+        self.assertIn('orders_total{status="ok"} 7', text)
+        self.assertIn('lat_seconds_bucket{le="1"} 1', text)
+        self.assertIn('lat_seconds_count 2', text)
+        self.assertIn(f'chain_height{{pid="{os.getpid()}"}} 4', text)
+        self.assertNotIn('99', text)
+
+
+    @unittest.skipIf(_process_start(os.getpid()) is None, "butuh /proc untuk start time process")
+    def test_dead_snapshots_folded_into_aggregate(self):
+        """Snapshot process mati (juga PID yang dipakai ulang process lain) dilipat sekali lalu dihapus"""
+        other = MetricsRegistry()
+        other.counter('orders_total', 'Orders.').inc(amount=3)
+        reused = f'metrics_{os.getpid()}_1.json'   # PID sama dengan process ini, start time lain
+        for fname in ('metrics_4194303_1.json', reused):
+            with open(os.path.join(self.tmp, fname), 'w') as f:
+                json.dump({'metrics': other.snapshot()}, f)
+
+        reg = MetricsRegistry(self.tmp)
+        reg.counter('orders_total', 'Orders.').inc()
+        reg.flush()
+        self.assertIn('orders_total 7', reg.render())
+        self.assertIn('orders_total 7', reg.render())
+        self.assertEqual(sorted(f for f in os.listdir(self.tmp) if f.endswith('.json')),
+                         sorted(['metrics_aggregate.json', os.path.basename(reg._snapshot_path())]))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "butuh os.fork")
+    def test_flusher_restarts_in_forked_child(self):
+        reg = MetricsRegistry(self.tmp, flush_interval=0.01).start()
+        counter = reg.counter('orders_total', 'Orders.')
+        counter.inc(amount=5)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                counter.inc()
+                for _ in range(200):
+                    if os.path.exists(reg._snapshot_path()):
+                        code = 0
+                        break
+                    time.sleep(0.01)
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        reg.stop()
+        self.assertIn('orders_total 6', reg.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
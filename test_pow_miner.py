@@ -0,0 +1,69 @@
+import unittest
+
+from chain_validator import canonical_hash, hmac_signature, validate_chain
+from pow_miner import ProofOfWorkMiner, pow_header, verify_proof
+
+KEY = b'test-key'
+
+
+def make_block(index=1, prev='1'):
+    return {'index': index, 'timestamp': 1700000000.0 + index, 'proof': 12345,
+            'transactions': [{'sender': 'u', 'items': 'Kopi (x1)', 'total': 1000}], 'previous_hash': prev}
+
+
+class TestProofOfWork(unittest.TestCase):
+
+    def test_difficulty_zero_is_noop(self):
+        block = make_block()
+        ProofOfWorkMiner(0).seal(block)
+        self.assertEqual(block['proof'], 12345)
+        self.assertNotIn('difficulty', block)
+        self.assertTrue(verify_proof(block))
+
+    def test_mined_proof_verifies(self):
+        for workers in (1, 2):
+            block = make_block()
+            miner = ProofOfWorkMiner(10, workers=workers, chunk=256)
+            miner.seal(block)
+            self.assertEqual(block['difficulty'], 10)
+            self.assertTrue(verify_proof(block), workers)
+            self.assertGreater(miner.last_stats['hashes'], 0)
+
+            block['transactions'][0]['total'] = 1
+            self.assertFalse(verify_proof(block))
+
+    def test_header_excludes_proof_and_signature(self):
+        block = make_block()
+        self.assertEqual(pow_header(block), pow_header(dict(block, proof=1, signature='x', header_signature='y')))
+        self.assertNotEqual(pow_header(block), pow_header(dict(block, difficulty=4)))
+
+    def test_malformed_proof_rejected(self):
+        for proof in (-1, 'abc', None, 1 << 64):
+            self.assertFalse(verify_proof(dict(make_block(), difficulty=4, proof=proof)))
+        self.assertFalse(verify_proof(dict(make_block(), difficulty=999, proof=1)))
+
+    def test_timeout_returns_none(self):
+        miner = ProofOfWorkMiner(256, workers=1, chunk=64)
+        self.assertIsNone(miner.mine(make_block(), max_seconds=0.05))
+        self.assertGreater(miner.last_stats['hashrate'], 0)
+
+    def test_validator_checks_proof(self):
+        miner = ProofOfWorkMiner(6, workers=1)
+        chain = []
+        for i in range(1, 4):
+            block = make_block(i, '1' if i == 1 else canonical_hash(chain[-1]))
+            miner.seal(block)
+            block['signature'] = hmac_signature(KEY, block)
+            chain.append(block)
+        self.assertTrue(validate_chain(chain, KEY, workers=1)['valid'])
+
+        # Proof palsu dengan HMAC yang valid (mis. kunci bocor) tetap ditolak
+        while verify_proof(chain[1]):
+            chain[1]['proof'] += 1
+        chain[1]['signature'] = hmac_signature(KEY, chain[1])
+        report = validate_chain(chain, KEY, workers=1)
+        self.assertEqual((report['first_bad_index'], report['error']), (2, 'proof-of-work invalid'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import chain_storage
+from chain_core import Blockchain
+from chain_store import SegmentedChainStore
+from process_lock import ProcessLock, fcntl
+
+
+def append_under_lock(directory, lock_path, count):
+    store = SegmentedChainStore(directory, fsync_policy='never')
+    lock = ProcessLock(lock_path, on_acquire=lambda: store.refresh(force=True))
+    for _ in range(count):
+        with lock:
+            height = store.height
+            store.append({'index': height + 1, 'pid': os.getpid(), 'signature': f's{height + 1}'})
+
+
+class TestProcessLock(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.lock_path = os.path.join(self.tmp, 'store.lock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_reentrant_and_on_acquire_once(self):
+        calls = []
+        lock = ProcessLock(self.lock_path, on_acquire=lambda: calls.append(1))
+        with lock:
+            with lock:
+                pass
+        with lock:
+            pass
+        self.assertEqual(lock.acquisitions, 2)
+        self.assertEqual(len(calls), 2 if lock.interprocess else 0)
+
+    def test_thread_only_mode_creates_no_file(self):
+        lock = ProcessLock(self.lock_path, interprocess=False)
+        hits = []
+
+        def worker():
+            for _ in range(200):
+                with lock:
+                    hits.append(len(hits))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(hits, list(range(800)))
+        self.assertFalse(os.path.exists(self.lock_path))
+
+    @unittest.skipIf(fcntl is None or 'fork' not in multiprocessing.get_all_start_methods(),
+                     "butuh fcntl + fork")
+    def test_processes_append_contiguously(self):
+        """Beberapa process append ke store yang sama: index tetap berurutan tanpa celah/duplikat"""
+        ctx = multiprocessing.get_context('fork')
+        store_dir = os.path.join(self.tmp, 'chain_store')
+        workers = [ctx.Process(target=append_under_lock, args=(store_dir, self.lock_path, 25)) for _ in range(4)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join(30)
+            self.assertEqual(p.exitcode, 0)
+
+        blocks = SegmentedChainStore(store_dir).load()
+        self.assertEqual([b['index'] for b in blocks], list(range(1, 101)))
+        self.assertEqual(len({b['pid'] for b in blocks}), 4)
+
+
+class TestSharedChainSync(unittest.TestCase):
+    """chain_storage.sync_chain: worker mengejar block yang disegel worker lain lewat store."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = SegmentedChainStore(self.tmp, fsync_policy='never')
+        patcher = mock.patch.object(chain_storage, 'chain_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Worker A menulis chain ke store; worker B memuat salinannya
+        self.writer = Blockchain()
+        self.store.append_many(self.writer.chain)
+        self.reader = Blockchain(chain=self.store.load())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def seal(self, n):
+        for i in range(n):
+            block = self.writer.seal_transactions(
+                [Blockchain.build_transaction('User1', 'Kopi (x1)', 25000)], proof=12345)
+            self.store.append(block)
+
+    def test_catches_up_only_new_blocks(self):
+        self.seal(3)
+        self.assertTrue(chain_storage.sync_chain(self.reader))
+        self.assertEqual(self.reader.chain, self.writer.chain)
+        self.assertEqual(self.reader.count_transactions_by_user('User1'), 3)
+        self.assertEqual(self.reader.block_record(3), next(self.store.iter_records(4)))
+        # Sudah di tip -> tidak ada yang dibaca ulang
+        self.assertTrue(chain_storage.sync_chain(self.reader))
+        self.assertEqual(len(self.reader.chain), 4)
+
+    def test_replaced_store_is_reported(self):
+        self.seal(2)
+        self.store.rewrite(Blockchain().chain)  # import/restore di worker lain
+        self.assertFalse(chain_storage.sync_chain(self.reader))
+        self.assertEqual(len(self.reader.chain), 1)
+
+    def test_tampered_block_is_rejected(self):
+        self.seal(1)
+        block = dict(self.writer.chain[-1], transactions=[])
+        self.store.rewrite(self.writer.chain[:-1] + [block])
+        with self.assertRaises(ValueError):
+            chain_storage.sync_chain(self.reader)
+        self.assertEqual(len(self.reader.chain), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
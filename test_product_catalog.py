@@ -0,0 +1,56 @@
+import unittest
+from types import SimpleNamespace
+
+from product_catalog import ProductResolver
+
+
+def make_product(pid, name, price):
+    return SimpleNamespace(id=pid, name=name, price=price, image='', description='', category='Umum')
+
+
+class TestProductResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        self.products = [make_product(1, 'Kopi Susu', 25000), make_product(2, 'Buku', 120000)]
+        self.resolver = ProductResolver(self.load)
+
+    def load(self):
+        self.calls += 1
+        return list(self.products)
+
+    def test_catalog_loaded_once(self):
+        """Lookup by id dan nama (case-insensitive) tidak memuat ulang katalog"""
+        self.assertEqual(self.resolver.get(1).price, 25000)
+        self.assertEqual(self.resolver.get('2').name, 'Buku')
+        self.assertEqual(self.resolver.by_name('  KOPI susu ').id, 1)
+        self.assertIsNone(self.resolver.by_name('Mobil'))
+        self.assertIsNone(self.resolver.get('abc'))
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_reloads(self):
+        self.assertEqual(self.resolver.get(1).price, 25000)
+        self.products[0] = make_product(1, 'Kopi Susu', 30000)
+        self.assertEqual(self.resolver.get(1).price, 25000)
+
+        self.resolver.invalidate()
+        self.assertEqual(self.resolver.get(1).price, 30000)
+        self.assertEqual(self.calls, 2)
+
+    def test_duplicate_names_use_first_product(self):
+        self.products.append(make_product(3, 'buku', 1))
+        self.assertEqual(self.resolver.by_name('Buku').id, 2)
+        self.assertEqual(len(self.resolver.all()), 3)
+
+
+    def test_max_age_reloads_and_keeps_unchanged_snapshot(self):
+        resolver = ProductResolver(self.load, max_age=0)
+        first = resolver.get(1)
+        self.assertIs(resolver.get(1), first)   # isi sama -> snapshot lama dipakai lagi
+        self.products[0] = make_product(1, 'Kopi Susu', 30000)
+        self.assertEqual(resolver.get(1).price, 30000)
+        self.assertEqual(self.calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
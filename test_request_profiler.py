@@ -0,0 +1,79 @@
+import marshal
+import pstats
+import time
+import unittest
+
+from request_profiler import MAX_SQL_STATEMENTS, RequestProfiler, make_token, summarize, verify_token
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(500))
+
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def test_token_signature_and_expiry(self):
+        token = make_token(b'secret', 7, ttl=60, now=1000)
+        self.assertEqual(verify_token(b'secret', token, now=1050), 7)
+        self.assertIsNone(verify_token(b'secret', token, now=1061))
+        self.assertIsNone(verify_token(b'other', token, now=1050))
+        user_id, expires, sig = token.split('.')
+        self.assertIsNone(verify_token(b'secret', f'{user_id}.{int(expires) + 999}.{sig}', now=1050))
+        self.assertIsNone(verify_token(b'secret', f'1.{expires}.{sig}', now=1050))
+        self.assertIsNone(verify_token(b'secret', 'garbage', now=1050))
+
+    def test_decide_triggers(self):
+        profiler = RequestProfiler(b'secret', mode='cprofile')
+        self.assertIsNone(profiler.decide())
+        self.assertIsNone(profiler.decide(flag='cprofile', is_admin=False))
+        self.assertEqual(profiler.decide(flag='sampling', is_admin=True), ('sampling', 'admin'))
+        token = make_token(b'secret', 7)
+        self.assertEqual(profiler.decide(token=token, admin_check=lambda uid: uid == 7), ('cprofile', 'token'))
+        # Pembuat token bukan admin lagi / tanpa pengecekan admin -> token ditolak
+        self.assertIsNone(profiler.decide(token=token, admin_check=lambda uid: False))
+        self.assertIsNone(profiler.decide(token=token))
+        self.assertIsNone(profiler.decide(token='7.1.deadbeef', admin_check=lambda uid: True))
+        profiler.sample_rate = 1.0
+        self.assertEqual(profiler.decide(), ('cprofile', 'sampled'))
+
+    def test_cprofile_entry_is_pstats_readable(self):
+        profiler = RequestProfiler(b'secret', capacity=2)
+        session = profiler.start('cprofile', 'admin')
+        busy(0.01)
+        for i in range(MAX_SQL_STATEMENTS + 5):
+            session.record_sql("SELECT  *\n FROM product WHERE id = ?", 0.001)
+        entry = profiler.finish(session, 'GET', '/admin', 'admin_dashboard', 200)
+
+        self.assertEqual(entry['format'], 'prof')
+        self.assertEqual(entry['sql_count'], MAX_SQL_STATEMENTS + 5)
+        self.assertEqual(len(entry['sql']), MAX_SQL_STATEMENTS)
+        self.assertEqual(entry['sql'][0]['statement'], "SELECT * FROM product WHERE id = ?")
+        functions = {func[2] for func in marshal.loads(entry['payload'])}
+        self.assertIn('busy', functions)
+        self.assertIn('busy', summarize(entry))
+
+    def test_sampling_produces_folded_stacks(self):
+        profiler = RequestProfiler(b'secret', mode='sampling', sample_interval_ms=1)
+        session = profiler.start('sampling', 'sampled')
+        busy(0.1)
+        entry = profiler.finish(session, 'GET', '/explorer', 'explorer', 200)
+        lines = entry['payload'].decode().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('busy (test_request_profiler.py:', stack)
+        self.assertGreater(int(count), 0)
+        self.assertIn('samples', summarize(entry))
+
+    def test_ring_buffer_is_bounded(self):
+        profiler = RequestProfiler(b'secret', capacity=3)
+        for i in range(5):
+            profiler.finish(profiler.start('cprofile', 'admin'), 'GET', f'/p{i}', 'home', 200)
+        self.assertEqual([e['path'] for e in profiler.list()], ['/p4', '/p3', '/p2'])
+        self.assertIsNone(profiler.get(1))
+        self.assertEqual(profiler.get(5)['path'], '/p4')
+
+
+if __name__ == '__main__':
+    unittest.main()
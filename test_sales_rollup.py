@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from sales_rollup import SalesRollup, day_key, split_total
+
+CATEGORIES = {'Kopi': 'Lifestyle', 'Tumbler': 'Lifestyle', 'Buku': 'Buku'}
+
+
+def item_fn(tx):
+    return [dict(it, category=CATEGORIES.get(it['name'], 'Umum')) for it in tx['items']]
+
+
+def make_tx(sender, items, ts):
+    return {'sender': sender, 'items': [{'name': n, 'qty': q, 'subtotal': s} for n, q, s in items],
+            'total': sum(s for _, _, s in items), 'timestamp': ts}
+
+
+def make_block(index, transactions, signature=None):
+    return {'index': index, 'timestamp': 1700000000.0 + index, 'transactions': transactions,
+            'proof': 12345, 'previous_hash': f'h{index - 1}', 'signature': signature or f's{index}'}
+
+
+class TestSalesRollup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.rollup = SalesRollup(self.tmp, item_fn)
+        day1 = datetime(2024, 3, 1, 10).timestamp()
+        day2 = datetime(2024, 3, 2, 10).timestamp()
+        self.chain = [
+            make_block(1, []),
+            make_block(2, [make_tx('alice', [('Kopi', 2, 50000), ('Tumbler', 1, 80000)], day1),
+                           make_tx('bob', [('Buku', 1, 90000)], day1)]),
+            make_block(3, [make_tx('alice', [('Kopi', 1, 25000), ('Kopi', 1, 25000)], day2)]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_aggregates_by_dimension(self):
+        self.assertEqual(self.rollup.sync(self.chain), 3)
+        self.assertEqual(self.rollup.totals(), {'revenue': 270000, 'orders': 3, 'items': 6})
+        self.assertEqual(dict(self.rollup.breakdown('by_day')),
+                         {'2024-03-02': {'revenue': 50000, 'orders': 1},
+                          '2024-03-01': {'revenue': 220000, 'orders': 2}})
+        # Produk yang muncul dua kali di satu transaksi tetap dihitung satu order
+        self.assertEqual(dict(self.rollup.breakdown('by_product'))['Kopi'],
+                         {'revenue': 100000, 'orders': 2, 'qty': 4})
+        self.assertEqual(dict(self.rollup.breakdown('by_category'))['Lifestyle'],
+                         {'revenue': 180000, 'orders': 2, 'qty': 5})
+        self.assertEqual(self.rollup.breakdown('by_buyer', limit=1),
+                         [('alice', {'revenue': 180000, 'orders': 2})])
+
+    def test_sync_applies_only_new_blocks(self):
+        self.rollup.sync(self.chain[:2])
+        calls = []
+        self.rollup.item_fn = lambda tx: calls.append(tx) or item_fn(tx)
+        self.assertEqual(self.rollup.sync(self.chain), 1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.rollup.sync(self.chain), 0)
+        self.assertEqual(self.rollup.height, 3)
+
+    def test_persisted_state_is_resumed(self):
+        self.rollup.sync(self.chain[:2])
+        self.assertTrue(self.rollup.save())
+        self.assertFalse(self.rollup.save())
+
+        reloaded = SalesRollup(self.tmp, item_fn)
+        self.assertEqual(reloaded.height, 2)
+        self.assertEqual(reloaded.sync(self.chain), 1)
+        self.assertEqual(reloaded.totals()['revenue'], 270000)
+
+    def test_replaced_chain_triggers_rebuild(self):
+        self.rollup.sync(self.chain)
+        replaced = [self.chain[0], make_block(2, [make_tx('carol', [('Buku', 1, 90000)], 0)], signature='other')]
+        self.assertEqual(self.rollup.sync(replaced), 2)
+        self.assertEqual(self.rollup.totals(), {'revenue': 90000, 'orders': 1, 'items': 1})
+        self.assertEqual([k for k, _ in self.rollup.breakdown('by_buyer')], ['carol'])
+
+    def test_apply_block_rejects_gap_and_failed_block_leaves_state(self):
+        self.rollup.apply_block(self.chain[0])
+        with self.assertRaises(ValueError):
+            self.rollup.apply_block(self.chain[2])
+
+        def broken(tx):
+            raise RuntimeError("catalog unavailable")
+        self.rollup.item_fn = broken
+        with self.assertRaises(RuntimeError):
+            self.rollup.apply_block(self.chain[1])
+        self.assertEqual(self.rollup.height, 1)
+        self.assertEqual(self.rollup.totals()['orders'], 0)
+
+    def test_split_total_keeps_recorded_total(self):
+        self.assertEqual(split_total(900000, [750000, 150000]), [750000, 150000])
+        self.assertEqual(split_total(100, [1, 1, 1]), [33, 33, 34])
+        self.assertEqual(split_total(10, [0, 0]), [5, 5])
+        self.assertEqual(split_total(10, []), [])
+
+    def test_day_key_handles_bad_timestamp(self):
+        self.assertEqual(day_key('bukan angka'), 'unknown')
+        self.assertEqual(day_key(datetime(2024, 1, 5, 12).timestamp()), '2024-01-05')
+
+
+if __name__ == '__main__':
+    unittest.main()
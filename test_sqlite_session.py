@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+
+from flask import Flask, flash, get_flashed_messages, session
+
+from sqlite_session import SQLiteSessionInterface
+
+
+class TestSQLiteSession(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+        self.store = SQLiteSessionInterface(os.path.join(self.tmp, 's.db'), sweep_interval=0)
+        self.app.session_interface = self.store
+
+        @self.app.route('/add/<int:pid>')
+        def add(pid):
+            cart = session.get('cart', {})
+            cart[str(pid)] = cart.get(str(pid), 0) + 1
+            session['cart'] = cart
+            return str(sum(cart.values()))
+
+        @self.app.route('/view')
+        def view():
+            return str(sum(session.get('cart', {}).values()))
+
+        @self.app.route('/flash')
+        def do_flash():
+            flash('hai', 'info')
+            return ''
+
+        @self.app.route('/read_flash')
+        def read_flash():
+            return repr(get_flashed_messages(with_categories=True))
+
+        @self.app.route('/clear')
+        def clear():
+            session.clear()
+            return ''
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def rows(self):
+        return self.store._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def test_roundtrip_and_skip_unchanged(self):
+        c = self.app.test_client()
+        c.get('/add/1')
+        self.assertEqual(c.get('/add/1').data, b'2')
+        writes = self.store.stats['writes']
+
+        r = c.get('/view')
+        self.assertEqual(r.data, b'2')
+        self.assertNotIn('Set-Cookie', r.headers)
+        self.assertEqual(self.store.stats['writes'], writes)
+        self.assertEqual(self.rows(), 1)
+
+    def test_empty_sessions_not_stored(self):
+        """Visitor anonim tanpa data tidak membuat row; session yang dikosongkan dihapus"""
+        c = self.app.test_client()
+        c.get('/view')
+        self.assertEqual(self.rows(), 0)
+
+        c.get('/flash')
+        self.assertEqual(c.get('/read_flash').data, b"[('info', 'hai')]")
+        self.assertEqual(self.rows(), 0)
+
+        c.get('/add/3')
+        c.get('/clear')
+        self.assertEqual(self.rows(), 0)
+
+    def test_sweep_removes_expired(self):
+        for _ in range(3):
+            self.app.test_client().get('/add/1')
+        self.assertEqual(self.rows(), 3)
+        self.assertEqual(self.store.sweep(now=time.time()), 0)
+        self.assertEqual(self.store.sweep(now=time.time() + 3601), 3)
+        self.assertEqual(self.rows(), 0)
+
+    def test_tampered_cookie_starts_new_session(self):
+        c = self.app.test_client()
+        c.get('/add/1')
+        c.set_cookie('session', 'forged-session-id')
+        self.assertEqual(c.get('/view').data, b'0')
+
+
+if __name__ == '__main__':
+    unittest.main()
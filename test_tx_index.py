@@ -0,0 +1,116 @@
+import random
+import unittest
+
+from tx_index import TransactionIndex, decode_cursor
+
+
+def make_chain(n_blocks, seed=7):
+    rnd = random.Random(seed)
+    chain, ts = [{'index': 1, 'timestamp': 1000.0, 'transactions': []}], 1000.0
+    for i in range(2, n_blocks + 2):
+        txs = []
+        for _ in range(rnd.randint(0, 4)):
+            ts += rnd.choice([0, 0.5, 1, 3])
+            txs.append({'sender': rnd.choice(['alice', 'bob', 'carol']),
+                        'total': rnd.choice([5000, 25000, 50000, 120000, 500000]), 'timestamp': ts})
+        chain.append({'index': i, 'timestamp': ts + 0.1, 'transactions': txs})
+    return chain
+
+
+def sender_positions(chain, sender):
+    return [(pos, t) for pos, b in enumerate(chain) for t, tx in enumerate(b['transactions']) if tx['sender'] == sender]
+
+
+class TestTransactionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = make_chain(60)
+        self.tx_at = lambda pos, tx_pos: (self.chain[pos]['transactions'][tx_pos], self.chain[pos]['timestamp'])
+        self.index = TransactionIndex()
+        for pos, block in enumerate(self.chain):
+            self.index.add_block(pos, block)
+
+    def brute(self, since=None, until=None, min_total=None, max_total=None, sender=None):
+        out = set()
+        for pos, block in enumerate(self.chain):
+            for t, tx in enumerate(block['transactions']):
+                if since is not None and tx['timestamp'] < since: continue
+                if until is not None and tx['timestamp'] > until: continue
+                if min_total is not None and tx['total'] < min_total: continue
+                if max_total is not None and tx['total'] > max_total: continue
+                if sender is not None and tx['sender'] != sender: continue
+                out.add((pos, t))
+        return out
+
+    def collect(self, limit, sender=None, **filters):
+        """Ikuti cursor sampai habis; pastikan tidak ada duplikat antar halaman."""
+        positions = None if sender is None else sender_positions(self.chain, sender)
+        seen, cursor, orders = [], None, set()
+        while True:
+            page, order, cursor = self.index.query(self.tx_at, sender_positions=positions,
+                                                   limit=limit, cursor=cursor, **filters)
+            self.assertLessEqual(len(page), limit)
+            seen.extend(page)
+            orders.add(order)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(orders), 1)
+        return set(seen), orders.pop()
+
+    def test_matches_full_scan_across_pages(self):
+        cases = [
+            {},
+            {'since': 1040, 'until': 1090},
+            {'min_total': 120000},
+            {'min_total': 25000, 'max_total': 50000, 'since': 1020},
+            {'sender': 'bob'},
+            {'sender': 'alice', 'min_total': 50000, 'until': 1100},
+        ]
+        for filters in cases:
+            for limit in (1, 3, 1000):
+                with self.subTest(filters=filters, limit=limit):
+                    found, _ = self.collect(limit, **filters)
+                    self.assertEqual(found, self.brute(**filters))
+
+    def test_driver_is_smallest_range(self):
+        _, order = self.collect(10, min_total=500000)
+        self.assertEqual(order, 'total')
+        last_ts = self.chain[-1]['transactions'][-1]['timestamp'] if self.chain[-1]['transactions'] else 10**9
+        _, order = self.collect(10, since=last_ts)
+        self.assertEqual(order, 'time')
+
+    def test_results_follow_driver_order(self):
+        page, order, _ = self.index.query(self.tx_at, min_total=50000, limit=1000)
+        totals = [self.chain[p]['transactions'][t]['total'] for p, t in page]
+        self.assertEqual(order, 'total')
+        self.assertEqual(totals, sorted(totals))
+
+    def test_cursor_survives_new_blocks(self):
+        page, order, cursor = self.index.query(self.tx_at, min_total=100000, limit=2)
+        ts = self.chain[-1]['timestamp'] + 1
+        block = {'index': len(self.chain) + 1, 'timestamp': ts,
+                 'transactions': [{'sender': 'dave', 'total': 1, 'timestamp': ts}]}
+        self.chain.append(block)
+        self.index.add_block(len(self.chain) - 1, block)
+        rest, _, _ = self.index.query(self.tx_at, min_total=100000, limit=1000, cursor=cursor)
+        self.assertEqual(set(page) | set(rest), self.brute(min_total=100000))
+
+    def test_bad_cursor_rejected(self):
+        for cursor in ('nope', 'time:abc:1:2', 'total:1:2', 'sender:1'):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+        with self.assertRaises(ValueError):
+            self.index.query(self.tx_at, cursor='sender:1:0')
+
+    def test_bulk_build_matches_incremental(self):
+        bulk = TransactionIndex()
+        for pos, block in enumerate(self.chain):
+            bulk.add_block(pos, block, bulk=True)
+        bulk.finish_bulk()
+        self.assertEqual(bulk.by_time, self.index.by_time)
+        self.assertEqual(bulk.by_total, self.index.by_total)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# tx_index.py — Sorted secondary indexes for transaction range queries
+# --------------------------------------------------------------------------
+# Dua index terurut di atas chain, masing-masing list of tuple:
+#   by_time  : (timestamp, block_pos, tx_pos)
+#   by_total : (total,     block_pos, tx_pos)
+# Range query = dua bisect (O(log n)) lalu iterasi hasil saja. Index dengan
+# rentang kandidat terkecil (waktu, total, atau sender index milik
+# Blockchain) dipakai sebagai "driver"; predikat lain difilter per kandidat.
+#
+# Timestamp transaksi hampir monoton (block batched bisa berisi tx yang
+# dibuat sebelum seal block sebelumnya), jadi insort hampir selalu jatuh di
+# ujung list. Bangun ulang seluruh chain (startup/restore/import) memakai
+# add_block(..., bulk=True) + finish_bulk(): append lalu satu kali sort,
+# O(n log n) -- insort per tx untuk index total akan O(n^2). Pagination memakai keyset cursor (tuple terakhir yang dikirim),
+# sehingga stabil walau ada insert baru di tengah index total.
+# --------------------------------------------------------------------------
+from bisect import bisect_left, bisect_right, insort
+
+ORDERS = ('time', 'total', 'sender')
+INF = float('inf')
+
+
+def tx_timestamp(tx, block_timestamp=0):
+    """Timestamp transaksi (fallback: timestamp block) sebagai float."""
+    for value in (tx.get('timestamp', block_timestamp), block_timestamp):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+
+def tx_total(tx):
+    try:
+        return int(tx.get('total', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def encode_cursor(order, key):
+    return order + ':' + ':'.join(repr(k) for k in key)
+
+
+def decode_cursor(cursor):
+    """'time:1700000000.5:3:0' -> ('time', (1700000000.5, 3, 0)). ValueError jika rusak."""
+    parts = str(cursor).split(':')
+    if not parts or parts[0] not in ORDERS:
+        raise ValueError("Cursor tidak valid")
+    order = parts[0]
+    try:
+        if order == 'sender':
+            if len(parts) != 3:
+                raise ValueError
+            return order, (int(parts[1]), int(parts[2]))
+        if len(parts) != 4:
+            raise ValueError
+        first = float(parts[1]) if order == 'time' else int(parts[1])
+        return order, (first, int(parts[2]), int(parts[3]))
+    except ValueError:
+        raise ValueError("Cursor tidak valid") from None
+
+
+def _contains(sorted_positions, item):
+    i = bisect_left(sorted_positions, item)
+    return i < len(sorted_positions) and sorted_positions[i] == item
+
+
+class TransactionIndex:
+    def __init__(self):
+        self.by_time = []
+        self.by_total = []
+
+    def add_block(self, pos, block, bulk=False):
+        """Index transaksi satu block. bulk=True: append saja, urutkan sekali lewat finish_bulk()."""
+        for tx_pos, tx in enumerate(block.get('transactions', [])):
+            time_key = (tx_timestamp(tx, block.get('timestamp', 0)), pos, tx_pos)
+            total_key = (tx_total(tx), pos, tx_pos)
+            if bulk:
+                self.by_time.append(time_key)
+                self.by_total.append(total_key)
+            else:
+                insort(self.by_time, time_key)
+                insort(self.by_total, total_key)
+
+    def finish_bulk(self):
+        # Timsort: by_time hampir terurut -> mendekati O(n)
+        self.by_time.sort()
+        self.by_total.sort()
+
+    def __len__(self):
+        return len(self.by_time)
+
+    def time_range(self, since=None, until=None):
+        lo = 0 if since is None else bisect_left(self.by_time, (float(since),))
+        hi = len(self.by_time) if until is None else bisect_right(self.by_time, (float(until), INF))
+        return lo, max(lo, hi)
+
+    def total_range(self, min_total=None, max_total=None):
+        lo = 0 if min_total is None else bisect_left(self.by_total, (int(min_total),))
+        hi = len(self.by_total) if max_total is None else bisect_right(self.by_total, (int(max_total), INF))
+        return lo, max(lo, hi)
+
+    def query(self, tx_at, since=None, until=None, min_total=None, max_total=None,
+              sender_positions=None, limit=50, cursor=None):
+        """Cari transaksi sesuai filter. Return (list of (pos, tx_pos), order, next_cursor).
+
+        `tx_at(pos, tx_pos)` mengembalikan (transaksi, timestamp block) untuk memfilter kandidat.
+        `sender_positions` = list (pos, tx_pos) urut chain milik satu sender (atau None).
+        Urutan hasil mengikuti driver (`order`); `cursor` harus berasal dari query yang sama.
+        """
+        limit = max(1, int(limit))
+        t_lo, t_hi = self.time_range(since, until)
+        a_lo, a_hi = self.total_range(min_total, max_total)
+        candidates = [('time', t_hi - t_lo), ('total', a_hi - a_lo)]
+        if sender_positions is not None:
+            candidates.append(('sender', len(sender_positions)))
+
+        after = None
+        if cursor:
+            order, after = decode_cursor(cursor)
+            if order not in dict(candidates):
+                raise ValueError("Cursor tidak cocok dengan filter")
+        else:
+            # Driver = index dengan rentang kandidat terkecil; seri -> waktu (urutan paling alami)
+            order = min(candidates, key=lambda c: (c[1], ORDERS.index(c[0])))[0]
+
+        if order == 'time':
+            keys, lo, hi = self.by_time, t_lo, t_hi
+        elif order == 'total':
+            keys, lo, hi = self.by_total, a_lo, a_hi
+        else:
+            keys, lo, hi = sender_positions, 0, len(sender_positions)
+        if after is not None:
+            lo = max(lo, bisect_right(keys, after))
+
+        results, i = [], lo
+        while i < hi and len(results) < limit:
+            key = keys[i]
+            i += 1
+            pos, tx_pos = key[-2], key[-1]
+            tx, block_timestamp = tx_at(pos, tx_pos)
+            if since is not None or until is not None:
+                ts = tx_timestamp(tx, block_timestamp)
+                if (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+            if min_total is not None or max_total is not None:
+                total = tx_total(tx)
+                if (min_total is not None and total < min_total) or (max_total is not None and total > max_total):
+                    continue
+            if sender_positions is not None and order != 'sender' and not _contains(sender_positions, (pos, tx_pos)):
+                continue
+            results.append((pos, tx_pos))
+        # Halaman penuh dan masih ada kandidat -> cursor = key terakhir yang diperiksa
+        next_cursor = encode_cursor(order, keys[i - 1]) if len(results) >= limit and i < hi else None
+        return results, order, next_cursor